@@ -0,0 +1,42 @@
+"""
+Formatting time of array replies with 100k values, compared with a plain
+str() of the list, and peak memory of a chunked reply read in chunks.
+
+Run with:
+
+    python -m benchmarks.bench_arrays
+"""
+import timeit
+import tracemalloc
+
+from visa_mock.base.conversion import ArrayFormat
+
+
+def main(point_count: int = 100_000, repeat: int = 10) -> None:
+    values = [index * 1e-3 for index in range(point_count)]
+
+    for name, format_values in (
+            ("str(list)", str),
+            ("ArrayFormat", ArrayFormat()),
+            ("ArrayFormat .6e", ArrayFormat(number_format=".6e")),
+    ):
+        duration = min(timeit.repeat(
+            lambda: format_values(values), number=repeat, repeat=3
+        )) / repeat
+        print(f"{name:>16}: {duration * 1e3:8.2f} ms")
+
+    for chunk_size in (None, 1000):
+        tracemalloc.start()
+        reply = ArrayFormat(chunk_size=chunk_size)(values)
+        if chunk_size is not None:
+            complete = False
+            while not complete:
+                _, complete = reply.read(16 * 1024)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        print(f"chunk size {chunk_size}: peak reply memory {peak / 1024:8.0f} kB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""
+Aggregate query throughput of many mocked instruments driven concurrently
+from one asyncio event loop. Every instrument has a call delay, so the
+throughput should scale with the number of concurrent sessions.
+
+Run with:
+
+    python -m benchmarks.bench_async
+"""
+import asyncio
+import time
+
+from visa import ResourceManager
+
+from visa_mock.base.register import register_resource
+from visa_mock.test.mock_instruments.instruments import Mocker1
+
+
+async def drive(resource, query_count: int) -> None:
+    for _ in range(query_count):
+        await resource.aquery(":INSTR:CHANNEL1:VOLT?")
+
+
+async def run(resources, query_count: int) -> float:
+    start = time.perf_counter()
+    await asyncio.gather(*(drive(resource, query_count) for resource in resources))
+    return time.perf_counter() - start
+
+
+def main(call_delay: float = 0.01, query_count: int = 20) -> None:
+    resource_manager = ResourceManager(visa_library="@mock")
+
+    print(f"{'sessions':>8} {'queries/s':>12}")
+    for session_count in (1, 10, 100, 500):
+        resources = []
+        for number in range(session_count):
+            address = f"MOCK0::async{number}::INSTR"
+            register_resource(address, Mocker1(call_delay=call_delay))
+            resources.append(resource_manager.open_resource(address))
+
+        duration = asyncio.run(run(resources, query_count))
+        print(f"{session_count:>8} {session_count * query_count / duration:>12.0f}")
+
+        for resource in resources:
+            resource.close()
+
+
+if __name__ == "__main__":
+    main()
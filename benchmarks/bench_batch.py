@@ -0,0 +1,51 @@
+"""
+Time to apply a configuration of 20 settings through a session, as separate
+messages and as one compound, semicolon separated message. With a call delay
+applied per batch, the compound message pays the delay only once.
+
+Run with:
+
+    python -m benchmarks.bench_batch
+"""
+import timeit
+
+from visa_mock.base import high_level  # noqa: F401 (registers MOCK resource names)
+from visa_mock.base.clock import SimulatedClock
+from visa_mock.base.session import Session
+from visa_mock.test.mock_instruments.instruments import Mocker3
+
+
+def main(repeat: int = 2000) -> None:
+    clock = SimulatedClock()
+    mocker = Mocker3(call_delay=0.001)
+    mocker.clock = clock
+    mocker.set_batch_delay_mode(per_command=False)
+
+    session = Session(0, "MOCK0::mock3::INSTR")
+    session.device = mocker
+    commands = [
+        f":CHANNEL{channel}:VOLT {index}"
+        for index in range(10) for channel in (1, 2)
+    ]
+    batch = ";".join(commands)
+
+    start = clock.time()
+    separate = min(timeit.repeat(
+        lambda: [session.write(command) for command in commands],
+        number=repeat, repeat=3
+    )) / repeat
+    separate_delay = (clock.time() - start) / repeat / 3
+
+    start = clock.time()
+    batched = min(timeit.repeat(
+        lambda: session.write(batch), number=repeat, repeat=3
+    )) / repeat
+    batched_delay = (clock.time() - start) / repeat / 3
+
+    print(f"{'':>18} {'cpu [us]':>9} {'simulated delay [ms]':>21}")
+    print(f"{'separate messages':>18} {separate * 1e6:>9.1f} {separate_delay * 1e3:>21.1f}")
+    print(f"{'one batch':>18} {batched * 1e6:>9.1f} {batched_delay * 1e3:>21.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Compare the dispatch index of mocker classes with a linear scan over all
+SCPI patterns (the dispatch strategy used before the index existed).
+
+Run with:
+
+    python -m benchmarks.bench_dispatch
+"""
+import re
+import timeit
+
+from visa_mock.base.base_mocker import BaseMocker, MockerMetaClass, scpi
+
+
+def make_mocker_class(pattern_count: int) -> MockerMetaClass:
+    namespace = {}
+
+    for number in range(pattern_count):
+        def set_voltage(self, value: float) -> None:
+            pass
+
+        def get_voltage(self) -> float:
+            return 0.0
+
+        namespace[f"_set_voltage{number}"] = scpi(rf":SOURCE{number}:VOLT (.*)")(set_voltage)
+        namespace[f"_get_voltage{number}"] = scpi(rf":SOURCE{number}:VOLT\?")(get_voltage)
+
+    return MockerMetaClass(f"Mocker{pattern_count}", (BaseMocker,), namespace)
+
+
+def linear_scan(mocker: BaseMocker, scpi_string: str) -> list:
+    found = []
+    for regex_pattern, handler in mocker.__scpi_dict__.items():
+        search_result = re.search(regex_pattern, scpi_string)
+        if search_result:
+            found.append((handler, search_result))
+
+    return found
+
+
+def indexed_lookup(mocker: BaseMocker, scpi_string: str) -> tuple:
+    return type(mocker).__scpi_index__.resolve(scpi_string)
+
+
+def main(repeat: int = 200) -> None:
+    print(f"{'patterns':>10} {'linear [us]':>12} {'index [us]':>12} {'speedup':>8}")
+
+    for half_count in (5, 50, 500):
+        mocker = make_mocker_class(half_count)()
+        command = f":SOURCE{half_count - 1}:VOLT?"
+
+        linear = min(timeit.repeat(
+            lambda: linear_scan(mocker, command), number=repeat, repeat=3
+        )) / repeat
+        indexed = min(timeit.repeat(
+            lambda: indexed_lookup(mocker, command), number=repeat, repeat=3
+        )) / repeat
+
+        print(
+            f"{2 * half_count:>10} {linear * 1e6:>12.2f} "
+            f"{indexed * 1e6:>12.2f} {linear / indexed:>8.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""
+Cost of reading lazily evaluated dynamic state: the time per read of a
+ramping channel, independent of how long ago its target was set, and the
+memory of a 10000 channel source where 100 channels were set.
+
+Run with:
+
+    python -m benchmarks.bench_dynamics
+"""
+import timeit
+import tracemalloc
+
+from visa_mock.base.clock import SimulatedClock
+from visa_mock.base.dynamics import DynamicParameter
+from visa_mock.base.timing import normal_jitter
+from visa_mock.test.mock_instruments.instruments import MockerRamp
+
+
+def main(repeat: int = 100_000) -> None:
+    parameter = DynamicParameter(
+        slew_rate=1.0, time_constant=0.1, noise=normal_jitter(1e-4), seed=1
+    )
+    parameter.set_target(5.0, now=0.0)
+
+    for now in (0.5, 1e6):
+        duration = min(timeit.repeat(
+            lambda: parameter.value(now), number=repeat, repeat=3
+        )) / repeat
+        print(f"read {now:9.1f} s after setting: {duration * 1e9:6.0f} ns")
+
+    clock = SimulatedClock()
+    tracemalloc.start()
+    mocker = MockerRamp()
+    mocker.clock = clock
+    for channel in range(1, 10_001, 100):
+        mocker.send(f":INSTR:CHANNEL{channel}:VOLT 1")
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    clock.advance(3600.0)
+    duration = min(timeit.repeat(
+        lambda: mocker.send(":INSTR:CHANNEL101:VOLT?"), number=repeat // 10, repeat=3
+    )) / (repeat // 10)
+    print(f"10000 channels, 100 set: {memory / 1024:.0f} kB, query {duration * 1e6:.2f} us")
+
+
+if __name__ == "__main__":
+    main()
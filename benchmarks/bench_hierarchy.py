@@ -0,0 +1,158 @@
+"""
+Class creation and dispatch cost of a 4 level mocker hierarchy. Every level
+has `leaf_count` handlers and `branch_count` sub-module handlers returning an
+instance of the level below. For comparison, the same hierarchy is also
+defined as a single mocker class with the flattened cross-product of all
+patterns, which is how sub-modules used to be registered.
+
+Dispatch indexes are built lazily by the first message sent to a class, so
+class creation alone leaves out most of the setup cost. The first dispatch,
+which builds the indexes it needs, is timed separately, and the total of
+both is the cost until a mocker has answered its first message.
+
+Run with:
+
+    python -m benchmarks.bench_hierarchy
+"""
+import time
+import timeit
+from typing import Any, List, Tuple
+
+from visa_mock.base.base_mocker import BaseMocker, MockerMetaClass, scpi
+
+
+def make_level(
+        depth: int,
+        leaf_count: int,
+        branch_count: int
+) -> MockerMetaClass:
+
+    namespace = {}
+    sub_module = None
+    if depth > 0:
+        sub_module = make_level(depth - 1, leaf_count, branch_count)
+
+    for number in range(leaf_count):
+        def get_value(self) -> float:
+            return 0.0
+
+        namespace[f"_get_value{number}"] = scpi(rf":VAL{number}\?")(get_value)
+
+    for number in range(branch_count if sub_module else 0):
+        def get_sub_module(self, index: int) -> sub_module:
+            return self.sub_module
+
+        namespace[f"_get_sub_module{number}"] = scpi(
+            rf":LEVEL{depth}B{number}_(\d+)"
+        )(get_sub_module)
+
+    def __init__(self) -> None:
+        BaseMocker.__init__(self)
+        if sub_module is not None:
+            self.sub_module = sub_module()
+
+    namespace["__init__"] = __init__
+    return MockerMetaClass(f"Level{depth}", (BaseMocker,), namespace)
+
+
+def flattened_patterns(
+        depth: int,
+        leaf_count: int,
+        branch_count: int
+) -> List[Tuple[str, int]]:
+    """
+    Return (pattern, argument count) for the flattened hierarchy
+    """
+    patterns = [(rf":VAL{number}\?", 0) for number in range(leaf_count)]
+    if depth == 0:
+        return patterns
+
+    sub_patterns = flattened_patterns(depth - 1, leaf_count, branch_count)
+    for number in range(branch_count):
+        patterns.extend(
+            (rf":LEVEL{depth}B{number}_(\d+)" + pattern, count + 1)
+            for pattern, count in sub_patterns
+        )
+
+    return patterns
+
+
+def make_flattened(
+        depth: int,
+        leaf_count: int,
+        branch_count: int
+) -> MockerMetaClass:
+    namespace = {}
+
+    patterns = flattened_patterns(depth, leaf_count, branch_count)
+    for number, (pattern, count) in enumerate(patterns):
+        def get_value(self, *args) -> float:
+            return 0.0
+
+        get_value.__annotations__.update(
+            {f"arg{index}": int for index in range(count)}
+        )
+        get_value.__code__ = get_value.__code__.replace(
+            co_argcount=count + 1,
+            co_varnames=("self",) + tuple(f"arg{i}" for i in range(count)),
+            co_flags=get_value.__code__.co_flags & ~0x04,
+            co_nlocals=count + 1,
+        )
+        namespace[f"_get_value{number}"] = scpi(pattern)(get_value)
+
+    return MockerMetaClass(f"Flattened{depth}", (BaseMocker,), namespace)
+
+
+def dispatch(mocker: BaseMocker, command: str) -> Any:
+    """
+    Resolve and call the handlers of a command, skipping the call delay
+    """
+    return mocker._call_route(type(mocker).__scpi_index__.resolve(command))
+
+
+def main(depth: int = 3, leaf_count: int = 10, repeat: int = 2000) -> None:
+    command = ":LEVEL3B1_1:LEVEL2B1_1:LEVEL1B1_1:VAL9?"
+
+    print(
+        f"{'branches':>8} {'kind':>12} {'patterns':>9} "
+        f"{'create [ms]':>12} {'first [ms]':>11} {'total [ms]':>11} "
+        f"{'dispatch [us]':>14}"
+    )
+    for branch_count in (2, 4):
+        for kind, factory in (
+                ("hierarchical", make_level), ("flattened", make_flattened)
+        ):
+            start = time.perf_counter()
+            mocker_class = factory(depth, leaf_count, branch_count)
+            create = time.perf_counter() - start
+
+            pattern_count = sum(
+                len(cls.__scpi_dict__) for cls in _classes(mocker_class)
+            )
+            mocker = mocker_class()
+            start = time.perf_counter()
+            dispatch(mocker, command)
+            first = time.perf_counter() - start
+
+            send = min(timeit.repeat(
+                lambda: dispatch(mocker, command), number=repeat, repeat=3
+            )) / repeat
+
+            print(
+                f"{branch_count:>8} {kind:>12} {pattern_count:>9} "
+                f"{create * 1e3:>12.2f} {first * 1e3:>11.2f} "
+                f"{(create + first) * 1e3:>11.2f} {send * 1e6:>14.2f}"
+            )
+
+
+def _classes(mocker_class: MockerMetaClass) -> List[MockerMetaClass]:
+    classes = [mocker_class]
+    for handler in mocker_class.__scpi_dict__.values():
+        if handler.sub_module is not None:
+            classes.extend(_classes(handler.sub_module))
+
+    return list(dict.fromkeys(classes))
+
+
+if __name__ == "__main__":
+    main()
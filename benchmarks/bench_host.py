@@ -0,0 +1,65 @@
+"""
+Round trips per second to mockers hosted by a device host (see
+`visa_mock.base.host`), from 1 to 8 client processes each querying its own
+instrument through a `RemoteMocker`.
+
+Run with:
+
+    python -m benchmarks.bench_host
+"""
+import multiprocessing
+import time
+
+from visa_mock.base.host import DeviceHost
+from visa_mock.base.remote import RemoteMocker
+from visa_mock.test.mock_instruments.instruments import Mocker1
+
+MAX_PROCESSES = 8
+
+
+def client(port: int, number: int, query_count: int, start, results) -> None:
+    remote = RemoteMocker(f"MOCK0::mock{number}::INSTR", port=port)
+    remote.send(":INSTR:CHANNEL1:VOLT 1.0")
+    start.wait()
+
+    begin = time.perf_counter()
+    for _ in range(query_count):
+        remote.send(":INSTR:CHANNEL1:VOLT?")
+    results.put(time.perf_counter() - begin)
+    remote.close()
+
+
+def main(query_count: int = 5000) -> None:
+    host = DeviceHost(
+        {f"MOCK0::mock{number}::INSTR": Mocker1() for number in range(MAX_PROCESSES)},
+        port=0
+    )
+    port = host.start_in_thread()
+
+    print(f"{'processes':>10} {'round trips/s':>14} {'latency [us]':>13}")
+    for process_count in (1, 2, 4, 8):
+        start = multiprocessing.Barrier(process_count + 1)
+        results = multiprocessing.Queue()
+        processes = [
+            multiprocessing.Process(
+                target=client, args=(port, number, query_count, start, results)
+            )
+            for number in range(process_count)
+        ]
+        for process in processes:
+            process.start()
+
+        start.wait()
+        durations = [results.get() for _ in processes]
+        for process in processes:
+            process.join()
+
+        rate = process_count * query_count / max(durations)
+        latency = sum(durations) / (process_count * query_count)
+        print(f"{process_count:>10} {rate:>14.0f} {latency * 1e6:>13.1f}")
+
+    host.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Startup latency: the time to import the mocker base class (measured with
+`python -X importtime` in a fresh interpreter), to define a library of 200
+mocker classes with 20 handlers each, and to send the first message to each
+class, which builds its dispatch index. Half of the handler patterns are
+shared by all classes, as in libraries of similar instruments.
+
+With `--budget-ms`, the benchmark exits with an error if importing takes
+longer, to guard startup latency in CI:
+
+    python -m benchmarks.bench_import --budget-ms 150
+"""
+import argparse
+import subprocess
+import sys
+import time
+
+from visa_mock.base.base_mocker import BaseMocker, scpi
+
+MODULE = "visa_mock.base.base_mocker"
+
+
+def import_times(module: str) -> dict:
+    """
+    The cumulative import time of every module imported with `module`, in
+    microseconds
+    """
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, check=True
+    ).stderr
+
+    times = {}
+    for line in stderr.splitlines()[1:]:
+        _, cumulative, name = line.split("|")
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+def define_library(class_count: int, handler_count: int) -> list:
+    classes = []
+    for number in range(class_count):
+        namespace = {}
+        for handler in range(handler_count):
+            def get(self, channel: int) -> float:
+                return 0.0
+            # Half of the patterns are shared by all classes
+            prefix = "" if handler % 2 else f":DEV{number}"
+            namespace[f"_get{handler}"] = scpi(fr"{prefix}:MEAS{handler}:CHANNEL(\d+)\?")(get)
+
+        classes.append(type(f"Mocker{number}", (BaseMocker,), namespace))
+    return classes
+
+
+def main(arguments=None) -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--budget-ms", type=float, default=None)
+    parser.add_argument("--repeat", type=int, default=5)
+    options = parser.parse_args(arguments)
+
+    runs = [import_times(MODULE) for _ in range(options.repeat)]
+    best = min(runs, key=lambda times: times[MODULE])
+    import_ms = best[MODULE] / 1000
+
+    print(f"import {MODULE}: {import_ms:.1f} ms")
+    slowest = sorted(best.items(), key=lambda item: item[1], reverse=True)[1:6]
+    for name, cumulative in slowest:
+        print(f"    {name:40s} {cumulative / 1000:6.1f} ms")
+
+    start = time.perf_counter()
+    classes = define_library(200, 20)
+    defined = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for mocker_class in classes:
+        mocker_class().send(":MEAS1:CHANNEL1?")
+    first_sends = time.perf_counter() - start
+
+    print(f"define 200 classes x 20 handlers: {defined * 1000:.1f} ms")
+    print(f"first send to each class:         {first_sends * 1000:.1f} ms")
+
+    if options.budget_ms is not None and import_ms > options.budget_ms:
+        sys.exit(f"Import took {import_ms:.1f} ms, over the budget of {options.budget_ms} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Memory per instrument (traced with tracemalloc) of a fleet of 64 channel
+voltage sources with all channels set, with dict based state and with
+compact state (slots and a `ChannelArray`), and of nested instruments with
+eagerly and lazily created sub-modules.
+
+Run with:
+
+    python -m benchmarks.bench_memory
+"""
+import tracemalloc
+from typing import Callable
+
+from visa_mock.test.mock_instruments.instruments import (
+    Mocker1, Mocker3, MockerChannel, MockerCompact
+)
+
+
+def set_all_channels(mocker) -> None:
+    for channel in range(1, 65):
+        mocker.send(f":INSTR:CHANNEL{channel}:VOLT {channel / 10}")
+
+
+def eager_mocker3() -> Mocker3:
+    mocker = Mocker3()
+    mocker._channels = {1: MockerChannel(), 2: MockerChannel()}
+    return mocker
+
+
+def bytes_per_instrument(create: Callable, count: int) -> float:
+    tracemalloc.start()
+    start = tracemalloc.get_traced_memory()[0]
+    fleet = [create() for _ in range(count)]
+    memory = tracemalloc.get_traced_memory()[0] - start
+    tracemalloc.stop()
+
+    del fleet
+    return memory / count
+
+
+def configured(mocker_class) -> Callable:
+    def create():
+        mocker = mocker_class()
+        set_all_channels(mocker)
+        return mocker
+    return create
+
+
+def main(count: int = 2000) -> None:
+    cases = (
+        ("Mocker1 (dict, 64 channels)", configured(Mocker1)),
+        ("MockerCompact (64 channels)", configured(MockerCompact)),
+        ("Mocker3 (eager channels)", eager_mocker3),
+        ("Mocker3 (lazy channels)", Mocker3),
+    )
+
+    for name, create in cases:
+        print(f"{name:>30} {bytes_per_instrument(create, count):>10.0f} bytes")
+
+
+if __name__ == "__main__":
+    main()
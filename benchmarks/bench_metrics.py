@@ -0,0 +1,42 @@
+"""
+Cost of the metrics collection: time per query through a session with
+metrics disabled and enabled.
+
+Run with:
+
+    python -m benchmarks.bench_metrics
+"""
+import timeit
+
+from visa_mock.base import high_level  # noqa: F401 (registers MOCK resource names)
+from visa_mock.base.metrics import disable_metrics, enable_metrics
+from visa_mock.base.session import Session
+from visa_mock.test.mock_instruments.instruments import Mocker1
+
+
+def time_query(session: Session, repeat: int) -> float:
+    return min(timeit.repeat(
+        lambda: session.ask(":INSTR:CHANNEL1:VOLT?"), number=repeat, repeat=3
+    )) / repeat
+
+
+def main(repeat: int = 20000) -> None:
+    session = Session(0, "MOCK0::mock1::INSTR")
+    session.device = Mocker1()
+
+    disabled = time_query(session, repeat)
+    collector = enable_metrics()
+    enabled = time_query(session, repeat)
+    disable_metrics()
+
+    print(f"{'metrics':>10} {'query [us]':>12}")
+    print(f"{'disabled':>10} {disabled * 1e6:>12.2f}")
+    print(f"{'enabled':>10} {enabled * 1e6:>12.2f}")
+
+    latency = collector.snapshot()["commands"][":INSTR:CHANNEL(.*):VOLT\\?"]["latency"]
+    for kind, histogram in latency.items():
+        print(f"{kind:>10} {histogram['mean'] * 1e6:>12.2f} us mean")
+
+
+if __name__ == "__main__":
+    main()
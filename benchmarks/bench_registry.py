@@ -0,0 +1,76 @@
+"""
+Registering a fleet of 10000 instruments as instances and as factories
+(time and memory traced with tracemalloc), and answering list_resources
+queries with the registry index compared with filtering all names.
+
+Run with:
+
+    python -m benchmarks.bench_registry
+"""
+import time
+import tracemalloc
+
+from pyvisa import rname
+
+from visa_mock.base import high_level  # noqa: F401 (registers MOCK resource names)
+from visa_mock.base.register import ResourceRegistry
+from visa_mock.test.mock_instruments.instruments import Mocker1
+
+
+def fleet_names(count: int) -> list:
+    # Ten boards, half of the instruments on each board are sockets
+    return [
+        f"MOCK{number % 10}::dev{number}::{'INSTR' if number % 20 < 10 else 'SOCKET'}"
+        for number in range(count)
+    ]
+
+
+def measure_registration(names: list, lazy: bool) -> None:
+    tracemalloc.start()
+    start = time.perf_counter()
+
+    registry = ResourceRegistry()
+    for name in names:
+        if lazy:
+            registry.register_factory(name, Mocker1)
+        else:
+            registry.register(name, Mocker1())
+
+    seconds = time.perf_counter() - start
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    kind = "factories" if lazy else "instances"
+    print(f"{kind:>10} {seconds * 1e3:>10.1f} ms {memory / 1024 ** 2:>8.2f} MB")
+
+
+def main(count: int = 10000) -> None:
+    names = fleet_names(count)
+    measure_registration(names, lazy=False)
+    measure_registration(names, lazy=True)
+
+    registry = ResourceRegistry()
+    for name in names:
+        registry.register_factory(name, Mocker1)
+
+    for query in ("MOCK3::?*::INSTR", "?*::SOCKET", "MOCK3::dev3::INSTR"):
+        start = time.perf_counter()
+        rname.filter(names, query)
+        full_scan = time.perf_counter() - start
+
+        start = time.perf_counter()
+        found = registry.list_resources(query)
+        indexed = time.perf_counter() - start
+
+        start = time.perf_counter()
+        registry.list_resources(query)
+        cached = time.perf_counter() - start
+
+        print(
+            f"{query:>20} {len(found):>6} found: scan {full_scan * 1e3:>7.2f} ms, "
+            f"index {indexed * 1e3:>7.2f} ms, cached {cached * 1e6:>7.2f} us"
+        )
+
+
+if __name__ == "__main__":
+    main()
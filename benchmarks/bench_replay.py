@@ -0,0 +1,61 @@
+"""
+Time per message of a mocker replaying recorded traffic compared with the
+mocker the traffic was recorded from, and the time to load trace files of
+increasing size.
+
+Run with:
+
+    python -m benchmarks.bench_replay
+"""
+import os
+import tempfile
+import time
+import timeit
+
+from visa_mock.base import high_level  # noqa: F401 (registers MOCK resource names)
+from visa_mock.base.replay import Recorder, ReplayMocker
+from visa_mock.base.session import Session
+from visa_mock.test.mock_instruments.instruments import Mocker1
+
+
+def record(path: str, channel_count: int) -> None:
+    session = Session(0, "MOCK0::mock1::INSTR")
+    session.device = Mocker1()
+
+    with Recorder(path, session) as recorder:
+        for channel in range(channel_count):
+            recorder.write(f":INSTR:CHANNEL{channel}:VOLT {channel}")
+            recorder.query(f":INSTR:CHANNEL{channel}:VOLT?")
+
+
+def main(repeat: int = 20000) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "mock1.trace")
+        record(path, 100)
+
+        command = ":INSTR:CHANNEL99:VOLT?"
+        mocker = Mocker1()
+        replay = ReplayMocker(path)
+
+        for name, device in (("Mocker1", mocker), ("ReplayMocker", replay)):
+            seconds = min(timeit.repeat(
+                lambda: device.send(command), number=repeat, repeat=3
+            )) / repeat
+            print(f"{name:>14} {seconds * 1e6:>8.2f} us per message")
+
+        for channel_count in (1000, 100000):
+            path = os.path.join(directory, f"mock{channel_count}.trace")
+            record(path, channel_count)
+
+            for use_mmap in (False, True):
+                start = time.perf_counter()
+                ReplayMocker(path, use_mmap=use_mmap)
+                seconds = time.perf_counter() - start
+                print(
+                    f"{2 * channel_count:>8} records, mmap={use_mmap!s:<5} "
+                    f"loaded in {seconds * 1e3:>8.1f} ms"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Query time of a 10k point calibration table and of "*IDN?", with and without
+reply caching, and of the table after every invalidating write.
+
+Run with:
+
+    python -m benchmarks.bench_reply_cache
+"""
+import timeit
+from typing import List
+
+from visa_mock.base.base_mocker import BaseMocker, scpi
+
+
+def table_mocker(cacheable: bool) -> BaseMocker:
+
+    class Calibrated(BaseMocker):
+
+        def __init__(self) -> None:
+            super().__init__()
+            self.table = [index * 1e-3 for index in range(10_000)]
+
+        @scpi(r"\*IDN\?", cacheable=cacheable)
+        def _idn(self) -> str:
+            return "Mock,Calibrated,0,1.0"
+
+        @scpi(r":CAL:TABLE\?", cacheable=cacheable, tags=("calibration",) if cacheable else ())
+        def _get_table(self) -> List[float]:
+            return self.table
+
+        @scpi(r":CAL:OFFSET (.*)", invalidates=("calibration",))
+        def _offset(self, offset: float) -> None:
+            self.table[0] = offset
+
+    return Calibrated()
+
+
+def main(repeat: int = 200) -> None:
+    for cacheable in (False, True):
+        mocker = table_mocker(cacheable)
+        label = "cached" if cacheable else "uncached"
+
+        for command in ("*IDN?", ":CAL:TABLE?"):
+            duration = min(timeit.repeat(
+                lambda: mocker.send(command), number=repeat, repeat=3
+            )) / repeat
+            print(f"{label:>20} {command:12s} {duration * 1e6:10.1f} us")
+
+    mocker = table_mocker(True)
+    duration = min(timeit.repeat(
+        lambda: (mocker.send(":CAL:OFFSET 1"), mocker.send(":CAL:TABLE?")),
+        number=repeat, repeat=3
+    )) / repeat
+    print(f"invalidating write + {':CAL:TABLE?':12s} {duration * 1e6:10.1f} us")
+    print(mocker.reply_cache_info())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""
+Soak test of opening and closing sessions: time per open/close cycle and
+the memory allocated (with tracemalloc) every 100000 cycles, which should
+stay flat. The number of millions of cycles is an optional argument.
+
+Run with:
+
+    python -m benchmarks.bench_sessions [millions]
+"""
+import sys
+import time
+import tracemalloc
+
+from visa_mock.base.high_level import MockVisaLibrary
+from visa_mock.base.register import register_resources
+from visa_mock.test.mock_instruments import instruments
+
+
+def main(millions: int = 1, step: int = 100000) -> None:
+    register_resources(instruments.resources)
+    library = MockVisaLibrary("unset")
+    manager, _ = library.open_default_resource_manager()
+    names = list(instruments.resources)
+
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    print(f"{'cycles':>10} {'cycle [us]':>11} {'memory [kB]':>12} {'sessions':>9}")
+
+    previous = None
+    for round_number in range(1, millions * 1000000 // step + 1):
+        start = time.perf_counter()
+        for cycle in range(step):
+            # The previous session is closed after the next one is opened,
+            # so ids are reused while other sessions are open
+            session, _ = library.open(manager, names[cycle % len(names)])
+            if previous is not None:
+                library.close(previous)
+            previous = session
+        seconds = time.perf_counter() - start
+
+        memory = tracemalloc.get_traced_memory()[0] - baseline
+        print(
+            f"{round_number * step:>10} {seconds / step * 1e6:>11.2f} "
+            f"{memory / 1024:>12.1f} {len(library._sessions):>9}"
+        )
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:2]))
@@ -0,0 +1,58 @@
+"""
+Resetting an instrument tree between tests: building and configuring the
+tree again compared with restoring a snapshot after a test changed a few
+channels.
+
+Run with:
+
+    python -m benchmarks.bench_snapshot
+"""
+import timeit
+
+from visa_mock.base.base_mocker import BaseMocker, scpi
+from visa_mock.base.channels import Submodules
+from visa_mock.test.mock_instruments.instruments import Mocker4
+
+
+class Rack(BaseMocker):
+    """
+    32 Mocker4 instruments, i.e. 224 mockers with all sub-modules created
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._instruments = Submodules(Mocker4, 32)
+
+    @scpi(r":SLOT(\d+)")
+    def _slot(self, number: int) -> Mocker4:
+        return self._instruments[number]
+
+
+def build_rack() -> Rack:
+    rack = Rack()
+    for slot in range(1, 33):
+        for instrument in (1, 2):
+            for channel in (1, 2):
+                rack.send(f":SLOT{slot}:INSTR{instrument}:CHANNEL{channel}:VOLT 1.0")
+    return rack
+
+
+def main(repeat: int = 50) -> None:
+    rack = build_rack()
+    baseline = rack.snapshot()
+
+    def change_and_restore():
+        rack.send(":SLOT3:INSTR1:CHANNEL2:VOLT 5.0")
+        rack.send(":SLOT7:INSTR2:CHANNEL1:VOLT 5.0")
+        rack.restore(baseline)
+
+    rebuild = min(timeit.repeat(build_rack, number=repeat, repeat=3)) / repeat
+    restore = min(timeit.repeat(change_and_restore, number=repeat, repeat=3)) / repeat
+
+    print(f"mockers in the tree: {len(baseline)}")
+    print(f"rebuild: {rebuild * 1e3:>8.3f} ms")
+    print(f"restore: {restore * 1e3:>8.3f} ms (including two messages)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""
+CPU time spent waiting for a 0.5 s operation: busy-polling the status byte
+with *STB? compared with sleeping in wait_on_event until the service request
+is raised.
+
+Run with:
+
+    python -m benchmarks.bench_srq
+"""
+import time
+
+from visa import ResourceManager
+
+from visa_mock.base.register import register_resource
+from visa_mock.test.mock_instruments.instruments import MockerSweep
+
+
+def measure(res, wait) -> None:
+    res.write("*CLS;*ESE 1;*SRE 32;:SWEEP:TIME 0.5;:SWEEP:START;*OPC")
+    wall = time.perf_counter()
+    cpu = time.process_time()
+    polls = wait(res)
+    print(
+        f"{wait.__name__:>16}: {time.perf_counter() - wall:.3f} s wall, "
+        f"{time.process_time() - cpu:.3f} s CPU, {polls} queries"
+    )
+
+
+def busy_polling(res) -> int:
+    polls = 0
+    while not int(res.query("*STB?")) & 0x40:
+        polls += 1
+    return polls
+
+
+def service_request(res) -> int:
+    res.wait_for_srq(5000)
+    return 0
+
+
+def main() -> None:
+    register_resource("MOCK0::bench_sweep::INSTR", MockerSweep())
+    rc = ResourceManager(visa_library="@mock")
+    res = rc.open_resource("MOCK0::bench_sweep::INSTR")
+
+    measure(res, busy_polling)
+    measure(res, service_request)
+
+
+if __name__ == "__main__":
+    main()
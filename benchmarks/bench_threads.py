@@ -0,0 +1,45 @@
+"""
+Query throughput of one shared mocked instrument from a thread pool, with
+every worker using its own session.
+
+Run with:
+
+    python -m benchmarks.bench_threads
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from visa import ResourceManager
+
+from visa_mock.base.register import register_resource
+from visa_mock.test.mock_instruments.instruments import Mocker1
+
+
+def main(query_count: int = 20000) -> None:
+    register_resource("MOCK0::shared::INSTR", Mocker1())
+    resource_manager = ResourceManager(visa_library="@mock")
+
+    def worker(resource) -> None:
+        for _ in range(query_count // len(resources)):
+            resource.query(":INSTR:CHANNEL1:VOLT?")
+
+    print(f"{'workers':>8} {'queries/s':>12}")
+    for worker_count in (1, 4, 16, 64):
+        resources = [
+            resource_manager.open_resource("MOCK0::shared::INSTR")
+            for _ in range(worker_count)
+        ]
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=worker_count) as executor:
+            list(executor.map(worker, resources))
+        duration = time.perf_counter() - start
+
+        print(f"{worker_count:>8} {query_count / duration:>12.0f}")
+
+        for resource in resources:
+            resource.close()
+
+
+if __name__ == "__main__":
+    main()
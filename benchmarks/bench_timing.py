@@ -0,0 +1,44 @@
+"""
+Cost of the timing model on the send path, and the simulated time a series
+of reads of a large binary reply takes over the interfaces of
+`INTERFACE_BYTES_PER_SECOND`.
+
+Run with:
+
+    python -m benchmarks.bench_timing
+"""
+import timeit
+
+from visa_mock.base.clock import SimulatedClock
+from visa_mock.base.timing import INTERFACE_BYTES_PER_SECOND, TimingModel, normal_jitter
+from visa_mock.test.mock_instruments.instruments import Mocker1
+
+
+def main(repeat: int = 20000) -> None:
+    clock = SimulatedClock()
+    mocker = Mocker1()
+    mocker.clock = clock
+    command = ":INSTR:CHANNEL1:VOLT?"
+
+    flat = min(timeit.repeat(lambda: mocker.send(command), number=repeat, repeat=3)) / repeat
+
+    mocker.timing = TimingModel(
+        latency=0.001, interface="GPIB", jitter=normal_jitter(0.0001), seed=1
+    )
+    timed = min(timeit.repeat(lambda: mocker.send(command), number=repeat, repeat=3)) / repeat
+
+    print(f"send, flat call delay: {flat * 1e6:8.2f} us")
+    print(f"send, timing model:    {timed * 1e6:8.2f} us")
+
+    # Simulated time of 100 transfers of a 1 MB reply
+    payload_bytes = 1_000_000
+    for interface, rate in INTERFACE_BYTES_PER_SECOND.items():
+        timing = TimingModel(latency=0.001, interface=interface)
+        start = clock.time()
+        for _ in range(100):
+            clock.sleep(timing.delay(0.0, payload_bytes, clock.time()))
+        print(f"{interface:6s} 100 x 1 MB: {clock.time() - start:10.3f} s simulated")
+
+
+if __name__ == "__main__":
+    main()
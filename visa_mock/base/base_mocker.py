@@ -1,15 +1,46 @@
-from inspect import signature
-from typing import Dict, List, Callable, Any, cast, get_type_hints, Optional
-import re
-import time
-
-
-class MockingError(Exception):
-    pass
-
+from itertools import count
+from typing import (
+    TYPE_CHECKING, Dict, FrozenSet, Iterable, List, Callable, Any, get_type_hints,
+    Optional, Tuple
+)
+import threading
+import warnings
+from time import perf_counter
+
+from visa_mock.base import metrics
+from visa_mock.base.clock import Clock, get_clock
+from visa_mock.base.conversion import (
+    ArrayFormat, BinaryBlock, ChunkedReply, Reply, converter, formatter, reply_size
+)
+from visa_mock.base.dispatch import (
+    CacheInfo, DispatchIndex, ResolutionCache, Route, split_message
+)
+from visa_mock.base.errors import AnnotationError, MockingError
+from visa_mock.base.reply_cache import MISSING, ReplyCache, ReplyCacheInfo
+from visa_mock.base.timing import TimingModel
+
+if TYPE_CHECKING:
+    from visa_mock.base.snapshot import Snapshot
+
+
+# Code object flags of functions with *args and **kwargs parameters
+_CO_VARARGS = 0x04
+_CO_VARKEYWORDS = 0x08
+
+
+def _parameter_names(function: Callable) -> List[str]:
+    """
+    The parameter names of a function. Reads the code object of plain
+    functions, which is much faster than `inspect.signature`.
+    """
+    code = getattr(function, "__code__", None)
+    if code is None or hasattr(function, "__wrapped__"):
+        from inspect import signature
+        return list(signature(function).parameters)
 
-class AnnotationError(Exception):
-    pass
+    count = code.co_argcount + code.co_kwonlyargcount
+    count += bool(code.co_flags & _CO_VARARGS) + bool(code.co_flags & _CO_VARKEYWORDS)
+    return list(code.co_varnames[:count])
 
 
 class SCPIHandler:
@@ -17,95 +48,135 @@ class SCPIHandler:
     SCPI handlers contain *class* methods which are called at runtime when
     a SCPI message needs to be handled.
 
-    The handler has two tasks:
-
-    1) Because SCPI messages are strings, this handler will cast string
-        values to the appropriate type depending on the annotation of the
-        input method. The method will be called with the recast arguments.
-
-    2) A handler can combine two handlers into one. Each handler handles part
-        of a scpi string, for example ":INSTR:CHANNEL(.*)" and ":VOLTAGE?".
-        The handler of the former returns a mock sub-module instance, containing
-        a handler method for the latter substring.
+    Because SCPI messages are strings, this handler will cast string
+    values to the appropriate type depending on the annotation of the
+    input method. The method will be called with the recast arguments.
+    The converters for the arguments and the formatter of the return value
+    are selected once, when the handler is first used. Until then the
+    annotations are not evaluated, so they can refer to classes defined
+    later in the module.
+
+    If the method returns a mock sub-module instance, the handler only
+    handles the first part of a scpi string, for example ":INSTR:CHANNEL(.*)"
+    in ":INSTR:CHANNEL1:VOLTAGE?". The sub-module class is stored in
+    `sub_module` and the rest of the string is handled by the sub-module.
     """
+    # Attributes set by `_introspect` on first access
+    _INTROSPECTED = frozenset((
+        "annotations", "return_type", "sub_module", "converters",
+        "format_reply", "call"
+    ))
+
     @classmethod
-    def from_method(cls, method: Callable) -> 'SCPIHandler':
+    def from_method(
+            cls,
+            method: Callable,
+            array_format: Optional[ArrayFormat] = None
+    ) -> 'SCPIHandler':
         """
-        Construct a handler from a class method.
+        Construct a handler from a class method. The annotations are checked
+        for completeness, but not evaluated.
         """
-        parameters = dict(signature(method).parameters)
+        parameters = _parameter_names(method)
 
-        try:
-            parameters.pop("self")
-        except KeyError:
+        if "self" not in parameters:
             raise AnnotationError("This can only decorate class methods")
 
-        type_hints = get_type_hints(method)
+        annotated = getattr(method, "__annotations__", {})
 
-        try:
-            return_type = type_hints.pop("return")
-        except KeyError:
+        if "return" not in annotated:
             raise AnnotationError("All functions must have an annotated return type")
 
-        annotations = list(type_hints.values())
-
-        if len(annotations) != len(parameters):
+        if len(annotated) != len(parameters):
             raise AnnotationError(
                 "This decorator requires all arguments to be annotated"
             )
 
-        return cls(method, annotations, return_type)
-
-    @classmethod
-    def combine(
-            cls,
-            handler: 'SCPIHandler',
-            sub_handler: 'SCPIHandler'
-    ) -> 'SCPIHandler':
-        """
-        Combine two handlers, each processing part of a SCPI message.
-        """
-        handler_arg_count = len(handler.annotations)
-        annotations = list(handler.annotations)
-        annotations.extend(sub_handler.annotations)
-
-        def method(self, *args):
-            handler_args = args[:handler_arg_count]
-            sub_handler_args = args[handler_arg_count:]
-            # The first handler returns a submodule
-            sub_module = handler(self, *handler_args)
-            # 'sub_handler' is a *class* method, meaning that the
-            # first argument needs to be a 'self'. This is
-            # provided by the first handler.
-            return sub_handler(
-                sub_module,
-                *sub_handler_args
-            )
-
-        return cls(
-            method, annotations, sub_handler.return_type
-        )
+        return cls(method, array_format)
 
     def __init__(
             self,
             method: Callable,
-            annotations: List,
-            return_type: type
+            array_format: Optional[ArrayFormat] = None
     ) -> None:
         """
-        The __init__ is never called directly. We use 'from_method' and 'combine'
-        instead
+        The __init__ is never called directly. We use 'from_method' instead
 
         Arguments:
             method: A method of a mocker class (not an instance method)
-            annotations: A list of types acquired by inspecting the
-                method type hints
-            return_type: Specify the return type of the method.
+            array_format: How to format arrays returned by the method.
         """
         self.method = method
-        self.annotations = annotations
+        self.array_format = array_format
+        # Set by the `scpi` decorator
+        self.scpi_string: Optional[str] = None
+        self.cacheable = False
+        self.tags: FrozenSet[str] = frozenset()
+        self.invalidates: FrozenSet[str] = frozenset()
+        self.blocking = False
+
+    def __getattr__(self, name: str) -> Any:
+        # Only called for attributes which are not set yet
+        if name not in SCPIHandler._INTROSPECTED:
+            raise AttributeError(name)
+
+        self._introspect()
+        return self.__dict__[name]
+
+    def _introspect(self) -> None:
+        """
+        Evaluate the annotations of the method and select the converters of
+        the arguments and the formatter of the return value
+        """
+        type_hints = get_type_hints(self.method)
+        return_type = type_hints.pop("return")
+
+        sub_module = None
+        if isinstance(return_type, MockerMetaClass):
+            sub_module = return_type
+
+        converters = [converter(annotation) for annotation in type_hints.values()]
+
+        self.annotations = list(type_hints.values())
         self.return_type = return_type
-        self.call_delay = None
+        self.sub_module = sub_module
+        self.converters = converters
+        self.format_reply = formatter(return_type, self.array_format)
+        self.call = self._compile_call()
+
+    def _compile_call(self) -> Callable[[Any, Tuple[str, ...]], Any]:
+        """
+        Build a function `call(mocker_self, args)` converting the argument
+        strings and calling the method, with fast paths for handlers with
+        zero or one argument.
+        """
+        method = self.method
+        converters = self.converters
+
+        if not converters:
+            def call(mocker_self, args):
+                return method(mocker_self)
+
+        elif len(converters) == 1:
+            convert = converters[0]
+
+            def call(mocker_self, args):
+                return method(mocker_self, convert(args[0]))
+
+        else:
+            def call(mocker_self, args):
+                return method(
+                    mocker_self,
+                    *[convert(value) for convert, value in zip(converters, args)]
+                )
+
+        return call
+
+    def convert_args(self, args: Tuple[str, ...]) -> List[Any]:
+        """
+        Convert argument strings to the annotated types of the method
+        """
+        return [convert(value) for convert, value in zip(self.converters, args)]
 
     def __call__(self, mocker_self, *args):
         """
@@ -113,40 +184,163 @@ class SCPIHandler:
         SCPI message string. Convert these string to the appropriate type
         using the annotations and call the handler method.
         """
-        new_args = [
-            annotation_type(value)
-            for annotation_type, value in zip(self.annotations, args)
-        ]
+        return self.call(mocker_self, args)
 
-        return self.method(mocker_self, *new_args)
 
+DEFAULT_CACHE_SIZE = 512
 
-__tmp_scpi_dict__: Dict[str, SCPIHandler] = {}
+# Every change of the state of a mocker gives it a new version, see
+# `visa_mock.base.snapshot`
+_state_versions = count(1)
+# Dispatch indexes of classes may build those of their sub-modules
+_index_lock = threading.RLock()
 
 
 class MockerMetaClass(type):
     """
     We need a custom metaclass as right after class declaration
     we need to modify class attributes: The `__scpi_dict__` needs
-    to be populated
-    """
+    to be populated from the handlers the `scpi` decorator left in the class
+    namespace, on top of the handlers of the base classes. Because the
+    handlers are collected from the namespace of the class being built,
+    classes can safely be created concurrently from several threads.
+
+    The dispatch index of a class (`__scpi_index__`), and with it the
+    evaluation of the annotations of its handlers, is built when the first
+    message is sent, so importing large libraries of mocker classes is fast.
 
-    def __new__(cls, *args, **kwargs):
-        mocker_class = super().__new__(cls, *args, **kwargs)
-        mocker_class.__scpi_dict__ = dict(__tmp_scpi_dict__)
+    Overlapping SCPI patterns are detected while building the index. By
+    default, a message matching more than one of the overlapping patterns
+    raises a `MockingError` when it is sent. With `strict=True`, the index is
+    built right away, e.g.
 
-        names = list(__tmp_scpi_dict__.keys())
-        for name in names:
-            __tmp_scpi_dict__.pop(name)
+        class Mocker(BaseMocker, strict=True):
+            ...
+
+    the class definition itself raises a `MockingError`.
+
+    Routes of dispatched messages are cached per class. The maximum number of
+    cached messages is set with the `cache_size` keyword in the same way.
+    """
+
+    def __new__(
+            cls,
+            name,
+            bases,
+            namespace,
+            strict: bool = False,
+            cache_size: int = DEFAULT_CACHE_SIZE
+    ):
+        # Handlers are inherited, and overridden by handlers of the same
+        # pattern in the subclass
+        scpi_dict = {}
+        for base in reversed(bases):
+            scpi_dict.update(getattr(base, "__scpi_dict__", {}))
+        namespace = dict(namespace)
+
+        for attribute, value in list(namespace.items()):
+            if isinstance(value, SCPIHandler):
+                scpi_dict[value.scpi_string] = value
+                namespace[attribute] = value.method
+
+        mocker_class = super().__new__(cls, name, bases, namespace)
+        mocker_class.__scpi_dict__ = scpi_dict
+        mocker_class._dispatch_index = None
+
+        if strict:
+            index = mocker_class.__scpi_index__
+            if index.overlaps:
+                overlapping = ", ".join(sorted(index.overlaps))
+                raise MockingError(
+                    f"Mocker class {mocker_class.__name__} has overlapping SCPI "
+                    f"patterns: {overlapping}"
+                )
 
+        mocker_class.__scpi_cache__ = ResolutionCache(cache_size)
         return mocker_class
 
+    @property
+    def __scpi_index__(cls) -> DispatchIndex:
+        """
+        The dispatch index of the class, built when it is first needed
+        """
+        index = cls.__dict__["_dispatch_index"]
+        if index is not None:
+            return index
+
+        with _index_lock:
+            index = cls.__dict__["_dispatch_index"]
+            if index is None:
+                index = DispatchIndex(cls.__scpi_dict__)
+                cls._dispatch_index = index
+
+        return index
+
 
 class BaseMocker(metaclass=MockerMetaClass):
+    """
+    Base class of all mockers.
+
+    Mockers can be shared by several threads and sessions. Handlers of a
+    mocker, including those of its sub-modules, are executed while holding
+    the lock of the mocker (`mocker.lock`), so a handler never observes a
+    state which another handler is halfway through changing. Call delays
+    happen outside the lock, after the handlers have run. Resolving a
+    message to its handlers does not take the lock.
+
+    The base class has slots, so subclasses declaring `__slots__` for their
+    own state have no instance `__dict__`, see `visa_mock.base.channels`.
+    """
+    __slots__ = (
+        "_call_delay", "_handler_delays", "_timing", "_clock",
+        "_delay_per_command", "_reply_cache", "lock", "_version", "__weakref__"
+    )
     __scpi_dict__: Dict[str, Callable] = {}
+    __scpi_index__: DispatchIndex
+    __scpi_cache__: ResolutionCache
 
-    def __init__(self, call_delay: float = 0.0):
+    def __init__(
+            self,
+            call_delay: float = 0.0,
+            clock: Optional[Clock] = None,
+            timing: Optional[TimingModel] = None
+    ):
         self._call_delay = call_delay
+        # Call delays of single commands, set with `set_call_delay`
+        self._handler_delays: Optional[Dict[SCPIHandler, float]] = None
+        self._timing = timing
+        self._reply_cache: Optional[ReplyCache] = None
+        self._clock = clock
+        self._delay_per_command = True
+        self.lock = threading.RLock()
+        self._version = 0
+
+    @property
+    def clock(self) -> Clock:
+        """
+        The clock enforcing the call delays. Unless a clock was given to the
+        mocker, this is the default clock (see `visa_mock.base.clock`).
+        """
+        if self._clock is None:
+            return get_clock()
+        return self._clock
+
+    @clock.setter
+    def clock(self, clock: Optional[Clock]) -> None:
+        self._clock = clock
+
+    @property
+    def timing(self) -> Optional[TimingModel]:
+        """
+        The timing model of the mocker, see `visa_mock.base.timing`. Without
+        a model, a command is delayed by its call delay.
+        """
+        return self._timing
+
+    @timing.setter
+    def timing(self, timing: Optional[TimingModel]) -> None:
+        self.mark_changed()
+        self._timing = timing
 
     def set_call_delay(
             self,
@@ -157,69 +351,512 @@ class BaseMocker(metaclass=MockerMetaClass):
         This method set the call delay to either the whole instrument, or the
         scpi command specified.
 
+        Call delays apply to this mocker instance only. With a timing model,
+        the call delay of a command is added to the latency of the model.
+
         Args:
             call_delay: the intended delay value in second.
             scpi_string: when provided, this method will apply the call_delay
-                to this scpi command only.
+                to this scpi command only. A delay of None removes it.
         """
+        self.mark_changed()
         if scpi_string is None:
             self._call_delay = call_delay
-        else:
-            self.__scpi_dict__[scpi_string].call_delay = call_delay
+            return
+
+        handler = self._find_handler(scpi_string)
+        with self.lock:
+            if self._handler_delays is None:
+                self._handler_delays = {}
+            if call_delay is None:
+                self._handler_delays.pop(handler, None)
+            else:
+                self._handler_delays[handler] = call_delay
+
+    def set_batch_delay_mode(self, per_command: bool) -> None:
+        """
+        Choose how call delays apply to compound messages such as
+        ":VOLT 1;:CURR 2". By default every command is delayed by its own
+        call delay. With `per_command=False` the whole message is delayed
+        once, by the longest call delay of its commands.
+        """
+        self._delay_per_command = per_command
+
+    def snapshot(self) -> 'Snapshot':
+        """
+        Capture the state of the mocker and of its sub-modules, see
+        `visa_mock.base.snapshot`
+        """
+        from visa_mock.base.snapshot import Snapshot
+        return Snapshot(self)
+
+    def restore(self, snapshot: 'Snapshot') -> int:
+        """
+        Restore a snapshot taken with `snapshot`. Only mockers whose state
+        changed since the snapshot are restored; their number is returned.
+        """
+        return snapshot.restore()
+
+    def mark_changed(self) -> None:
+        """
+        Handlers mark the mocker they run on as changed. Call this after
+        changing the state of a mocker in another way, so that the change is
+        undone by restoring a snapshot. Cached replies are dropped.
+        """
+        self._version = next(_state_versions)
+        self.clear_reply_cache()
+
+    def reply_cache_info(self) -> ReplyCacheInfo:
+        """
+        Hit, miss and invalidation counts and size of the cache of replies of
+        cacheable queries, see `visa_mock.base.reply_cache`
+        """
+        if self._reply_cache is None:
+            return ReplyCacheInfo(0, 0, 0, 0)
+        return self._reply_cache.info()
+
+    def clear_reply_cache(self) -> None:
+        with self.lock:
+            if self._reply_cache is not None:
+                self._reply_cache.clear()
 
     @classmethod
-    def scpi(cls, scpi_string: str) -> Callable:
-        def decorator(function):
-            handler = SCPIHandler.from_method(function)
-            return_type = handler.return_type
+    def scpi_cache_info(cls) -> CacheInfo:
+        """
+        Hit and miss counts and size of the cache of resolved SCPI messages
+        """
+        return cls.__scpi_cache__.info()
 
-            if not isinstance(return_type, MockerMetaClass):
-                __tmp_scpi_dict__[scpi_string] = handler
-                return
+    @classmethod
+    def set_scpi_cache_size(cls, cache_size: int) -> None:
+        """
+        Set the maximum number of resolved SCPI messages cached for this
+        class. A size of zero disables the cache.
+        """
+        cls.__scpi_cache__.resize(cache_size)
 
-            # The function being decorated itself returns a Mocker. This is very
-            # useful as it allows mockers to be modular. Further processing of the
-            # scpi string will be handled by the submodule.
-            # For an example, see instruments.py in the folder 'tests\mock_instruments\'
-            # and specifically study the class 'Mocker3'
+    @classmethod
+    def invalidate_scpi_cache(cls) -> None:
+        """
+        Clear the resolved SCPI message caches of all mocker classes and drop
+        the dispatch indexes of this class and its subclasses, which are
+        built again by the next message. Call this on a mocker class after
+        changing its handlers (its `__scpi_dict__`), or on `BaseMocker` to
+        rebuild the indexes of all classes.
+        """
+        with _index_lock:
+            classes = [cls]
+            while classes:
+                mocker_class = classes.pop()
+                mocker_class._dispatch_index = None
+                classes.extend(mocker_class.__subclasses__())
 
-            SubModule = cast(MockerMetaClass, return_type)
+        ResolutionCache.clear_all()
 
-            for scpi_sub_string, sub_handler in SubModule.__scpi_dict__.items():
-                __tmp_scpi_dict__[scpi_string + scpi_sub_string] = SCPIHandler.combine(
-                    handler, sub_handler
+    @classmethod
+    def _find_handler(cls, scpi_string: str) -> SCPIHandler:
+        """
+        Find the handler of a scpi string as given in the `scpi` decorator.
+        Handlers of sub-modules are found by concatenating the scpi strings
+        of the parent and sub-module handlers, e.g. ":INSTR(.*):VOLT\\?".
+        """
+        if scpi_string in cls.__scpi_dict__:
+            return cls.__scpi_dict__[scpi_string]
+
+        for parent_string, handler in cls.__scpi_dict__.items():
+            if handler.sub_module is None:
+                continue
+            if not scpi_string.startswith(parent_string):
+                continue
+
+            try:
+                return handler.sub_module._find_handler(
+                    scpi_string[len(parent_string):]
                 )
+            except KeyError:
+                pass
+
+        raise KeyError(scpi_string)
+
+    @classmethod
+    def scpi(
+            cls,
+            scpi_string: str,
+            separator: str = ",",
+            number_format: Optional[str] = None,
+            chunk_size: Optional[int] = None,
+            binary: Optional[bool] = None,
+            cacheable: bool = False,
+            tags: Iterable[str] = (),
+            invalidates: Iterable[str] = (),
+            blocking: bool = False
+    ) -> Callable:
+        """
+        Decorate a handler method for SCPI strings matching `scpi_string`.
+
+        The `separator`, `number_format`, `chunk_size` and `binary` arguments
+        specify how arrays of numbers returned by the handler are replied,
+        see `visa_mock.base.conversion.ArrayFormat`.
+
+        The reply of a `cacheable` handler is cached per mocker instance
+        until a handler which `invalidates` one of its `tags` runs, see
+        `visa_mock.base.reply_cache`.
+
+        A `blocking` handler may wait a long time, e.g. for operations to
+        complete. `asend` runs messages with blocking handlers in the default
+        executor, so they do not block the event loop.
+
+        The pattern is compiled when the dispatch index of the class is
+        built, so an invalid pattern raises a `MockingError` when the first
+        message is sent (or when the class is created, with `strict=True`).
+        """
+        array_format = None
+        if (separator, number_format, chunk_size, binary) != (",", None, None, None):
+            array_format = ArrayFormat(separator, number_format, chunk_size, binary)
+
+        tags = frozenset(tags)
+        if tags and not cacheable:
+            raise MockingError(f"Tags of {scpi_string} require cacheable=True")
+
+        def decorator(function):
+            # If the function being decorated itself returns a Mocker, further
+            # processing of the scpi string will be handled by the submodule.
+            # This is very useful as it allows mockers to be modular. For an
+            # example, see instruments.py in the folder 'tests\mock_instruments\'
+            # and specifically study the class 'Mocker3'
+            handler = SCPIHandler.from_method(function, array_format)
+            handler.scpi_string = scpi_string
+            handler.cacheable = cacheable
+            handler.tags = tags
+            handler.invalidates = frozenset(invalidates)
+            handler.blocking = blocking
+            return handler
 
         return decorator
 
     def send(self, scpi_string: str) -> Any:
 
-        found = False
-        args = None
-        handler = None
-
-        for regex_pattern in self.__scpi_dict__:
-            search_result = re.search(regex_pattern, scpi_string)
-            if search_result:
-                if not found:
-                    found = True
-                    handler = self.__scpi_dict__[regex_pattern]
-                    args = search_result.groups()
-                else:
-                    raise MockingError(
-                        f"SCPI command {scpi_string} matches multiple mocker "
-                        f"class entries"
-                    )
-
-        if not found:
+        if ";" in scpi_string:
+            return self.send_batch(scpi_string)
+
+        route, dispatch_time = self._timed_resolve(scpi_string)
+        reply, delay = self._execute(route, scpi_string, dispatch_time)
+        self.clock.sleep(delay)
+        return reply
+
+    async def asend(self, scpi_string: str) -> Any:
+        """
+        Like `send`, but the call delay suspends the calling task instead of
+        blocking the event loop.
+        """
+        if ";" in scpi_string:
+            return await self.asend_batch(scpi_string)
+
+        route, dispatch_time = self._timed_resolve(scpi_string)
+        if self._blocks(route):
+            return await self._send_in_executor(scpi_string)
+
+        reply, delay = self._execute(route, scpi_string, dispatch_time)
+        await self.clock.asleep(delay)
+        return reply
+
+    @staticmethod
+    def _blocks(route: Route) -> bool:
+        return any(handler.blocking for handler, _ in route)
+
+    async def _send_in_executor(self, scpi_string: str) -> Any:
+        """
+        Send a message with blocking handlers from a thread of the default
+        executor
+        """
+        import asyncio
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.send, scpi_string)
+
+    def send_batch(self, scpi_string: str) -> Any:
+        """
+        Send a compound message of semicolon separated commands, see
+        `visa_mock.base.dispatch.split_message`. All commands are resolved
+        before the first one is executed. The replies of the queries are
+        joined with semicolons.
+        """
+        commands = split_message(scpi_string)
+        resolved = [self._timed_resolve(command) for command in commands]
+
+        if not self._delay_per_command:
+            reply, delay = self._execute_batch(commands, resolved)
+            self.clock.sleep(delay)
+            return reply
+
+        replies = []
+        for command, (route, dispatch_time) in zip(commands, resolved):
+            reply, delay = self._execute(route, command, dispatch_time)
+            self.clock.sleep(delay)
+            replies.append(reply)
+
+        return self._join_replies(replies)
+
+    async def asend_batch(self, scpi_string: str) -> Any:
+        """
+        Like `send_batch`, but call delays suspend the calling task
+        """
+        commands = split_message(scpi_string)
+        resolved = [self._timed_resolve(command) for command in commands]
+
+        if any(self._blocks(route) for route, _ in resolved):
+            return await self._send_in_executor(scpi_string)
+
+        if not self._delay_per_command:
+            reply, delay = self._execute_batch(commands, resolved)
+            await self.clock.asleep(delay)
+            return reply
+
+        replies = []
+        for command, (route, dispatch_time) in zip(commands, resolved):
+            reply, delay = self._execute(route, command, dispatch_time)
+            await self.clock.asleep(delay)
+            replies.append(reply)
+
+        return self._join_replies(replies)
+
+    def _execute_batch(
+            self,
+            commands: List[str],
+            resolved: List[Tuple[Route, float]]
+    ) -> Tuple[Optional[Reply], float]:
+        """
+        Execute all commands of a batch under the lock. The delay of the
+        batch is the longest delay of its commands.
+        """
+        with self.lock:
+            replies = []
+            batch_delay = 0.0
+            for command, (route, dispatch_time) in zip(commands, resolved):
+                reply, delay = self._execute(route, command, dispatch_time)
+                replies.append(reply)
+                batch_delay = max(batch_delay, delay)
+
+            return self._join_replies(replies), batch_delay
+
+    @staticmethod
+    def _join_replies(replies: List[Optional[Reply]]) -> Optional[Reply]:
+        replies = [reply for reply in replies if reply is not None]
+
+        if not replies:
+            return None
+        if len(replies) == 1:
+            return replies[0]
+
+        texts = []
+        for reply in replies:
+            if isinstance(reply, BinaryBlock):
+                reply = bytes(reply).decode("latin-1")
+            elif isinstance(reply, ChunkedReply):
+                reply, _ = reply.read()
+            texts.append(reply)
+
+        return ";".join(texts)
+
+    def _resolve(self, scpi_string: str) -> Route:
+        route = self.__scpi_cache__.get(scpi_string)
+
+        if route is None:
+            index = type(self).__scpi_index__
+            route = index.resolve(scpi_string)
+
+            if route is None:
+                route = self._search(index, scpi_string)
+
+            self.__scpi_cache__.put(scpi_string, route)
+
+        return route
+
+    @staticmethod
+    def _search(index: DispatchIndex, scpi_string: str) -> Route:
+        """
+        Resolve a message which no pattern matches from its start by
+        searching the patterns anywhere in the message, as before the
+        dispatch index. Deprecated, see the warning.
+        """
+        found = index.search(scpi_string)
+        if found is None:
             raise ValueError(f"Unknown SCPI command {scpi_string}")
 
-        if handler.call_delay is not None:
-            time.sleep(handler.call_delay)
-        else:
-            time.sleep(self._call_delay)
+        pattern, route = found
+        warnings.warn(
+            f"SCPI command {scpi_string} only matches the pattern {pattern} "
+            f"after its start. Patterns are matched from the start of messages; "
+            f"matching them anywhere in a message is deprecated and will be "
+            f"removed in a future version. Add the start of the message to "
+            f"the pattern, or '.*' to keep matching anywhere.",
+            DeprecationWarning
+        )
+        return route
+
+    def _get_call_delay(self, route: Route) -> float:
+        handler = route[-1][0]
+
+        if self._handler_delays is not None:
+            delay = self._handler_delays.get(handler)
+            if delay is not None:
+                return delay
+
+        return self._call_delay
+
+    def _delay(self, route: Route, scpi_string: str, reply: Optional[Reply]) -> float:
+        """
+        The delay of a command: its call delay or, with a timing model, the
+        delay given by the model.
+        """
+        call_delay = self._get_call_delay(route)
+
+        if self._timing is None:
+            return call_delay
 
-        return str(handler(self, *args))
+        byte_count = len(scpi_string) + reply_size(reply)
+        return self._timing.delay(call_delay, byte_count, self.clock.time())
+
+    def _timed_resolve(self, scpi_string: str) -> Tuple[Route, float]:
+        """
+        Resolve a message and, if metrics are being collected, measure the
+        time it took.
+        """
+        if metrics.collector is None:
+            return self._resolve(scpi_string), 0.0
+
+        start = perf_counter()
+        route = self._resolve(scpi_string)
+        return route, perf_counter() - start
+
+    def _execute(
+            self,
+            route: Route,
+            scpi_string: str,
+            dispatch_time: float = 0.0
+    ) -> Tuple[Optional[Reply], float]:
+        """
+        Execute a resolved command under the lock.
+
+        Returns:
+            The reply and the delay before it is available
+        """
+        collector = metrics.collector
+        if collector is not None:
+            return self._measured_execute(collector, route, scpi_string, dispatch_time)
+
+        handler = route[-1][0]
+        with self.lock:
+            if handler.cacheable:
+                reply = self._cached_reply(route)
+            else:
+                reply = handler.format_reply(self._call_route(route))
+            return reply, self._delay(route, scpi_string, reply)
+
+    def _cached_reply(self, route: Route) -> Optional[Reply]:
+        if self._reply_cache is None:
+            self._reply_cache = ReplyCache()
+
+        reply = self._reply_cache.get(route)
+        if reply is MISSING:
+            handler = route[-1][0]
+            reply = handler.format_reply(self._call_route(route))
+            reply = self._reply_cache.put(route, reply, handler.tags)
+
+        return reply
+
+    def _measured_execute(
+            self,
+            collector: metrics.MetricsCollector,
+            route: Route,
+            scpi_string: str,
+            dispatch_time: float
+    ) -> Tuple[Optional[Reply], float]:
+        """
+        Like `_execute`, but the time spent converting arguments and replies
+        and running the handlers is measured and recorded in `collector`.
+        """
+        conversion_time = 0.0
+        handler_time = 0.0
+
+        with self.lock:
+            reply = MISSING
+            if route[-1][0].cacheable:
+                if self._reply_cache is None:
+                    self._reply_cache = ReplyCache()
+                reply = self._reply_cache.get(route)
+
+            if reply is MISSING:
+                reply, conversion_time, handler_time = self._measured_call(route)
+
+            delay = self._delay(route, scpi_string, reply)
+
+        collector.record_command(
+            "".join(handler.scpi_string for handler, _ in route),
+            bytes_in=len(scpi_string),
+            bytes_out=reply_size(reply),
+            dispatch=dispatch_time,
+            conversion=conversion_time,
+            handler=handler_time,
+            delay=delay
+        )
+        return reply, delay
+
+    def _measured_call(self, route: Route) -> Tuple[Optional[Reply], float, float]:
+        """
+        Call the handlers of a route and format the reply.
+
+        Returns:
+            The reply, the time spent converting and the time spent in the
+            handlers
+        """
+        # Conversion and handler time
+        times = [0.0, 0.0]
+
+        def call(handler: SCPIHandler, mocker: 'BaseMocker', args: Tuple[str, ...]) -> Any:
+            start = perf_counter()
+            converted = handler.convert_args(args)
+            converted_at = perf_counter()
+            result = handler.method(mocker, *converted)
+            times[0] += converted_at - start
+            times[1] += perf_counter() - converted_at
+            return result
+
+        mocker = self._call_route(route, call)
+
+        start = perf_counter()
+        handler = route[-1][0]
+        reply = handler.format_reply(mocker)
+        if handler.cacheable:
+            reply = self._reply_cache.put(route, reply, handler.tags)
+        times[0] += perf_counter() - start
+
+        return reply, times[0], times[1]
+
+    def _call_route(
+            self,
+            route: Route,
+            call: Optional[Callable[[SCPIHandler, 'BaseMocker', Tuple[str, ...]], Any]] = None
+    ) -> Any:
+        """
+        Call the handlers of a route: every handler but the last one returns
+        the submodule the next one is called on.
+
+        Args:
+            route: the resolved route
+            call: if given, called as `call(handler, mocker, args)` instead of
+                `handler.call(mocker, args)`, e.g. to measure the handlers
+        """
+        mocker = self
+        for handler, args in route:
+            mocker._version = next(_state_versions)
+            if handler.invalidates and self._reply_cache is not None:
+                self._reply_cache.invalidate(handler.invalidates)
+            if call is None:
+                mocker = handler.call(mocker, args)
+            else:
+                mocker = call(handler, mocker, args)
+
+        return mocker
 
 
 scpi = BaseMocker.scpi
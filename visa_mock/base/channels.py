@@ -0,0 +1,135 @@
+"""
+Compact containers for the state of mockers with many channels, for
+simulations of large numbers of instruments.
+
+A `ChannelArray` stores one number per channel in an `array.array`, i.e. 8
+bytes per channel for floats, instead of a dict of float objects. The
+`Submodules` of a mocker are only instantiated when a message addresses
+them. Together with `__slots__` (`BaseMocker` has slots, so subclasses
+declaring `__slots__` have no instance `__dict__`), e.g.
+
+    class Source(BaseMocker):
+        __slots__ = ("_voltage",)
+
+        def __init__(self) -> None:
+            super().__init__()
+            self._voltage = ChannelArray(64)
+
+        @scpi(r":CHANNEL(\\d+):VOLT\\?")
+        def _get_voltage(self, channel: int) -> float:
+            return self._voltage[channel]
+
+an instrument takes a fraction of the memory of a dict based one, see
+`python -m benchmarks.bench_memory`.
+"""
+from array import array
+from typing import Callable, Generic, Iterator, List, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+class ChannelArray:
+    """
+    Numbers indexed by channel number, stored in a typed array.
+
+    Args:
+        count: the number of channels
+        default: the initial value of all channels
+        first: the number of the first channel
+        typecode: the `array.array` type code, "d" (float) by default
+    """
+    __slots__ = ("first", "_values")
+
+    def __init__(
+            self,
+            count: int,
+            default: float = 0.0,
+            first: int = 1,
+            typecode: str = "d"
+    ) -> None:
+        self.first = first
+        self._values = array(typecode, [default]) * count
+
+    def _position(self, channel: int) -> int:
+        position = channel - self.first
+        if not 0 <= position < len(self._values):
+            raise ValueError(f"Invalid channel {channel}")
+        return position
+
+    def __copy__(self) -> 'ChannelArray':
+        copied = ChannelArray.__new__(ChannelArray)
+        copied.first = self.first
+        copied._values = array(self._values.typecode, self._values)
+        return copied
+
+    def __getitem__(self, channel: int) -> float:
+        return self._values[self._position(channel)]
+
+    def __setitem__(self, channel: int, value: float) -> None:
+        self._values[self._position(channel)] = value
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def __iter__(self) -> Iterator[float]:
+        return iter(self._values)
+
+    def channels(self) -> range:
+        return range(self.first, self.first + len(self._values))
+
+    def values(self) -> array:
+        """
+        The underlying array, e.g. to reply all channels at once
+        """
+        return self._values
+
+
+class Submodules(Generic[T]):
+    """
+    Sub-modules indexed by number, each created by `factory` when it is
+    first addressed.
+
+    Args:
+        factory: a mocker class or other callable returning a sub-module
+        count: the number of sub-modules
+        first: the number of the first sub-module
+    """
+    __slots__ = ("factory", "first", "_modules")
+
+    def __init__(self, factory: Callable[[], T], count: int, first: int = 1) -> None:
+        self.factory = factory
+        self.first = first
+        self._modules: List[Optional[T]] = [None] * count
+
+    def __copy__(self) -> 'Submodules[T]':
+        """
+        A copy referring to the same sub-modules
+        """
+        copied = Submodules.__new__(Submodules)
+        copied.factory = self.factory
+        copied.first = self.first
+        copied._modules = list(self._modules)
+        return copied
+
+    def __getitem__(self, number: int) -> T:
+        position = number - self.first
+        if not 0 <= position < len(self._modules):
+            raise ValueError(f"Invalid sub-module number {number}")
+
+        module = self._modules[position]
+        if module is None:
+            module = self._modules[position] = self.factory()
+        return module
+
+    def __len__(self) -> int:
+        return len(self._modules)
+
+    def created(self) -> List[Tuple[int, T]]:
+        """
+        The numbers and sub-modules created so far
+        """
+        return [
+            (position + self.first, module)
+            for position, module in enumerate(self._modules)
+            if module is not None
+        ]
@@ -0,0 +1,126 @@
+"""
+Clocks used by mockers to enforce call delays.
+
+The default `RealClock` blocks the calling thread for the duration of a delay.
+A `SimulatedClock` instead advances a virtual time, so that suites modelling
+slow instruments run without waiting while the time seen by client code
+(through `Clock.time`) still progresses as if the delays had happened.
+
+All clocks also have an `asleep` coroutine for use by the asyncio API, which
+suspends the calling task instead of blocking the event loop.
+
+A clock can be given to a single mocker (`BaseMocker(clock=...)`) or set
+as the default for all mockers with `set_clock`.
+"""
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Optional
+
+
+class Clock(ABC):
+    """
+    Interface of all clocks
+    """
+
+    @abstractmethod
+    def time(self) -> float:
+        """
+        The current time in seconds
+        """
+
+    @abstractmethod
+    def sleep(self, seconds: float) -> None:
+        """
+        Let `seconds` pass
+        """
+
+    @abstractmethod
+    async def asleep(self, seconds: float) -> None:
+        """
+        Let `seconds` pass without blocking the event loop
+        """
+
+    @abstractmethod
+    def wait(self, condition: threading.Condition, seconds: Optional[float]) -> None:
+        """
+        Wait until `condition` is notified or `seconds` have passed (forever
+        if None). The lock of the condition must be held.
+        """
+
+
+class RealClock(Clock):
+    """
+    Wall clock time. Sleeping blocks the calling thread.
+    """
+
+    def time(self) -> float:
+        return time.monotonic()
+
+    def sleep(self, seconds: float) -> None:
+        if seconds > 0:
+            time.sleep(seconds)
+
+    async def asleep(self, seconds: float) -> None:
+        if seconds > 0:
+            # Imported here, as importing asyncio slows down importing mockers
+            import asyncio
+            await asyncio.sleep(seconds)
+
+    def wait(self, condition: threading.Condition, seconds: Optional[float]) -> None:
+        condition.wait(seconds)
+
+
+class SimulatedClock(Clock):
+    """
+    Virtual time. Sleeping advances the time without blocking.
+
+    Args:
+        start: the initial time in seconds
+    """
+
+    def __init__(self, start: float = 0.0) -> None:
+        self._now = start
+        self._lock = threading.Lock()
+
+    def time(self) -> float:
+        return self._now
+
+    def sleep(self, seconds: float) -> None:
+        if seconds > 0:
+            self.advance(seconds)
+
+    async def asleep(self, seconds: float) -> None:
+        import asyncio
+        self.sleep(seconds)
+        # Give other tasks a chance to run, as a real sleep would
+        await asyncio.sleep(0)
+
+    def wait(self, condition: threading.Condition, seconds: Optional[float]) -> None:
+        """
+        Let `seconds` pass. Without a time limit, wait for `condition` to be
+        notified by another thread.
+        """
+        if seconds is None:
+            condition.wait()
+        else:
+            self.sleep(seconds)
+
+    def advance(self, seconds: float) -> None:
+        with self._lock:
+            self._now += seconds
+
+
+_clock: Clock = RealClock()
+
+
+def get_clock() -> Clock:
+    """
+    The clock used by mockers without a clock of their own
+    """
+    return _clock
+
+
+def set_clock(clock: Clock) -> None:
+    global _clock
+    _clock = clock
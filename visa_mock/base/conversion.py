@@ -0,0 +1,363 @@
+"""
+Conversion of SCPI argument strings to the annotated argument types of
+handler methods and of handler return values to SCPI reply strings.
+
+The converters and formatter of a handler are chosen once, when the handler
+is first used, based on the type annotations of the handler method.
+
+Binary return values (bytes, bytearray, memoryview or NumPy arrays) are
+replied as IEEE 488.2 definite length blocks. The block keeps a view on
+immutable buffers (bytes or read-only buffers) rather than a copy; mutable
+buffers are copied, so that handlers can keep changing them.
+
+Arrays of numbers (lists, tuples, `array.array`s and, if requested, NumPy
+arrays) are replied as separated ASCII values, see `ArrayFormat`. Very large
+arrays can be formatted in chunks while the reply is being read.
+"""
+import array
+from enum import Enum
+from typing import Any, Callable, Iterator, List, Optional, Tuple, Union
+
+_BINARY_TYPES = (bytes, bytearray, memoryview)
+_ARRAY_TYPES = (list, tuple, array.array)
+
+
+class BinaryBlock:
+    """
+    An IEEE 488.2 definite length block "#<n><length><data>", where <n> is the
+    number of digits of <length>. `payload` is a byte view on the buffer the
+    block was created from if the buffer is immutable, e.g. bytes. Mutable
+    buffers (bytearray, writable NumPy arrays) are copied: a view would keep
+    them from being resized while the reply is queued or cached, and would
+    let later changes alter the reply.
+    """
+    __slots__ = ("header", "payload")
+
+    def __init__(self, data: Any) -> None:
+        payload = memoryview(data)
+        if not (payload.readonly and payload.c_contiguous):
+            copy = payload.tobytes()
+            payload.release()
+            payload = memoryview(copy)
+
+        self.payload = payload.cast("B")
+        length = str(self.payload.nbytes)
+        self.header = f"#{len(length)}{length}".encode("ascii")
+
+    def __len__(self) -> int:
+        return len(self.header) + self.payload.nbytes
+
+    def __bytes__(self) -> bytes:
+        return self.header + self.payload.tobytes()
+
+    def __getitem__(self, item: slice) -> Union[bytes, memoryview]:
+        """
+        Slice the block. A slice within the payload is a view on it; a slice
+        including (part of) the header is a copy.
+        """
+        start, stop, _ = item.indices(len(self))
+        header_length = len(self.header)
+
+        if start >= header_length:
+            return self.payload[start - header_length:stop - header_length]
+
+        return self.header[start:stop] + self.payload[:max(stop - header_length, 0)]
+
+
+class ChunkedReply:
+    """
+    A text reply which is generated chunk by chunk as it is being read, such
+    that only the chunks not yet read completely are held in memory.
+
+    Args:
+        chunks: the chunks of the reply
+        measure: if given, returns the length of the whole reply without
+            keeping it in memory, e.g. by formatting the chunks once more.
+            See `size`.
+    """
+    __slots__ = ("_chunks", "_buffer", "_measure", "_size", "_read_count")
+
+    def __init__(
+            self,
+            chunks: Iterator[str],
+            measure: Optional[Callable[[], int]] = None
+    ) -> None:
+        self._chunks = chunks
+        self._buffer = ""
+        self._measure = measure
+        self._size: Optional[int] = None
+        self._read_count = 0
+
+    def __len__(self) -> int:
+        """
+        The length of the part of the reply formatted so far and not read
+        """
+        return len(self._buffer)
+
+    @property
+    def size(self) -> int:
+        """
+        The length of the whole reply, including the part already read.
+        Without a `measure` function, the chunks not formatted yet are
+        formatted into the buffer to count them.
+        """
+        if self._size is None:
+            if self._measure is not None:
+                self._size = self._measure()
+            else:
+                self._buffer += "".join(self._chunks)
+                self._size = self._read_count + len(self._buffer)
+        return self._size
+
+    def read(self, count: Optional[int] = None) -> Tuple[str, bool]:
+        """
+        Read at most `count` characters.
+
+        Returns:
+            The data read and whether the end of the reply has been reached.
+        """
+        if count is None:
+            data = self._buffer + "".join(self._chunks)
+            self._buffer = ""
+            self._read_count += len(data)
+            return data, True
+
+        while len(self._buffer) <= count:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                data = self._buffer
+                self._buffer = ""
+                self._read_count += len(data)
+                return data, True
+            self._buffer += chunk
+
+        data = self._buffer[:count]
+        self._buffer = self._buffer[count:]
+        self._read_count += count
+        return data, False
+
+
+Reply = Union[str, BinaryBlock, ChunkedReply]
+Converter = Callable[[str], Any]
+Formatter = Callable[[Any], Optional[Reply]]
+
+
+def reply_size(reply: Optional[Reply]) -> int:
+    """
+    The number of characters (or bytes, for binary blocks) of a whole reply
+    """
+    if reply is None:
+        return 0
+    if isinstance(reply, ChunkedReply):
+        return reply.size
+    return len(reply)
+
+
+_TRUE_STRINGS = frozenset(("1", "ON", "TRUE"))
+_FALSE_STRINGS = frozenset(("0", "OFF", "FALSE"))
+
+
+def _identity(value: Any) -> Any:
+    return value
+
+
+def parse_bool(value: str) -> bool:
+    """
+    Parse a SCPI boolean: "ON", "OFF", "1", "0" or a number, which is true
+    if it rounds to a non-zero value.
+    """
+    normalized = value.strip().upper()
+
+    if normalized in _TRUE_STRINGS:
+        return True
+    if normalized in _FALSE_STRINGS:
+        return False
+
+    try:
+        return round(float(normalized)) != 0
+    except ValueError:
+        raise ValueError(f"Invalid SCPI boolean {value}")
+
+
+def _enum_converter(enum_type: Any) -> Converter:
+    members = {}
+    for member in enum_type:
+        members[member.name.upper()] = member
+        members[str(member.value).upper()] = member
+
+    def convert(value: str) -> Any:
+        try:
+            return members[value.strip().upper()]
+        except KeyError:
+            raise ValueError(f"Invalid value {value} for {enum_type.__name__}")
+
+    return convert
+
+
+def converter(annotation: Any) -> Converter:
+    """
+    Return a function converting an argument string to the annotated type
+    """
+    if annotation is str:
+        return _identity
+    if annotation in (int, float):
+        return annotation
+    if annotation is bool:
+        return parse_bool
+    if isinstance(annotation, type) and issubclass(annotation, Enum):
+        return _enum_converter(annotation)
+
+    return annotation
+
+
+def _format_none(value: Any) -> None:
+    return None
+
+
+def _format_bool(value: Any) -> str:
+    return "1" if value else "0"
+
+
+def _format_enum(value: Any) -> str:
+    return str(value.value)
+
+
+def _is_ndarray_type(return_type: Any) -> bool:
+    return (
+        getattr(return_type, "__module__", None) == "numpy"
+        and getattr(return_type, "__name__", None) == "ndarray"
+    )
+
+
+def _is_array_type(return_type: Any) -> bool:
+    if return_type in _ARRAY_TYPES:
+        return True
+    # Generic aliases like List[float]
+    return getattr(return_type, "__origin__", None) in (list, tuple, List, Tuple)
+
+
+def _copy_values(values: Any) -> Any:
+    """
+    A copy of an array of values, of the same kind where slicing it is cheap
+    """
+    if isinstance(values, tuple):
+        return values
+    if isinstance(values, array.array):
+        return values[:]
+    if _is_ndarray_type(type(values)):
+        return values.copy()
+    return tuple(values)
+
+
+class ArrayFormat:
+    """
+    Formatting of arrays of numbers as ASCII replies.
+
+    Args:
+        separator: placed between the values
+        number_format: a format specification (e.g. ".6e") applied to every
+            value. By default values are formatted with `str`.
+        chunk_size: if given, arrays with more values are formatted this many
+            values at a time while the reply is being read, which bounds the
+            memory used by the reply.
+        binary: reply NumPy arrays as binary blocks (the default) or, if
+            False, as ASCII values.
+    """
+    __slots__ = ("separator", "number_format", "chunk_size", "binary", "_format")
+
+    def __init__(
+            self,
+            separator: str = ",",
+            number_format: Optional[str] = None,
+            chunk_size: Optional[int] = None,
+            binary: Optional[bool] = None
+    ) -> None:
+        self.separator = separator
+        self.number_format = number_format
+        self.chunk_size = chunk_size
+        self.binary = binary
+
+        if number_format is None:
+            self._format: Callable[[Any], str] = str
+        else:
+            self._format = ("{:" + number_format + "}").format
+
+    def __call__(self, values: Any) -> Optional[Reply]:
+        if values is None:
+            return None
+
+        if _is_ndarray_type(type(values)):
+            if self.binary is not False:
+                return BinaryBlock(values)
+            values = values.ravel()
+
+        if self.chunk_size is not None and len(values) > self.chunk_size:
+            # Chunks are formatted while the reply is read, after the handler
+            # returned and possibly changed the values again
+            values = _copy_values(values)
+            return ChunkedReply(
+                self._format_chunks(values),
+                lambda: sum(map(len, self._format_chunks(values)))
+            )
+
+        return self._join(values)
+
+    def _join(self, values: Any) -> str:
+        if hasattr(values, "tolist"):
+            # NumPy and array.array: format Python numbers, like list values
+            values = values.tolist()
+        return self.separator.join(map(self._format, values))
+
+    def _format_chunks(self, values: Any) -> Iterator[str]:
+        chunk_size = self.chunk_size
+        for start in range(0, len(values), chunk_size):
+            chunk = self._join(values[start:start + chunk_size])
+            yield chunk if start == 0 else self.separator + chunk
+
+
+DEFAULT_ARRAY_FORMAT = ArrayFormat()
+
+
+def _any_formatter(array_format: ArrayFormat) -> Formatter:
+    """
+    Formatter for return types without a specialised formatter
+    """
+    def format_any(value: Any) -> Optional[Reply]:
+        if isinstance(value, _BINARY_TYPES):
+            return BinaryBlock(value)
+        if isinstance(value, _ARRAY_TYPES) or _is_ndarray_type(type(value)):
+            return array_format(value)
+        if value is None:
+            return None
+
+        return str(value)
+
+    return format_any
+
+
+def formatter(
+        return_type: Any,
+        array_format: Optional[ArrayFormat] = None
+) -> Formatter:
+    """
+    Return a function converting a handler return value to a reply string or
+    binary block. Handlers annotated to return None do not reply. Arrays are
+    formatted according to `array_format`.
+    """
+    if array_format is None:
+        array_format = DEFAULT_ARRAY_FORMAT
+
+    if return_type is type(None):
+        return _format_none
+    if return_type in (str, int, float):
+        return str
+    if return_type is bool:
+        return _format_bool
+    if return_type in _BINARY_TYPES:
+        return BinaryBlock
+    if _is_ndarray_type(return_type) or _is_array_type(return_type):
+        return array_format
+    if isinstance(return_type, type) and issubclass(return_type, Enum):
+        return _format_enum
+
+    return _any_formatter(array_format)
@@ -0,0 +1,531 @@
+"""
+A precompiled dispatch index for SCPI handler tables.
+
+Each mocker class builds an index from its handler table when the first
+message is sent to it. The index is a character trie keyed on the literal prefix of every
+regular expression (e.g. ":INSTR:CHANNEL" for ":INSTR:CHANNEL(.*):VOLT (.*)").
+Finding the handlers which can match a message means walking the trie along
+the message, so the cost grows with the length of the message rather than
+with the number of registered patterns. Only the compiled patterns found on
+that walk are tested. On top of the index, every mocker class keeps a
+bounded cache of the routes of recently dispatched messages, so repeated
+messages skip pattern matching entirely.
+
+Overlap between patterns is also analysed when the index is built. For every
+pattern a few example messages are generated and tested against the other
+patterns; patterns of submodules are followed by one representative message
+of the submodule. Only the patterns found to overlap in this way need to be checked
+for ambiguity when a message is dispatched; for all other messages the first
+match wins.
+"""
+import re
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Tuple
+from weakref import WeakSet
+
+from visa_mock.base.errors import MockingError
+
+try:
+    from re import _parser as sre_parse  # type: ignore
+except ImportError:  # Python < 3.11
+    import sre_parse  # type: ignore
+
+_SPECIAL_CHARACTERS = frozenset(".^$*+?{}[]|()")
+_QUANTIFIERS = frozenset("*+?{")
+
+
+def literal_prefix(pattern: str) -> str:
+    """
+    Return the literal text that every match of the regular expression
+    `pattern` has to start with. An empty string is returned if nothing
+    can be said about the start of a match (e.g. when the pattern
+    contains an alternation).
+    """
+    prefix = []
+    index = 0
+    escaped = False
+
+    for char in pattern:
+        if escaped:
+            escaped = False
+        elif char == "\\":
+            escaped = True
+        elif char == "|":
+            return ""
+
+    while index < len(pattern):
+        char = pattern[index]
+
+        if char == "\\":
+            if index + 1 == len(pattern) or pattern[index + 1].isalnum():
+                # Character classes like \d, back references etc.
+                break
+            literal = pattern[index + 1]
+            step = 2
+        elif char in _SPECIAL_CHARACTERS:
+            break
+        else:
+            literal = char
+            step = 1
+
+        if pattern[index + step: index + step + 1] in _QUANTIFIERS:
+            # The character is optional or repeated, e.g. "VOLT?"
+            break
+
+        prefix.append(literal)
+        index += step
+
+    return "".join(prefix)
+
+
+def example_messages(pattern: str) -> List[str]:
+    """
+    Generate example messages matching the regular expression `pattern`:
+    one with every repetition at its minimum count and one where repeated
+    items occur at least once (e.g. ":CHANNEL:VOLT " and ":CHANNEL1:VOLT 1"
+    for ":CHANNEL(.*):VOLT (.*)").
+    """
+    return list(_example_messages(pattern))
+
+
+@lru_cache(maxsize=None)
+def _example_messages(pattern: str) -> Tuple[str, ...]:
+    # Cached, as mocker classes of a library often share patterns
+    parsed = sre_parse.parse(pattern)
+    examples = [_example(parsed, typical) for typical in (False, True)]
+    return tuple(dict.fromkeys(examples))
+
+
+def _example(items: Any, typical: bool) -> str:
+    return "".join(_example_item(op, av, typical) for op, av in items)
+
+
+def _example_item(op: Any, av: Any, typical: bool) -> str:
+    if op is sre_parse.LITERAL:
+        return chr(av)
+    if op is sre_parse.NOT_LITERAL:
+        return "0" if chr(av) == "1" else "1"
+    if op is sre_parse.ANY:
+        return "1"
+    if op is sre_parse.IN:
+        return _example_in(av)
+    if op in (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT):
+        low, high, item = av
+        count = min(max(low, 1), high) if typical else low
+        return _example(item, typical) * count
+    if op is sre_parse.SUBPATTERN:
+        return _example(av[-1], typical)
+    if op is sre_parse.BRANCH:
+        return _example(av[1][0], typical)
+
+    # Anchors, assertions and group references do not consume characters
+    return ""
+
+
+def _example_in(items: Any) -> str:
+    if items and items[0][0] is sre_parse.NEGATE:
+        excluded = {chr(av) for op, av in items if op is sre_parse.LITERAL}
+        return next(char for char in "1a_#" if char not in excluded)
+
+    op, av = items[0]
+    if op is sre_parse.LITERAL:
+        return chr(av)
+    if op is sre_parse.RANGE:
+        return chr(av[0])
+    if av is sre_parse.CATEGORY_SPACE:
+        return " "
+    if av is sre_parse.CATEGORY_DIGIT:
+        return "1"
+    return "a"
+
+
+def split_message(message: str) -> List[str]:
+    """
+    Split a compound SCPI message like ":SOUR:VOLT 1;CURR 2;*OPC?" into its
+    commands. Following the SCPI rules, a command not starting with a colon
+    is relative to the path of the previous command (":SOUR:CURR 2") and
+    common commands starting with "*" do not change the path. Semicolons
+    within quoted strings and within the data of IEEE 488.2 definite length
+    blocks ("#<n><length><data>") do not separate commands.
+    """
+    if '"' in message or "'" in message or "#" in message:
+        units = _split_outside_quotes(message)
+    else:
+        units = message.split(";")
+
+    commands = []
+    path = ""
+    for unit in units:
+        command = unit.strip()
+        if not command:
+            continue
+
+        if command.startswith("*"):
+            commands.append(command)
+            continue
+
+        if not command.startswith(":"):
+            command = path + command
+
+        header_end = command.find(" ")
+        path = command[:command.rfind(":", 0, header_end) + 1]
+        commands.append(command)
+
+    return commands
+
+
+def _block_end(message: str, position: int) -> int:
+    """
+    The end of the definite length block starting with "#" at `position`,
+    or `position` if there is none there (e.g. an indefinite "#0" block)
+    """
+    digits = message[position + 1:position + 2]
+    if not digits.isdigit() or digits == "0":
+        return position
+
+    length_start = position + 2
+    length = message[length_start:length_start + int(digits)]
+    if len(length) != int(digits) or not length.isdigit():
+        return position
+
+    return min(length_start + len(length) + int(length), len(message)) - 1
+
+
+def _split_outside_quotes(message: str) -> List[str]:
+    units = []
+    start = 0
+    quote = None
+
+    position = 0
+    while position < len(message):
+        char = message[position]
+        if quote is not None:
+            if char == quote:
+                quote = None
+        elif char in "\"'":
+            quote = char
+        elif char == "#":
+            # Skip the block data, which may contain any character
+            position = _block_end(message, position)
+        elif char == ";":
+            units.append(message[start:position])
+            start = position + 1
+        position += 1
+
+    units.append(message[start:])
+    return units
+
+
+# A route is the sequence of (handler, arguments) needed to handle a message.
+# Every handler but the last one returns the mocker submodule on which the
+# next handler is called.
+Route = Tuple[Tuple[Any, Tuple[str, ...]], ...]
+
+
+class _Entry:
+    """
+    A pattern in the index. If the handler returns a mocker submodule, the
+    pattern only matches the start of a message and the remainder of the
+    message is resolved with the index of the submodule class.
+    """
+    __slots__ = ("order", "pattern", "compiled", "handler", "sub_module")
+
+    def __init__(self, order: int, pattern: str, handler: Any) -> None:
+        self.order = order
+        self.pattern = pattern
+        try:
+            self.compiled = re.compile(pattern)
+        except re.error as error:
+            raise MockingError(f"Invalid SCPI pattern {pattern}: {error}")
+        self.handler = handler
+        self.sub_module = getattr(handler, "sub_module", None)
+
+    def resolve(self, message: str) -> Optional[Route]:
+        if self.sub_module is None:
+            match = self.compiled.match(message)
+            if match is None:
+                return None
+            return ((self.handler, match.groups()),)
+
+        sub_index: DispatchIndex = self.sub_module.__scpi_index__
+
+        # Prefer the longest parent match, as a greedy regular expression
+        # spanning both the parent and the submodule pattern would
+        for split in sub_index.split_points(message):
+            match = self.compiled.fullmatch(message, 0, split)
+            if match is None:
+                continue
+
+            sub_route = sub_index.resolve(message[split:])
+            if sub_route is not None:
+                return ((self.handler, match.groups()),) + sub_route
+
+        return None
+
+    def search(self, message: str) -> Optional[Route]:
+        """
+        Resolve the message if the pattern matches anywhere in it, as
+        patterns were matched before the dispatch index. See
+        `DispatchIndex.search`.
+        """
+        if self.sub_module is None:
+            match = self.compiled.search(message)
+            if match is None:
+                return None
+            return ((self.handler, match.groups()),)
+
+        for start in range(len(message)):
+            route = self.resolve(message[start:])
+            if route is not None:
+                return route
+
+        return None
+
+    def examples(self) -> List[str]:
+        """
+        Example messages matching the entry. For a submodule, every example
+        of the pattern is followed by one representative message of the
+        submodule, so the number of examples does not multiply with every
+        level of nesting. Overlaps within the submodule are found by its
+        own index.
+        """
+        examples = example_messages(self.pattern)
+        if self.sub_module is None:
+            return examples
+
+        sub_example = self.sub_module.__scpi_index__.example()
+        if sub_example is None:
+            return []
+        return [example + sub_example for example in examples]
+
+
+class _TrieNode:
+    __slots__ = ("children", "entries")
+
+    def __init__(self) -> None:
+        self.children: Dict[str, '_TrieNode'] = {}
+        self.entries: List[_Entry] = []
+
+
+class DispatchIndex:
+    """
+    Index over a table of {regex pattern: handler}. Patterns are matched
+    from the start of a message, in the order in which they were declared.
+
+    Handlers with a `sub_module` attribute (a mocker class) return an instance
+    of that class. Their pattern is matched against the start of the message
+    and the rest of the message is dispatched with the index of `sub_module`.
+    The index of a mocker class therefore only holds the patterns of that
+    class, not those of its submodules.
+
+    Attributes:
+        overlaps: For each pattern which overlaps with other patterns, the
+            entries of the overlapping patterns. See `find_overlaps`.
+    """
+
+    def __init__(self, table: Dict[str, Any]) -> None:
+        self._root = _TrieNode()
+        self._entries: List[_Entry] = []
+        self._example: Optional[str] = None
+
+        for order, (pattern, handler) in enumerate(table.items()):
+            self.add(pattern, handler, order)
+
+        self.overlaps = self.find_overlaps()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self, pattern: str, handler: Any, order: int) -> None:
+        node = self._root
+        for char in literal_prefix(pattern):
+            node = node.children.setdefault(char, _TrieNode())
+
+        entry = _Entry(order, pattern, handler)
+        node.entries.append(entry)
+        self._entries.append(entry)
+
+    def example(self) -> Optional[str]:
+        """
+        A representative message handled by the index, from its first
+        pattern, or None if the index is empty
+        """
+        if self._example is None:
+            for entry in self._entries:
+                examples = entry.examples()
+                if examples:
+                    self._example = examples[0]
+                    break
+        return self._example
+
+    def find_overlaps(self) -> Dict[str, List[_Entry]]:
+        """
+        Find pairs of patterns which match the same message. Two patterns
+        are considered to overlap if one of them matches an example message
+        generated from the other.
+        """
+        overlaps: Dict[str, List[_Entry]] = {}
+
+        for entry in self._entries:
+            for message in entry.examples():
+                for other in self.candidates(message):
+                    if other is entry or other.resolve(message) is None:
+                        continue
+
+                    partners = overlaps.setdefault(entry.pattern, [])
+                    if other not in partners:
+                        partners.append(other)
+                    partners = overlaps.setdefault(other.pattern, [])
+                    if entry not in partners:
+                        partners.append(entry)
+
+        return overlaps
+
+    def candidates(self, message: str) -> List[_Entry]:
+        """
+        Return all entries whose literal prefix is a prefix of the message,
+        in the order in which the patterns were declared.
+        """
+        node = self._root
+        found = list(node.entries)
+
+        for char in message:
+            node = node.children.get(char)
+            if node is None:
+                break
+            found.extend(node.entries)
+
+        if len(found) > 1:
+            found.sort(key=lambda entry: entry.order)
+
+        return found
+
+    def split_points(self, message: str) -> Iterator[int]:
+        """
+        Yield the positions in the message, from last to first, at which a
+        message handled by this index could start.
+        """
+        if self._root.entries:
+            yield from range(len(message), -1, -1)
+            return
+
+        first_characters = self._root.children
+        for position in range(len(message) - 1, -1, -1):
+            if message[position] in first_characters:
+                yield position
+
+    def resolve(self, message: str) -> Optional[Route]:
+        """
+        Return the route of the first declared pattern matching the message,
+        or None if no pattern matches.
+
+        Raises:
+            MockingError: if the message also matches a pattern which
+                overlaps with the matching pattern.
+        """
+        for entry in self.candidates(message):
+            route = entry.resolve(message)
+            if route is None:
+                continue
+
+            for other in self.overlaps.get(entry.pattern, ()):
+                if other.resolve(message) is not None:
+                    raise MockingError(
+                        f"SCPI command {message} matches multiple mocker "
+                        f"class entries"
+                    )
+
+            return route
+
+        return None
+
+    def search(self, message: str) -> Optional[Tuple[str, Route]]:
+        """
+        Find the first declared pattern matching anywhere in the message,
+        rather than from its start. Mockers fall back to this, with a
+        deprecation warning, for messages which `resolve` does not match.
+
+        Returns:
+            The pattern and the route, or None if no pattern matches
+        """
+        for entry in self._entries:
+            route = entry.search(message)
+            if route is not None:
+                return entry.pattern, route
+
+        return None
+
+
+class CacheInfo(NamedTuple):
+    hits: int
+    misses: int
+    maxsize: int
+    currsize: int
+
+
+class ResolutionCache:
+    """
+    A least recently used cache mapping exact messages to their route.
+
+    Lookups do not take a lock; insertions and evictions do. The hit and miss
+    counts are not synchronised and may be slightly off under concurrent use.
+
+    All caches are tracked, such that they can be cleared at once with
+    `clear_all` when handlers change. The route of a message may go through
+    the handlers of other (sub-module) classes, so clearing only the cache
+    of the class whose handlers changed is not enough.
+    """
+    _instances: 'WeakSet[ResolutionCache]' = WeakSet()
+
+    def __init__(self, maxsize: int) -> None:
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._routes: 'OrderedDict[str, Route]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._instances.add(self)
+
+    def get(self, message: str) -> Optional[Route]:
+        route = self._routes.get(message)
+        if route is None:
+            self.misses += 1
+            return None
+
+        try:
+            self._routes.move_to_end(message)
+        except KeyError:
+            # Evicted in the meantime by another thread
+            pass
+
+        self.hits += 1
+        return route
+
+    def put(self, message: str, route: Route) -> None:
+        if self.maxsize <= 0:
+            return
+
+        with self._lock:
+            self._routes[message] = route
+            while len(self._routes) > self.maxsize:
+                self._routes.popitem(last=False)
+
+    def resize(self, maxsize: int) -> None:
+        with self._lock:
+            self.maxsize = maxsize
+            while len(self._routes) > max(maxsize, 0):
+                self._routes.popitem(last=False)
+
+    def clear(self) -> None:
+        self._routes.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def info(self) -> CacheInfo:
+        return CacheInfo(self.hits, self.misses, self.maxsize, len(self._routes))
+
+    @classmethod
+    def clear_all(cls) -> None:
+        for cache in list(cls._instances):
+            cache.clear()
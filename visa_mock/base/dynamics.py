@@ -0,0 +1,177 @@
+"""
+Instrument state which evolves over time, like a voltage ramping to its
+set point and settling, evaluated lazily: a `DynamicParameter` stores where
+it started, when and where it is heading, and computes its value in closed
+form only when it is read. Reading costs the same however long ago the
+target was set, and idle parameters cost nothing.
+
+    class Source(BaseMocker):
+
+        def __init__(self) -> None:
+            super().__init__()
+            self._voltage = DynamicParameter(slew_rate=10.0, time_constant=0.01)
+
+        @scpi(r":VOLT (.*)")
+        def _set_voltage(self, value: float) -> None:
+            self._voltage.set_target(value, self.clock.time())
+
+        @scpi(r":VOLT\\?")
+        def _get_voltage(self) -> float:
+            return self._voltage.value(self.clock.time())
+
+Times are those of the clock of the mocker, so with a `SimulatedClock` tests
+can step through a ramp without waiting. For many channels, create the
+parameters of a channel when it is first set, e.g. in a dict.
+"""
+import math
+import random
+from typing import Optional, Tuple
+
+from visa_mock.base.timing import Jitter
+
+
+class DynamicParameter:
+    """
+    A value following its target with a limited slew rate and a first order
+    settling, plus a linear drift and a random read noise.
+
+    With both a slew rate and a time constant, the value ramps linearly at
+    the slew rate until the exponential approach is slower than the slew
+    rate, and settles exponentially from there.
+
+    Args:
+        value: the initial value, which is also the initial target
+        slew_rate: the maximum rate of change in units per second, None for
+            no limit
+        time_constant: the time constant of the settling in seconds, None
+            to reach the target without settling
+        noise: a function drawing the noise added to every read from the
+            generator it is given, e.g. `visa_mock.base.timing.normal_jitter`
+        drift: a drift in units per second, added to the value since the
+            parameter was first used
+        seed: the seed of the noise generator
+    """
+    __slots__ = (
+        "slew_rate", "time_constant", "noise", "drift", "_random", "_target",
+        "_start_value", "_start_time", "_origin"
+    )
+
+    def __init__(
+            self,
+            value: float = 0.0,
+            slew_rate: Optional[float] = None,
+            time_constant: Optional[float] = None,
+            noise: Optional[Jitter] = None,
+            drift: float = 0.0,
+            seed: Optional[int] = None
+    ) -> None:
+        self.slew_rate = slew_rate
+        self.time_constant = time_constant
+        self.noise = noise
+        self.drift = drift
+        self._random = None if noise is None else random.Random(seed)
+
+        self._target = value
+        self._start_value = value
+        # Set when the parameter is first used
+        self._start_time: Optional[float] = None
+        self._origin: Optional[float] = None
+
+    @property
+    def target(self) -> float:
+        return self._target
+
+    def set_target(self, target: float, now: float) -> None:
+        """
+        Start moving from the current value towards `target` at time `now`
+        """
+        self._start_value = self._trajectory(now)
+        self._start_time = now
+        self._target = target
+
+    def reset(self, value: float, now: float) -> None:
+        """
+        Jump to `value` and stay there
+        """
+        self._start(now)
+        self._start_value = value
+        self._start_time = now
+        self._target = value
+
+    def value(self, now: float) -> float:
+        """
+        The value read at time `now`, with drift and noise
+        """
+        value = self._trajectory(now) + self.drift * (now - self._origin)
+
+        if self.noise is not None:
+            value += self.noise(self._random)
+        return value
+
+    def settled(self, now: float, tolerance: float) -> bool:
+        """
+        Whether the value, without drift and noise, is within `tolerance`
+        of the target at time `now`
+        """
+        return abs(self._trajectory(now) - self._target) <= tolerance
+
+    def settling_time(self, tolerance: float) -> float:
+        """
+        The time from setting the current target until the value, without
+        drift and noise, is within `tolerance` of the target
+        """
+        distance = abs(self._target - self._start_value)
+        if distance <= tolerance:
+            return 0.0
+
+        linear_distance, linear_time = self._linear_phase(distance)
+        remaining = distance - linear_distance
+        if not self.time_constant or remaining <= tolerance:
+            # Within tolerance during the linear ramp
+            return (distance - tolerance) / self.slew_rate if self.slew_rate else 0.0
+
+        return linear_time + self.time_constant * math.log(remaining / tolerance)
+
+    def _start(self, now: float) -> None:
+        if self._start_time is None:
+            self._start_time = now
+        if self._origin is None:
+            self._origin = now
+
+    def _linear_phase(self, distance: float) -> Tuple[float, float]:
+        """
+        The distance and duration of the ramp at the slew rate
+        """
+        if not self.slew_rate:
+            return 0.0, 0.0
+
+        if self.time_constant:
+            # The exponential approach is faster than the slew rate until
+            # the distance is slew rate x time constant
+            linear_distance = max(distance - self.slew_rate * self.time_constant, 0.0)
+        else:
+            linear_distance = distance
+
+        return linear_distance, linear_distance / self.slew_rate
+
+    def _trajectory(self, now: float) -> float:
+        self._start(now)
+
+        delta = self._target - self._start_value
+        if delta == 0:
+            return self._target
+
+        distance = abs(delta)
+        direction = 1.0 if delta > 0 else -1.0
+        elapsed = max(now - self._start_time, 0.0)
+
+        linear_distance, linear_time = self._linear_phase(distance)
+        if elapsed < linear_time:
+            return self._start_value + direction * self.slew_rate * elapsed
+
+        if not self.time_constant:
+            return self._target
+
+        remaining = distance - linear_distance
+        decay = math.exp(-(elapsed - linear_time) / self.time_constant)
+        return self._target - direction * remaining * decay
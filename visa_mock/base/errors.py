@@ -0,0 +1,6 @@
+class MockingError(Exception):
+    pass
+
+
+class AnnotationError(Exception):
+    pass
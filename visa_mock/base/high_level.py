@@ -1,13 +1,20 @@
-from typing import Dict, List, Tuple, Any
+from typing import Callable, Dict, List, Optional, Tuple, Any, Union
+import functools
+import inspect
+import threading
 
-from pyvisa import constants, highlevel, rname, errors
+from pyvisa import constants, highlevel, rname, errors, util
 from pyvisa.constants import InterfaceType
 from pyvisa.resources.resource import Resource
 
+from visa_mock.base import tracing
+from visa_mock.base.conversion import BinaryBlock, Reply
 from visa_mock.base.register import resources
-from visa_mock.base.session import Session
+from visa_mock.base.session import Session, SessionAllocator
 
 STATUS_CODE = int
+# Used to convert between text replies and bytes
+ENCODING = "latin-1"
 rname.build_rn_class(
     "MOCK",
     (('board', '0'), ("name", "mock"),),
@@ -15,34 +22,241 @@ rname.build_rn_class(
 )
 
 mock_constant = 1000
+_SERVICE_REQUEST_EVENTS = (
+    constants.VI_EVENT_SERVICE_REQ, constants.VI_ALL_ENABLED_EVENTS
+)
 InterfaceType.mock = mock_constant
 
 
+def _to_bytes(data: Union[str, bytes, memoryview]) -> bytes:
+    if isinstance(data, str):
+        return data.encode(ENCODING)
+    return bytes(data)
+
+
+def _traced(name: str) -> Callable[[Callable], Callable]:
+    """
+    Record calls of a `MockVisaLibrary` method taking a session index as
+    first argument as trace events (see `visa_mock.base.tracing`). A string
+    second argument is recorded as the command.
+    """
+    def decorator(method: Callable) -> Callable:
+
+        def trace_args(library, session_idx, args) -> Tuple[Optional[str], Optional[str]]:
+            session = library._sessions.get(session_idx)
+            resource = None if session is None else session.resource_name
+            command = args[0] if args and isinstance(args[0], str) else None
+            return resource, command
+
+        if inspect.iscoroutinefunction(method):
+            @functools.wraps(method)
+            async def traced_method(self, session_idx, *args, **kwargs):
+                tracer = tracing.tracer
+                if tracer is None:
+                    return await method(self, session_idx, *args, **kwargs)
+
+                resource, command = trace_args(self, session_idx, args)
+                start = tracer.now()
+                try:
+                    return await method(self, session_idx, *args, **kwargs)
+                finally:
+                    tracer.complete(name, start, session_idx, resource, command)
+
+        else:
+            @functools.wraps(method)
+            def traced_method(self, session_idx, *args, **kwargs):
+                tracer = tracing.tracer
+                if tracer is None:
+                    return method(self, session_idx, *args, **kwargs)
+
+                resource, command = trace_args(self, session_idx, args)
+                start = tracer.now()
+                try:
+                    return method(self, session_idx, *args, **kwargs)
+                finally:
+                    tracer.complete(name, start, session_idx, resource, command)
+
+        return traced_method
+
+    return decorator
+
+
 @Resource.register(mock_constant, "INSTR")
 class MockResource(Resource):
 
     def read(self, **kwargs) -> str:
         reply, status_code = self.visalib.read(self.session)
+        if not isinstance(reply, str):
+            reply = bytes(reply).decode(ENCODING)
         return reply
 
+    def read_raw(self, size: int = None) -> bytes:
+        """
+        Read the (rest of the) next reply as bytes, in chunks of `size`
+        """
+        chunks = []
+        status_code = constants.StatusCode.success_max_count_read
+
+        while status_code == constants.StatusCode.success_max_count_read:
+            chunk, status_code = self.visalib.read(self.session, size)
+            chunks.append(_to_bytes(chunk))
+
+        return b"".join(chunks)
+
+    def read_bytes(self, count: int, chunk_size: int = None, **kwargs) -> bytes:
+        """
+        Read exactly `count` bytes, possibly spanning several replies
+        """
+        chunks = []
+        remaining = count
+
+        while remaining > 0:
+            size = remaining if chunk_size is None else min(remaining, chunk_size)
+            chunk, status_code = self.visalib.read(self.session, size)
+            chunks.append(_to_bytes(chunk))
+            remaining -= len(chunk)
+
+        return b"".join(chunks)
+
+    def write_raw(self, message: bytes) -> Tuple[int, STATUS_CODE]:
+        self.visalib.write(self.session, message.decode(ENCODING))
+        return len(message), constants.StatusCode.success
+
+    def query_ascii_values(
+            self,
+            message: str,
+            converter: Any = "f",
+            separator: str = ",",
+            container: Any = list,
+            chunk_size: int = 20 * 1024,
+            **kwargs
+    ) -> Any:
+        """
+        Query separated ASCII values. The reply is read and converted in
+        chunks of `chunk_size` characters.
+        """
+        self.write(message)
+
+        values: List[Any] = []
+        tail = ""
+        status_code = constants.StatusCode.success_max_count_read
+
+        while status_code == constants.StatusCode.success_max_count_read:
+            chunk, status_code = self.visalib.read(self.session, chunk_size)
+            if not isinstance(chunk, str):
+                chunk = bytes(chunk).decode(ENCODING)
+
+            text = tail + chunk
+            if status_code == constants.StatusCode.success_max_count_read:
+                # The last value may continue in the next chunk
+                text, _, tail = text.rpartition(separator)
+
+            if text:
+                values.extend(util.from_ascii_block(text, converter, separator))
+
+        return container(values)
+
+    def query_binary_values(
+            self,
+            message: str,
+            datatype: str = "f",
+            is_big_endian: bool = False,
+            container: Any = list,
+            **kwargs
+    ) -> Any:
+        """
+        Query a binary block reply and convert its data to numbers. The data
+        of the block is read in place, without copies.
+        """
+        self.write(message)
+        reply, status_code = self.visalib.read_reply(self.session)
+
+        if isinstance(reply, BinaryBlock):
+            return util.from_binary_block(
+                reply.payload, 0, reply.payload.nbytes, datatype, is_big_endian,
+                container
+            )
+
+        return util.from_ieee_block(
+            _to_bytes(reply), datatype, is_big_endian, container
+        )
+
     def write(self, message: str, **kwargs) -> Tuple[int, STATUS_CODE]:
         self.visalib.write(self.session, message)
         return len(message), constants.StatusCode.success
 
     def query(self, message: str, **kwargs) -> str:
-        self.write(message)
-        return self.read()
+        reply, status_code = self.visalib.query(self.session, message)
+        if not isinstance(reply, str):
+            reply = bytes(reply).decode(ENCODING)
+        return reply
+
+    async def aread(self, **kwargs) -> str:
+        reply, status_code = await self.visalib.aread(self.session)
+        if not isinstance(reply, str):
+            reply = bytes(reply).decode(ENCODING)
+        return reply
+
+    async def awrite(self, message: str, **kwargs) -> Tuple[int, STATUS_CODE]:
+        await self.visalib.awrite(self.session, message)
+        return len(message), constants.StatusCode.success
+
+    async def aquery(self, message: str, **kwargs) -> str:
+        await self.awrite(message)
+        return await self.aread()
+
+    def read_stb(self) -> int:
+        """
+        Serial poll the device, see `visa_mock.base.status`
+        """
+        value, status_code = self.visalib.read_stb(self.session)
+        return value
+
+    @property
+    def stb(self) -> int:
+        return self.read_stb()
+
+    def wait_for_srq(self, timeout: Optional[int] = 25000) -> None:
+        """
+        Wait for the device to request service, for at most `timeout`
+        milliseconds (forever if None). Service requests raised before the
+        call are not waited for.
+        """
+        self.enable_event(constants.VI_EVENT_SERVICE_REQ, constants.VI_QUEUE)
+        try:
+            if timeout is None:
+                timeout = constants.VI_TMO_INFINITE
+            self.visalib.wait_on_event(
+                self.session, constants.VI_EVENT_SERVICE_REQ, timeout
+            )
+        finally:
+            self.disable_event(constants.VI_EVENT_SERVICE_REQ, constants.VI_QUEUE)
 
 
 class MockVisaLibrary(highlevel.VisaLibraryBase):
+    """
+    The session table may be used from several threads. Opening and closing
+    sessions is synchronised; looking up a session is not. See `BaseMocker`
+    and `Session` for the concurrency model of devices and sessions.
+
+    Calls on sessions are recorded while tracing, see
+    `visa_mock.base.tracing`.
+
+    Session ids of closed sessions are reused (see `SessionAllocator`), so
+    the session table only holds open sessions. At most `max_sessions`
+    sessions can be open at the same time, if it is set.
+    """
+    max_sessions: Optional[int] = None
 
     def _init(self) -> None:
 
         self._sessions: Dict[int, Session] = {}
+        self._allocator = SessionAllocator(self.max_sessions)
+        self._lock = threading.Lock()
 
     def list_resources(self, session: int, query='?*::INSTR') -> List[str]:
 
-        resources_list = rname.filter(list(resources), query)
+        resources_list = resources.list_resources(query)
 
         if resources_list:
             return resources_list
@@ -53,13 +267,15 @@ class MockVisaLibrary(highlevel.VisaLibraryBase):
 
     def new_session(self, session: Session = None) -> int:
 
-        new_session_idx = len(self._sessions) + 1
+        with self._lock:
+            new_session_idx = self._allocator.allocate()
+
+            if session is None:
+                session = Session(new_session_idx, "MOCK0::name::INSTR")
 
-        if session is None:
-            session = Session(new_session_idx, "MOCK0::name::INSTR")
+            session.session_index = new_session_idx
+            self._sessions[new_session_idx] = session
 
-        session.session_index = new_session_idx
-        self._sessions[session.session_index] = session
         return new_session_idx
 
     def open_default_resource_manager(self) -> Tuple[int, STATUS_CODE]:
@@ -78,24 +294,100 @@ class MockVisaLibrary(highlevel.VisaLibraryBase):
         if resource_name not in resources:
             raise ValueError(f"Unknown resource {resource_name}")
 
-        device = resources[resource_name]
+        tracer = tracing.tracer
+        start = None if tracer is None else tracer.now()
+
         session = Session(manager_session_idx, resource_name)
-        session.device = device
-        new_session_index = self.new_session(session)
+        session.device = resources.acquire(resource_name)
+        try:
+            new_session_index = self.new_session(session)
+        except BaseException:
+            # E.g. no session index is left
+            resources.release(resource_name)
+            raise
+
+        if tracer is not None:
+            tracer.complete("open", start, new_session_index, resource_name)
+
         return new_session_index, constants.StatusCode.success
 
+    @_traced("close")
     def close(self, session_idx: int) -> STATUS_CODE:
-        if session_idx not in self._sessions:
-            return constants.StatusCode.error_invalid_object
+        with self._lock:
+            if session_idx not in self._sessions:
+                return constants.StatusCode.error_invalid_object
+
+            session = self._sessions.pop(session_idx)
+            self._allocator.release(session_idx)
+
+        if session.device is not None:
+            resources.release(session.resource_name)
 
-        del self._sessions[session_idx]
         return constants.StatusCode.success
 
-    def disable_event(self, session_idx: int, event_type: int, mechanism: int) -> None:
-        pass
+    @staticmethod
+    def _check_event_type(event_type: int) -> None:
+        if event_type not in _SERVICE_REQUEST_EVENTS:
+            raise errors.VisaIOError(constants.StatusCode.error_invalid_event)
+
+    def enable_event(
+            self,
+            session_idx: int,
+            event_type: int,
+            mechanism: int,
+            context: Any = None
+    ) -> STATUS_CODE:
+        """
+        Enable queueing service request events. Only the queue mechanism is
+        supported.
+        """
+        self._check_event_type(event_type)
+        if mechanism != constants.VI_QUEUE:
+            raise errors.VisaIOError(constants.StatusCode.error_nonsupported_mechanism)
+
+        if self._sessions[session_idx].enable_service_requests():
+            return constants.StatusCode.success
+        return constants.StatusCode.success_event_already_enabled
 
-    def discard_events(self, session_idx: int, event_type: int, mechanism: int) -> None:
-        pass
+    def disable_event(self, session_idx: int, event_type: int, mechanism: int) -> STATUS_CODE:
+        self._check_event_type(event_type)
+
+        if self._sessions[session_idx].disable_service_requests():
+            return constants.StatusCode.success
+        return constants.StatusCode.success_event_already_disabled
+
+    def discard_events(self, session_idx: int, event_type: int, mechanism: int) -> STATUS_CODE:
+        self._check_event_type(event_type)
+        self._sessions[session_idx].discard_service_requests()
+        return constants.StatusCode.success
+
+    @_traced("wait_on_event")
+    def wait_on_event(
+            self,
+            session_idx: int,
+            in_event_type: int,
+            timeout: Optional[int]
+    ) -> Tuple[int, None, STATUS_CODE]:
+        """
+        Wait for a service request event, see `visa_mock.base.status`. The
+        calling thread sleeps until the event is raised or `timeout` (in
+        milliseconds) has passed.
+        """
+        self._check_event_type(in_event_type)
+
+        seconds = None
+        if timeout is not None and timeout != constants.VI_TMO_INFINITE:
+            seconds = timeout / 1000
+
+        if not self._sessions[session_idx].wait_for_service_request(seconds):
+            raise errors.VisaIOError(constants.StatusCode.error_timeout)
+
+        return (
+            constants.EventType.service_request, None, constants.StatusCode.success
+        )
+
+    def read_stb(self, session_idx: int) -> Tuple[int, STATUS_CODE]:
+        return self._sessions[session_idx].read_stb(), constants.StatusCode.success
 
     def get_attribute(self, session_idx: int, attribute: int) -> Tuple[Any, STATUS_CODE]:
         """
@@ -107,13 +399,58 @@ class MockVisaLibrary(highlevel.VisaLibraryBase):
         """
         return self._sessions[session_idx].set_attribute(attribute, attribute_state)
 
-    def read(self, session_idx: int, count: int=None) -> Tuple[str, STATUS_CODE]:
-        reply = self._sessions[session_idx].read()
-        return reply, constants.StatusCode.success
+    @_traced("read")
+    def read(
+            self,
+            session_idx: int,
+            count: int=None
+    ) -> Tuple[Union[str, bytes, memoryview], STATUS_CODE]:
+        """
+        Read at most `count` characters (or bytes, for binary replies) of the
+        next reply. The status is `success_max_count_read` if the reply has
+        not been read completely.
+        """
+        reply, complete = self._sessions[session_idx].read_partial(count)
+
+        if complete:
+            return reply, constants.StatusCode.success
+        return reply, constants.StatusCode.success_max_count_read
 
+    @_traced("write")
     def write(self, session_idx: int, data: str) -> STATUS_CODE:
         self._sessions[session_idx].write(data)
         return constants.StatusCode.success
 
+    @_traced("read_reply")
+    def read_reply(self, session_idx: int) -> Tuple[Reply, STATUS_CODE]:
+        """
+        Read the next reply as it was queued, a string or a `BinaryBlock`
+        """
+        reply = self._sessions[session_idx].read_reply()
+        return reply, constants.StatusCode.success
+
+    @_traced("query")
+    def query(self, session_idx: int, data: str) -> Tuple[str, STATUS_CODE]:
+        """
+        Write and read back the reply as one operation on the session
+        """
+        reply = self._sessions[session_idx].ask(data)
+        return reply, constants.StatusCode.success
+
+    @_traced("aread")
+    async def aread(
+            self,
+            session_idx: int,
+            count: int=None
+    ) -> Tuple[Union[str, bytes, memoryview], STATUS_CODE]:
+        reply = await self._sessions[session_idx].aread()
+        return reply, constants.StatusCode.success
+
+    @_traced("awrite")
+    async def awrite(self, session_idx: int, data: str) -> STATUS_CODE:
+        await self._sessions[session_idx].awrite(data)
+        return constants.StatusCode.success
+
+    @_traced("clear")
     def clear(self, session_idx: int) -> None:
         return None
@@ -0,0 +1,258 @@
+"""
+Host registered mockers in one process and use them from others over a local
+TCP socket, e.g. from pytest-xdist workers or multiprocessing pipelines
+sharing the same simulated instruments.
+
+Run a host serving the resources registered by importing modules, or listed
+in `module:attribute` dicts, with
+
+    python -m visa_mock.base.host --port 5025 visa_mock.test.mock_instruments.instruments:resources
+
+and register proxies to them in the client processes, see
+`visa_mock.base.remote.RemoteMocker`.
+
+Protocol: a client opens a connection per resource by sending the line
+"OPEN <resource name>", which is answered with "OK" or "E<error>". Then
+every line the client sends is a message to the mocker, answered with one
+reply frame:
+
+    N                   the message has no reply
+    T<text>             a text reply without newlines
+    L#<n><length><text> a text reply containing newlines, as a block
+    B#<n><length><data> a binary reply, as an IEEE 488.2 definite length block
+    E<error>            the mocker raised an error
+
+Every frame ends with a newline. Text is encoded as latin-1.
+
+This deliberately differs from the plain SCPI socket protocol of instruments:
+the OPEN handshake lets one port serve every registered resource, and a frame
+per message lets clients tell commands without a reply and mocker errors
+apart from replies without waiting for a timeout. Clients are `RemoteMocker`
+proxies, not VISA TCPIP socket resources.
+"""
+import argparse
+import asyncio
+import importlib
+import threading
+from typing import List, Mapping, Optional
+
+from visa_mock.base.base_mocker import BaseMocker
+from visa_mock.base.conversion import BinaryBlock, ChunkedReply, Reply
+from visa_mock.base.register import register_resources, resources
+
+ENCODING = "latin-1"
+DEFAULT_PORT = 5025
+
+
+def _block(data: bytes) -> bytes:
+    length = str(len(data))
+    return f"#{len(length)}{length}".encode("ascii") + data
+
+
+def encode_reply(reply: Optional[Reply]) -> List[bytes]:
+    """
+    The reply frame of a mocker reply, as a list of byte strings. The
+    payload of binary blocks is not copied.
+    """
+    if reply is None:
+        return [b"N\n"]
+
+    if isinstance(reply, BinaryBlock):
+        return [b"B", reply.header, reply.payload, b"\n"]
+
+    if isinstance(reply, ChunkedReply):
+        reply, _ = reply.read()
+
+    if "\n" in reply:
+        return [b"L", _block(reply.encode(ENCODING)), b"\n"]
+    return [b"T", reply.encode(ENCODING), b"\n"]
+
+
+def _error_frame(error: Exception) -> bytes:
+    text = str(error) or type(error).__name__
+    return b"E" + text.replace("\n", " ").encode(ENCODING, "replace") + b"\n"
+
+
+class DeviceHost:
+    """
+    An asyncio server hosting mockers, see the module documentation for the
+    protocol. Call delays of the mockers suspend only the connection waiting
+    for them.
+
+    Args:
+        registry: the mockers by resource name, the registered resources by
+            default
+        host: the address to listen on, localhost by default
+        port: the port to listen on. With 0, a free port is chosen; see
+            `port` once the host is started.
+    """
+
+    def __init__(
+            self,
+            registry: Optional[Mapping[str, BaseMocker]] = None,
+            host: str = "127.0.0.1",
+            port: int = DEFAULT_PORT
+    ) -> None:
+        self.registry = resources if registry is None else registry
+        self.host = host
+        self.port = port
+
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+
+    async def start(self) -> None:
+        self._server = await asyncio.start_server(self._serve, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self) -> None:
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    def start_in_thread(self) -> int:
+        """
+        Run the host in a daemon thread with its own event loop. Errors
+        starting the host, e.g. a port in use, are raised here.
+
+        Returns:
+            The port the host listens on
+        """
+        started = threading.Event()
+        errors: List[BaseException] = []
+
+        def run() -> None:
+            self._loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(self._loop)
+            try:
+                self._loop.run_until_complete(self.start())
+            except BaseException as error:
+                # E.g. the port is in use, raised again in the caller
+                errors.append(error)
+                self._loop.close()
+                return
+            finally:
+                started.set()
+
+            self._loop.run_forever()
+
+            # Close the server and the connections still open
+            self._server.close()
+            tasks = asyncio.all_tasks(self._loop)
+            for task in tasks:
+                task.cancel()
+            self._loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+            self._loop.run_until_complete(self._server.wait_closed())
+            self._loop.close()
+
+        thread = threading.Thread(target=run, name="visa-mock-host", daemon=True)
+        thread.start()
+        started.wait()
+
+        if errors:
+            thread.join()
+            raise errors[0]
+
+        self._thread = thread
+        return self.port
+
+    def stop(self) -> None:
+        """
+        Stop a host started with `start_in_thread`
+        """
+        if self._thread is not None:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._thread = None
+
+    async def _serve(
+            self,
+            reader: asyncio.StreamReader,
+            writer: asyncio.StreamWriter
+    ) -> None:
+        try:
+            mocker = await self._open(reader, writer)
+            if mocker is not None:
+                await self._serve_messages(mocker, reader, writer)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            # Also when the task is cancelled as the host stops, the
+            # cancellation propagates once the connection is closed
+            writer.close()
+            await self._wait_closed(writer)
+
+    @staticmethod
+    async def _wait_closed(writer: asyncio.StreamWriter) -> None:
+        try:
+            await writer.wait_closed()
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+
+    async def _open(
+            self,
+            reader: asyncio.StreamReader,
+            writer: asyncio.StreamWriter
+    ) -> Optional[BaseMocker]:
+        line = (await reader.readline()).decode(ENCODING).rstrip("\r\n")
+        command, _, resource_name = line.partition(" ")
+
+        if command != "OPEN":
+            writer.write(_error_frame(ValueError(f"Expected OPEN, got {line}")))
+            return None
+
+        try:
+            mocker = self.registry[resource_name]
+        except KeyError:
+            writer.write(_error_frame(ValueError(f"Unknown resource {resource_name}")))
+            return None
+
+        writer.write(b"OK\n")
+        return mocker
+
+    async def _serve_messages(
+            self,
+            mocker: BaseMocker,
+            reader: asyncio.StreamReader,
+            writer: asyncio.StreamWriter
+    ) -> None:
+        while True:
+            line = await reader.readline()
+            if not line:
+                return
+
+            message = line.decode(ENCODING).rstrip("\r\n")
+            try:
+                reply = await mocker.asend(message)
+            except Exception as error:
+                writer.write(_error_frame(error))
+            else:
+                writer.writelines(encode_reply(reply))
+
+            await writer.drain()
+
+
+def main(arguments: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Host mock VISA resources")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument(
+        "modules", nargs="*",
+        help="modules registering resources, or module:attribute dicts of "
+             "resources to register"
+    )
+    options = parser.parse_args(arguments)
+
+    for name in options.modules:
+        module_name, _, attribute = name.partition(":")
+        module = importlib.import_module(module_name)
+        if attribute:
+            register_resources(getattr(module, attribute))
+
+    host = DeviceHost(host=options.host, port=options.port)
+    asyncio.run(host.serve_forever())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+"""
+Opt-in instrumentation of mockers and sessions.
+
+While a collector is enabled, every command handled by a mocker is recorded
+per SCPI pattern, with latency histograms of the time spent resolving the
+message to its handlers (dispatch), converting arguments and replies
+(conversion), running the handlers (handler) and the injected call delay
+(delay). Sessions record calls and bytes written and read per resource.
+
+    collector = enable_metrics()
+    ...
+    print(collector.to_json())
+    disable_metrics()
+
+When no collector is enabled the only cost is a check of the module level
+`collector` attribute per message.
+"""
+import json
+import threading
+from typing import Any, Dict, Optional
+
+LATENCY_KINDS = ("dispatch", "conversion", "handler", "delay")
+
+
+class Histogram:
+    """
+    A latency histogram with buckets growing in powers of two, in
+    microseconds: bucket `n` counts latencies below 2 ** n microseconds (and
+    at least 2 ** (n - 1)).
+    """
+    __slots__ = ("count", "total", "minimum", "maximum", "buckets")
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.total = 0.0
+        self.minimum = float("inf")
+        self.maximum = 0.0
+        self.buckets: Dict[int, int] = {}
+
+    def add(self, seconds: float) -> None:
+        self.count += 1
+        self.total += seconds
+        self.minimum = min(self.minimum, seconds)
+        self.maximum = max(self.maximum, seconds)
+
+        bucket = int(seconds * 1e6).bit_length()
+        self.buckets[bucket] = self.buckets.get(bucket, 0) + 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "total": self.total,
+            "mean": self.total / self.count if self.count else 0.0,
+            "min": self.minimum if self.count else 0.0,
+            "max": self.maximum,
+            "buckets_us": {
+                str(2 ** bucket): count
+                for bucket, count in sorted(self.buckets.items())
+            },
+        }
+
+
+class _CommandStats:
+    __slots__ = ("calls", "bytes_in", "bytes_out", "latency")
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.latency = {kind: Histogram() for kind in LATENCY_KINDS}
+
+
+class _ResourceStats:
+    __slots__ = ("writes", "reads", "bytes_in", "bytes_out")
+
+    def __init__(self) -> None:
+        self.writes = 0
+        self.reads = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+
+class MetricsCollector:
+    """
+    Collects per pattern and per resource statistics. All methods may be
+    called from several threads.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._commands: Dict[str, _CommandStats] = {}
+        self._resources: Dict[str, _ResourceStats] = {}
+
+    def record_command(
+            self,
+            pattern: str,
+            bytes_in: int,
+            bytes_out: int,
+            dispatch: float,
+            conversion: float,
+            handler: float,
+            delay: float
+    ) -> None:
+        """
+        Record a command handled by a mocker. Latencies are in seconds.
+        """
+        with self._lock:
+            stats = self._commands.get(pattern)
+            if stats is None:
+                stats = self._commands[pattern] = _CommandStats()
+
+            stats.calls += 1
+            stats.bytes_in += bytes_in
+            stats.bytes_out += bytes_out
+
+            latency = stats.latency
+            latency["dispatch"].add(dispatch)
+            latency["conversion"].add(conversion)
+            latency["handler"].add(handler)
+            latency["delay"].add(delay)
+
+    def record_write(self, resource: str, byte_count: int) -> None:
+        with self._lock:
+            stats = self._resource_stats(resource)
+            stats.writes += 1
+            stats.bytes_in += byte_count
+
+    def record_read(self, resource: str, byte_count: int) -> None:
+        with self._lock:
+            stats = self._resource_stats(resource)
+            stats.reads += 1
+            stats.bytes_out += byte_count
+
+    def _resource_stats(self, resource: str) -> _ResourceStats:
+        stats = self._resources.get(resource)
+        if stats is None:
+            stats = self._resources[resource] = _ResourceStats()
+        return stats
+
+    def reset(self) -> None:
+        with self._lock:
+            self._commands.clear()
+            self._resources.clear()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        The statistics collected so far as a JSON serialisable dict
+        """
+        with self._lock:
+            return {
+                "commands": {
+                    pattern: {
+                        "calls": stats.calls,
+                        "bytes_in": stats.bytes_in,
+                        "bytes_out": stats.bytes_out,
+                        "latency": {
+                            kind: histogram.snapshot()
+                            for kind, histogram in stats.latency.items()
+                        },
+                    }
+                    for pattern, stats in self._commands.items()
+                },
+                "resources": {
+                    resource: {
+                        "writes": stats.writes,
+                        "reads": stats.reads,
+                        "bytes_in": stats.bytes_in,
+                        "bytes_out": stats.bytes_out,
+                    }
+                    for resource, stats in self._resources.items()
+                },
+            }
+
+    def to_json(self, **kwargs) -> str:
+        return json.dumps(self.snapshot(), **kwargs)
+
+
+collector: Optional[MetricsCollector] = None
+
+
+def enable_metrics() -> MetricsCollector:
+    """
+    Start collecting metrics with a new collector, which is returned
+    """
+    global collector
+    collector = MetricsCollector()
+    return collector
+
+
+def disable_metrics() -> None:
+    global collector
+    collector = None
@@ -1,13 +1,329 @@
-from typing import Dict
+"""
+The registry of mocked resources. Resources are registered as mocker
+instances or, for large fleets of instruments, as factories (e.g. mocker
+classes) which are only called when the resource is first opened.
+
+    register_resource("MOCK0::mock1::INSTR", Mocker1())
+    register_factory("MOCK0::mock2::INSTR", Mocker2, idle_timeout=60.0)
+
+Mockers created by a factory with an idle timeout are dropped when none of
+their sessions has been open for `idle_timeout` seconds (of the default
+clock, see `visa_mock.base.clock`), and created anew when opened again.
+
+Resource names are indexed by their first (interface and board) and last
+(resource class) component, so `list_resources` queries with a literal
+beginning or end, like "MOCK0::?*" or "?*::INSTR", only filter the matching
+part of the registry. Query results are cached until the next registration.
+"""
+from collections.abc import MutableMapping
+from typing import TYPE_CHECKING, Callable, Dict, Iterator, List, Optional, Tuple
+import threading
 
 from visa_mock.base.base_mocker import BaseMocker
+from visa_mock.base.clock import get_clock
+
+if TYPE_CHECKING:
+    from visa_mock.base.snapshot import Snapshot
+
+MockerFactory = Callable[[], BaseMocker]
+# First and last component of a resource name, e.g. ("MOCK0", "INSTR")
+_IndexKey = Tuple[str, str]
+
+# Characters with a special meaning in VISA resource queries
+_QUERY_SPECIAL = frozenset("?*+[]{}()|!\\&")
+
+
+def _index_key(resource_name: str) -> _IndexKey:
+    components = resource_name.upper().split("::")
+    return components[0], components[-1]
+
+
+def _literal_ends(query: str) -> Tuple[str, str]:
+    """
+    The longest beginning and end of a query without special characters
+    """
+    special = [position for position, char in enumerate(query) if char in _QUERY_SPECIAL]
+    if not special:
+        return query, query
+    return query[:special[0]], query[special[-1] + 1:]
+
+
+def _may_match(key: _IndexKey, prefix: str, suffix: str) -> bool:
+    first = key[0] + "::"
+    last = "::" + key[1]
+    return (
+        (first.startswith(prefix) or prefix.startswith(first))
+        and (last.endswith(suffix) or suffix.endswith(last))
+    )
+
+
+class ResourceRegistry(MutableMapping):
+    """
+    A mapping of resource names to mockers, in which mockers registered as
+    factories are created on first access. Registration, creation and
+    eviction of mockers are synchronised; looking up a created mocker is not.
+
+    Resource names are iterated and listed in the order in which they were
+    first registered, as in a dict. Setting and deleting items registers
+    and unregisters mockers.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.RLock()
+        self._mockers: Dict[str, BaseMocker] = {}
+        self._factories: Dict[str, Tuple[MockerFactory, Optional[float]]] = {}
+        # The registration order of every resource name, and the names by
+        # index key with their registration order
+        self._names: Dict[str, int] = {}
+        self._index: Dict[_IndexKey, Dict[str, int]] = {}
+        self._registrations = 0
+        self._query_cache: Dict[str, List[str]] = {}
+        self._open_counts: Dict[str, int] = {}
+        # Created mockers with an idle timeout and no open session: the time
+        # their last session was closed
+        self._idle_since: Dict[str, float] = {}
+
+    def register(self, address: str, mocker: BaseMocker) -> None:
+        with self._lock:
+            self._factories.pop(address, None)
+            self._idle_since.pop(address, None)
+            self._mockers[address] = mocker
+            self._add_to_index(address)
+
+    def register_factory(
+            self,
+            address: str,
+            factory: MockerFactory,
+            idle_timeout: Optional[float] = None
+    ) -> None:
+        """
+        Register a factory creating the mocker of a resource when the
+        resource is first opened.
+
+        Args:
+            address: the resource name
+            factory: a mocker class or any callable returning a mocker
+            idle_timeout: if given, the mocker is dropped once none of its
+                sessions has been open for this many seconds.
+        """
+        with self._lock:
+            self._mockers.pop(address, None)
+            self._idle_since.pop(address, None)
+            self._factories[address] = (factory, idle_timeout)
+            self._add_to_index(address)
+
+    def unregister(self, address: str) -> Optional[BaseMocker]:
+        """
+        Remove a resource, e.g. registered by a test.
+
+        Returns:
+            The mocker of the resource, if it was created
+        """
+        with self._lock:
+            self._factories.pop(address, None)
+            self._idle_since.pop(address, None)
+            self._open_counts.pop(address, None)
+            mocker = self._mockers.pop(address, None)
+
+            if self._names.pop(address, None) is not None:
+                key = _index_key(address)
+                names = self._index[key]
+                names.pop(address, None)
+                if not names:
+                    del self._index[key]
+                self._query_cache.clear()
+
+            return mocker
+
+    def _add_to_index(self, address: str) -> None:
+        if address in self._names:
+            return
+
+        order = self._names[address] = self._registrations
+        self._registrations += 1
+        self._index.setdefault(_index_key(address), {})[address] = order
+        self._query_cache.clear()
+
+    def __getitem__(self, address: str) -> BaseMocker:
+        mocker = self._mockers.get(address)
+        if mocker is not None:
+            return mocker
+
+        with self._lock:
+            mocker = self._mockers.get(address)
+            if mocker is None:
+                factory, _ = self._factories[address]
+                mocker = self._mockers[address] = factory()
+
+            return mocker
+
+    def __setitem__(self, address: str, mocker: BaseMocker) -> None:
+        self.register(address, mocker)
 
-resources: Dict[str, BaseMocker] = {}
+    def __delitem__(self, address: str) -> None:
+        with self._lock:
+            if address not in self:
+                raise KeyError(address)
+            self.unregister(address)
+
+    def __contains__(self, address: object) -> bool:
+        return address in self._mockers or address in self._factories
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(list(self._names))
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def is_created(self, address: str) -> bool:
+        """
+        Whether the mocker of a resource exists, i.e. it was registered as
+        an instance or its factory has been called (and it was not evicted).
+        """
+        return address in self._mockers
+
+    def acquire(self, address: str) -> BaseMocker:
+        """
+        The mocker of a resource for a new session. Evicts mockers which
+        have been idle for too long.
+        """
+        with self._lock:
+            self.evict_idle()
+            # Create the mocker first, so that a failing factory is not
+            # counted as an open session
+            mocker = self[address]
+            self._open_counts[address] = self._open_counts.get(address, 0) + 1
+            self._idle_since.pop(address, None)
+            return mocker
+
+    def release(self, address: str) -> None:
+        """
+        Called when a session acquired with `acquire` is closed
+        """
+        with self._lock:
+            count = self._open_counts.get(address, 0) - 1
+            if count > 0:
+                self._open_counts[address] = count
+                return
+
+            self._open_counts.pop(address, None)
+            factory = self._factories.get(address)
+            if factory is not None and factory[1] is not None:
+                self._idle_since[address] = get_clock().time()
+
+    def evict_idle(self, now: Optional[float] = None) -> List[str]:
+        """
+        Drop the created mockers which have been idle for longer than the
+        idle timeout of their factory.
+
+        Returns:
+            The names of the evicted resources
+        """
+        if not self._idle_since:
+            return []
+
+        if now is None:
+            now = get_clock().time()
+
+        with self._lock:
+            evicted = [
+                address for address, since in self._idle_since.items()
+                if now - since >= self._factories[address][1]
+            ]
+            for address in evicted:
+                del self._idle_since[address]
+                self._mockers.pop(address, None)
+
+        return evicted
+
+    def snapshot(self) -> Dict[str, 'Snapshot']:
+        """
+        Snapshots of all created mockers, see `visa_mock.base.snapshot`
+        """
+        with self._lock:
+            return {
+                address: mocker.snapshot()
+                for address, mocker in self._mockers.items()
+            }
+
+    def restore(self, snapshots: Dict[str, 'Snapshot']) -> None:
+        """
+        Restore snapshots taken with `snapshot`. Mockers created by factories
+        after the snapshots were taken are dropped.
+        """
+        with self._lock:
+            for address in list(self._mockers):
+                if address not in snapshots and address in self._factories:
+                    del self._mockers[address]
+                    self._idle_since.pop(address, None)
+
+            for snapshot in snapshots.values():
+                snapshot.restore()
+
+    def list_resources(self, query: str = "?*::INSTR") -> List[str]:
+        """
+        The resource names matching a VISA resource query
+        """
+        result = self._query_cache.get(query)
+        if result is not None:
+            return list(result)
+
+        with self._lock:
+            if query in self and not _QUERY_SPECIAL.intersection(query):
+                # A resource name
+                return [query]
+
+            if "|" in query or "{" in query:
+                candidates = list(self)
+            else:
+                prefix, suffix = _literal_ends(query.upper())
+                buckets = [
+                    names for key, names in self._index.items()
+                    if _may_match(key, prefix, suffix)
+                ]
+                candidates = [name for names in buckets for name in names]
+                if len(buckets) > 1:
+                    candidates.sort(key=self._names.__getitem__)
+
+            from pyvisa import rname
+            result = rname.filter(candidates, query) if candidates else []
+            self._query_cache[query] = result
+
+        return list(result)
+
+
+resources = ResourceRegistry()
 
 
 def register_resource(address: str, mocker: BaseMocker) -> None:
-    resources[address] = mocker
+    resources.register(address, mocker)
 
 
 def register_resources(new_resources: Dict[str, BaseMocker]) -> None:
-    resources.update(new_resources)
+    for address, mocker in new_resources.items():
+        resources.register(address, mocker)
+
+
+def unregister_resource(address: str) -> Optional[BaseMocker]:
+    return resources.unregister(address)
+
+
+def register_factory(
+        address: str,
+        factory: MockerFactory,
+        idle_timeout: Optional[float] = None
+) -> None:
+    """
+    Register a mocker class, or another factory of mockers, which is only
+    instantiated when the resource is first opened. See
+    `ResourceRegistry.register_factory`.
+    """
+    resources.register_factory(address, factory, idle_timeout)
+
+
+def register_factories(
+        new_factories: Dict[str, MockerFactory],
+        idle_timeout: Optional[float] = None
+) -> None:
+    for address, factory in new_factories.items():
+        resources.register_factory(address, factory, idle_timeout)
@@ -0,0 +1,186 @@
+"""
+Proxies of mockers hosted by another process, see `visa_mock.base.host`.
+
+    register_resource(
+        "MOCK0::mock1::INSTR", RemoteMocker("MOCK0::mock1::INSTR", port=5025)
+    )
+
+A `RemoteMocker` forwards the messages sent to it to the hosted mocker of
+the same (or another) resource name and returns its replies. Connections to
+the host are persistent and pooled per proxy, so threads sharing a proxy
+each use their own connection.
+"""
+import asyncio
+import socket
+import threading
+from typing import BinaryIO, List, Optional, Tuple
+
+from visa_mock.base.base_mocker import BaseMocker
+from visa_mock.base.conversion import BinaryBlock, Reply
+from visa_mock.base.errors import MockingError
+from visa_mock.base.host import DEFAULT_PORT, ENCODING
+
+
+def _read_block(file: BinaryIO) -> bytes:
+    header = file.read(2)
+    if header[:1] != b"#" or not header[1:2].isdigit():
+        raise MockingError(f"Invalid block header {header!r}")
+
+    length = int(file.read(int(header[1:2])))
+    data = file.read(length)
+    file.read(1)  # The newline ending the frame
+    return data
+
+
+def read_reply(file: BinaryIO) -> Optional[Reply]:
+    """
+    Read a reply frame
+
+    Raises:
+        ValueError: if the hosted mocker raised an error
+    """
+    kind = file.read(1)
+
+    if kind == b"N":
+        file.read(1)
+        return None
+    if kind == b"T":
+        return file.readline()[:-1].decode(ENCODING)
+    if kind == b"B":
+        return BinaryBlock(_read_block(file))
+    if kind == b"L":
+        return _read_block(file).decode(ENCODING)
+    if kind == b"E":
+        raise ValueError(file.readline()[:-1].decode(ENCODING))
+    if not kind:
+        raise ConnectionError("The device host closed the connection")
+
+    raise MockingError(f"Invalid reply frame {kind!r}")
+
+
+class _Connection:
+    """
+    A connection to a hosted resource
+    """
+    __slots__ = ("socket", "file")
+
+    def __init__(self, address: Tuple[str, int], resource_name: str, timeout: float) -> None:
+        self.socket = socket.create_connection(address, timeout)
+        self.socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.file = self.socket.makefile("rb")
+
+        try:
+            self.socket.sendall(f"OPEN {resource_name}\n".encode(ENCODING))
+            if self.file.readline() != b"OK\n":
+                raise ValueError(f"Unknown resource {resource_name}")
+        except Exception:
+            self.close()
+            raise
+
+    def send(self, message: str) -> Optional[Reply]:
+        self.socket.sendall(message.encode(ENCODING) + b"\n")
+        return read_reply(self.file)
+
+    def close(self) -> None:
+        self.file.close()
+        self.socket.close()
+
+
+class ConnectionPool:
+    """
+    Persistent connections to a hosted resource. Connections are opened on
+    demand and at most `max_idle` of them are kept open when not in use.
+    """
+
+    def __init__(
+            self,
+            address: Tuple[str, int],
+            resource_name: str,
+            max_idle: int = 4,
+            timeout: float = 10.0
+    ) -> None:
+        self.address = address
+        self.resource_name = resource_name
+        self.max_idle = max_idle
+        self.timeout = timeout
+
+        self._idle: List[_Connection] = []
+        self._lock = threading.Lock()
+
+    def __deepcopy__(self, memo: dict) -> 'ConnectionPool':
+        # Connections are not part of the state of a mocker
+        return self
+
+    def send(self, message: str) -> Optional[Reply]:
+        with self._lock:
+            connection = self._idle.pop() if self._idle else None
+
+        if connection is None:
+            connection = _Connection(self.address, self.resource_name, self.timeout)
+
+        try:
+            reply = connection.send(message)
+        except ValueError:
+            # An error of the hosted mocker, the connection is fine
+            self._release(connection)
+            raise
+        except Exception:
+            connection.close()
+            raise
+
+        self._release(connection)
+        return reply
+
+    def _release(self, connection: _Connection) -> None:
+        with self._lock:
+            if len(self._idle) < self.max_idle:
+                self._idle.append(connection)
+                return
+
+        connection.close()
+
+    def close(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, []
+
+        for connection in idle:
+            connection.close()
+
+
+class RemoteMocker(BaseMocker):
+    """
+    A proxy of a mocker hosted by a `visa_mock.base.host.DeviceHost`. Call
+    delays are applied by the hosted mocker.
+
+    Args:
+        resource_name: the name of the resource on the host
+        host: the address of the host
+        port: the port of the host
+        max_idle: the number of connections kept open, see `ConnectionPool`
+    """
+
+    def __init__(
+            self,
+            resource_name: str,
+            host: str = "127.0.0.1",
+            port: int = DEFAULT_PORT,
+            max_idle: int = 4
+    ) -> None:
+        super().__init__()
+        self.pool = ConnectionPool((host, port), resource_name, max_idle)
+
+    def send(self, scpi_string: str) -> Optional[Reply]:
+        if "\n" in scpi_string:
+            raise ValueError("Messages to remote mockers cannot contain newlines")
+        return self.pool.send(scpi_string)
+
+    async def asend(self, scpi_string: str) -> Optional[Reply]:
+        """
+        Like `send`, but the round trip runs in the default executor, so it
+        does not block the event loop
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.send, scpi_string)
+
+    def close(self) -> None:
+        self.pool.close()
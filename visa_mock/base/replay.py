@@ -0,0 +1,240 @@
+"""
+Record the traffic with an instrument and replay it with a mocker.
+
+A `Recorder` wraps a `Session` or a pyvisa resource and appends every command
+and its reply to a trace file, one JSON array per line:
+
+    ["*RST"]                          a command without reply
+    ["*IDN?", "ACME,1234,0,1.0"]      a text reply
+    [":WAV:DATA?", "IzQBAgME", "b64"] a binary reply, base64 encoded
+
+A `ReplayMocker` loads a trace file into a hash table from commands to their
+replies. It answers exactly the recorded commands, with a dictionary lookup
+instead of matching SCPI patterns, and is registered like any other mocker:
+
+    register_resource("MOCK0::dmm::INSTR", ReplayMocker("dmm.trace"))
+"""
+import base64
+import json
+import mmap
+import os
+from collections import deque
+from typing import Any, Deque, Dict, IO, Iterable, Iterator, List, Optional, Union
+
+from visa_mock.base.base_mocker import BaseMocker
+from visa_mock.base.clock import Clock
+from visa_mock.base.conversion import BinaryBlock, Reply
+from visa_mock.base.dispatch import split_message
+
+ReplayReply = Union[Reply, bytes, None]
+
+
+def _encode_record(command: str, reply: Any) -> str:
+    if reply is None:
+        record: List[str] = [command]
+    elif isinstance(reply, str):
+        record = [command, reply]
+    else:
+        record = [command, base64.b64encode(bytes(reply)).decode("ascii"), "b64"]
+
+    return json.dumps(record, separators=(",", ":")) + "\n"
+
+
+def _decode_record(line: Union[str, bytes]) -> Optional[List[Any]]:
+    record = json.loads(line) if line.strip() else None
+    if record is None or len(record) < 3:
+        return record
+
+    return [record[0], base64.b64decode(record[1])]
+
+
+def _binary_reply(data: bytes) -> Union[BinaryBlock, bytes]:
+    """
+    Recorded definite length blocks are replayed as `BinaryBlock`s, so they
+    can be read without copies. Other binary replies are replayed as is.
+    """
+    if data[:1] == b"#" and data[1:2].isdigit() and data[1:2] != b"0":
+        digits = int(data[1:2])
+        length = data[2:2 + digits]
+        if length.isdigit() and 2 + digits + int(length) == len(data):
+            return BinaryBlock(memoryview(data)[2 + digits:])
+
+    return data
+
+
+class Recorder:
+    """
+    Record the commands written to and the replies read from a `Session` or
+    a pyvisa resource, by using the recorder in its place.
+
+    Replies are attributed to the written commands in order. If several
+    commands are written before a reply is read, the reply belongs to the
+    first pending query (a command containing "?"); pending commands before
+    it are recorded without reply.
+
+    Args:
+        path: the trace file. Records are appended to an existing file.
+        target: the session or resource to record.
+    """
+
+    def __init__(self, path: str, target: Any) -> None:
+        self.target = target
+        self._file: IO[str] = open(path, "a")
+        self._pending: Deque[str] = deque()
+
+    def write(self, message: str, *args, **kwargs) -> Any:
+        result = self.target.write(message, *args, **kwargs)
+        self._pending.append(message)
+        return result
+
+    def read(self, *args, **kwargs) -> Any:
+        reply = self.target.read(*args, **kwargs)
+        self._record_reply(reply)
+        return reply
+
+    def query(self, message: str, *args, **kwargs) -> Any:
+        self.write(message)
+        return self.read(*args, **kwargs)
+
+    def ask(self, message: str) -> Any:
+        return self.query(message)
+
+    def _record_reply(self, reply: Any) -> None:
+        while len(self._pending) > 1 and "?" not in self._pending[0]:
+            self._file.write(_encode_record(self._pending.popleft(), None))
+
+        if self._pending:
+            self._file.write(_encode_record(self._pending.popleft(), reply))
+
+    def flush(self) -> None:
+        """
+        Record the pending commands without reply and flush the trace file
+        """
+        while self._pending:
+            self._file.write(_encode_record(self._pending.popleft(), None))
+        self._file.flush()
+
+    def close(self) -> None:
+        self.flush()
+        self._file.close()
+
+    def __enter__(self) -> 'Recorder':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def _read_lines(path: str, use_mmap: bool) -> Iterator[Union[str, bytes]]:
+    if not use_mmap or os.path.getsize(path) == 0:
+        with open(path) as file:
+            yield from file
+        return
+
+    with open(path, "rb") as file:
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            yield from iter(mapped.readline, b"")
+
+
+class ReplayMocker(BaseMocker):
+    """
+    A mocker answering the commands recorded in a trace file with their
+    recorded replies. Commands are looked up exactly, in constant time.
+
+    A command recorded several times is, by default, answered with its last
+    recorded reply. With `sequence=True` it is answered with its recorded
+    replies in turn, repeating the last one when all have been replayed.
+
+    Compound messages which were not recorded as a whole are answered
+    command by command, see `visa_mock.base.dispatch.split_message`.
+
+    Args:
+        path: the trace file, read line by line while loading
+        sequence: replay repeated commands in sequence
+        call_delay: see `BaseMocker`
+        clock: see `BaseMocker`
+        use_mmap: whether to memory map the file while loading instead of
+            reading it line by line. Reading line by line is faster; memory
+            mapping avoids the read buffer, but holds the mapped pages.
+    """
+
+    def __init__(
+            self,
+            path: Optional[str] = None,
+            sequence: bool = False,
+            call_delay: float = 0.0,
+            clock: Optional[Clock] = None,
+            use_mmap: bool = False
+    ) -> None:
+        super().__init__(call_delay=call_delay, clock=clock)
+        self.sequence = sequence
+        self._replies: Dict[str, List[ReplayReply]] = {}
+        self._positions: Dict[str, int] = {}
+
+        if path is not None:
+            self.load(path, use_mmap)
+
+    def load(self, path: str, use_mmap: bool = False) -> None:
+        """
+        Add the records of a trace file
+        """
+        self.load_records(
+            record for record in map(_decode_record, _read_lines(path, use_mmap))
+            if record is not None
+        )
+
+    def load_records(self, records: Iterable[List[Any]]) -> None:
+        """
+        Add records `[command]` or `[command, reply]`, where binary replies
+        are bytes
+        """
+        replies = self._replies
+        for record in records:
+            reply = record[1] if len(record) > 1 else None
+            if isinstance(reply, bytes):
+                reply = _binary_reply(reply)
+            replies.setdefault(record[0], []).append(reply)
+
+    def __len__(self) -> int:
+        return len(self._replies)
+
+    def rewind(self) -> None:
+        """
+        Replay all sequences from their first reply again
+        """
+        with self.lock:
+            self._positions.clear()
+
+    def send(self, scpi_string: str) -> Any:
+        replies = self._lookup(scpi_string)
+        self.clock.sleep(self._call_delay)
+        return self._replay(scpi_string, replies)
+
+    async def asend(self, scpi_string: str) -> Any:
+        replies = self._lookup(scpi_string)
+        await self.clock.asleep(self._call_delay)
+        return self._replay(scpi_string, replies)
+
+    def _lookup(self, scpi_string: str) -> Optional[List[ReplayReply]]:
+        replies = self._replies.get(scpi_string)
+
+        if replies is None and ";" not in scpi_string:
+            raise ValueError(f"Unknown SCPI command {scpi_string}")
+
+        return replies
+
+    def _replay(self, scpi_string: str, replies: Optional[List[ReplayReply]]) -> Any:
+        if replies is None:
+            commands = split_message(scpi_string)
+            return self._join_replies([
+                self._replay(command, self._lookup(command)) for command in commands
+            ])
+
+        if not self.sequence or len(replies) == 1:
+            return replies[-1]
+
+        with self.lock:
+            position = self._positions.get(scpi_string, 0)
+            self._positions[scpi_string] = min(position + 1, len(replies) - 1)
+
+        return replies[position]
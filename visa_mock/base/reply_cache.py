@@ -0,0 +1,111 @@
+"""
+Caches of the replies of queries which are pure functions of rarely changing
+state, like "*IDN?" or calibration tables. A query is declared cacheable,
+with the state tags its reply depends on, and handlers changing that state
+declare the tags they invalidate:
+
+    class Source(BaseMocker):
+
+        @scpi(r":CAL:TABLE\\?", cacheable=True, tags=("calibration",))
+        def _get_table(self) -> List[float]:
+            return self._table  # formatted once, then replied from the cache
+
+        @scpi(r":CAL:LOAD (.*)", invalidates=("calibration",))
+        def _load_table(self, name: str) -> None:
+            self._table = ...
+
+Replies are cached per mocker instance (the mocker the message is sent to)
+and per route, so queries with arguments are cached per argument value. The
+formatted reply is cached: repeated queries skip both the handler and the
+serialization of the reply. Chunked replies are cached as a whole.
+
+A reply without tags stays cached until the cache is cleared. The cache of a
+mocker is cleared by `BaseMocker.mark_changed` and when a snapshot restores
+the mocker (see `visa_mock.base.snapshot`).
+"""
+from typing import Dict, Iterable, NamedTuple, Optional, Set
+
+from visa_mock.base.conversion import ChunkedReply, Reply
+from visa_mock.base.dispatch import Route
+
+# Returned by `ReplyCache.get` for routes without a cached reply, as None is a
+# valid reply
+MISSING = object()
+
+
+class ReplyCacheInfo(NamedTuple):
+    hits: int
+    misses: int
+    invalidations: int
+    currsize: int
+
+
+class ReplyCache:
+    """
+    The cached replies of a mocker, by route. Not thread safe, caches are
+    used while holding the lock of their mocker.
+    """
+    __slots__ = ("hits", "misses", "invalidations", "_replies", "_routes_by_tag")
+
+    def __init__(self) -> None:
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._replies: Dict[Route, Optional[Reply]] = {}
+        self._routes_by_tag: Dict[str, Set[Route]] = {}
+
+    def __len__(self) -> int:
+        return len(self._replies)
+
+    def get(self, route: Route) -> object:
+        """
+        The cached reply of the route, or `MISSING`
+        """
+        reply = self._replies.get(route, MISSING)
+        if reply is MISSING:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return reply
+
+    def put(self, route: Route, reply: Optional[Reply], tags: Iterable[str]) -> Optional[Reply]:
+        """
+        Cache the reply of a route.
+
+        Returns:
+            The cached reply, which replaces a chunked reply by its text
+        """
+        if isinstance(reply, ChunkedReply):
+            reply, _ = reply.read()
+
+        self._replies[route] = reply
+        for tag in tags:
+            self._routes_by_tag.setdefault(tag, set()).add(route)
+
+        return reply
+
+    def invalidate(self, tags: Iterable[str]) -> int:
+        """
+        Drop the replies depending on any of the tags.
+
+        Returns:
+            The number of dropped replies
+        """
+        dropped = 0
+        for tag in tags:
+            for route in self._routes_by_tag.pop(tag, ()):
+                if self._replies.pop(route, MISSING) is not MISSING:
+                    dropped += 1
+
+        self.invalidations += dropped
+        return dropped
+
+    def clear(self) -> None:
+        """
+        Drop all replies. The statistics are kept.
+        """
+        self._replies.clear()
+        self._routes_by_tag.clear()
+
+    def info(self) -> ReplyCacheInfo:
+        return ReplyCacheInfo(self.hits, self.misses, self.invalidations, len(self._replies))
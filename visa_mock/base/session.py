@@ -3,17 +3,45 @@ Large parts of this code has been copied directly from pyvisa-sim
 
 https://github.com/pyvisa/pyvisa-sim
 """
-from typing import Optional
-from pyvisa import constants, attributes, rname
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple, Union
+from pyvisa import constants, attributes, rname, errors
 import logging
+import threading
 
+from visa_mock.base import metrics, tracing
 from visa_mock.base.base_mocker import BaseMocker
+from visa_mock.base.clock import Clock, get_clock
+from visa_mock.base.conversion import ChunkedReply, Reply
+from visa_mock.base.status import StatusMocker
 
 
 logger = logging.getLogger()
 
 
 class Session:
+    """
+    A session with a mocked device. Every session has its own reply buffer,
+    so sessions sharing a device never read each other's replies. Threads
+    sharing a session should use `ask`, which writes and reads under the
+    session lock.
+
+    Replies are queued in the order in which the messages were written and
+    consumed by reading, like the output queue of a real instrument. Several
+    queries can therefore be written before their replies are read. Binary
+    replies are queued as `BinaryBlock`s; reading them gives bytes (or a
+    memoryview on the payload for partial reads within the data). Large
+    array replies may be queued as `ChunkedReply`s, which are formatted
+    while they are being read.
+
+    Sessions are opened and closed very often, so they have slots and their
+    attribute dict is only created when an attribute is accessed.
+    """
+    __slots__ = (
+        "parsed", "session_type", "session_index", "_resource_manager_session",
+        "_resource_name", "_attrs", "_device", "_output", "_output_offset",
+        "_lock", "_srq_seen"
+    )
 
     def __init__(
             self,
@@ -26,18 +54,30 @@ class Session:
             parsed = rname.parse_resource_name(resource_name)
 
         self.parsed = parsed
-
-        self.attrs = {
-            constants.VI_ATTR_RM_SESSION: resource_manager_session,
-            constants.VI_ATTR_RSRC_NAME: str(parsed),
-            constants.VI_ATTR_RSRC_CLASS: parsed.resource_class,
-            constants.VI_ATTR_INTF_TYPE: parsed.interface_type_const
-        }
+        self._resource_manager_session = resource_manager_session
+        self._resource_name = resource_name
+        self._attrs: Optional[Dict[int, Any]] = None
 
         self.session_type = None
         self.session_index = resource_manager_session
         self._device: Optional[BaseMocker] = None
-        self._read_buffer = ""
+        self._output: Deque[Reply] = deque()
+        self._output_offset = 0
+        self._lock = threading.RLock()
+        # The number of service requests of the device seen by the session,
+        # None while service request events are disabled
+        self._srq_seen: Optional[int] = None
+
+    @property
+    def attrs(self) -> Dict[int, Any]:
+        if self._attrs is None:
+            self._attrs = {
+                constants.VI_ATTR_RM_SESSION: self._resource_manager_session,
+                constants.VI_ATTR_RSRC_NAME: str(self.parsed),
+                constants.VI_ATTR_RSRC_CLASS: self.parsed.resource_class,
+                constants.VI_ATTR_INTF_TYPE: self.parsed.interface_type_const
+            }
+        return self._attrs
 
     @property
     def device(self) -> BaseMocker:
@@ -47,6 +87,16 @@ class Session:
     def device(self, dev: BaseMocker) -> None:
         self._device = dev
 
+    @property
+    def clock(self) -> Clock:
+        """
+        The clock of the device, which advances with the call delays of the
+        device. Client code can read the (possibly simulated) time from it.
+        """
+        if self._device is None:
+            return get_clock()
+        return self._device.clock
+
     def get_attribute(self, attribute):  # TODO: type hints
         """
         """
@@ -93,14 +143,246 @@ class Session:
 
         return constants.StatusCode.success
 
+    @property
+    def resource_name(self) -> str:
+        """
+        The resource name the session was opened with
+        """
+        return self._resource_name
+
     def write(self, message: str) -> None:
-        reply = self.device.send(message)
+        if metrics.collector is not None:
+            metrics.collector.record_write(self.resource_name, len(message))
+
+        tracer = tracing.tracer
+        if tracer is None:
+            reply = self.device.send(message)
+        else:
+            start = tracer.now()
+            try:
+                reply = self.device.send(message)
+            finally:
+                tracer.complete(
+                    "send", start, self.session_index, self.resource_name, message
+                )
+
         if reply is not None:
-            self._read_buffer = reply
+            self._output.append(reply)
+
+    def read(self) -> Union[str, bytes, memoryview]:
+        """
+        Read the (rest of the) next reply in the output queue
+        """
+        data, complete = self.read_partial()
+        return data
+
+    def read_reply(self) -> Reply:
+        """
+        Take the next reply from the output queue as it was queued, i.e. a
+        string or a `BinaryBlock`. A partially read reply is read as usual.
+        """
+        with self._lock:
+            if self._output and self._output_offset == 0:
+                if not isinstance(self._output[0], ChunkedReply):
+                    reply = self._output.popleft()
+                    if metrics.collector is not None:
+                        metrics.collector.record_read(self.resource_name, len(reply))
+                    return reply
 
-    def read(self) -> str:
-        return self._read_buffer
+            return self.read()
+
+    def read_partial(
+            self,
+            count: Optional[int] = None
+    ) -> Tuple[Union[str, bytes, memoryview], bool]:
+        """
+        Read at most `count` characters (or bytes, for binary replies) of the
+        next reply in the output queue.
+
+        Returns:
+            The data read and whether the end of the reply has been reached.
+
+        Raises:
+            VisaIOError: with a timeout status if no reply is queued
+        """
+        data, complete = self._read_partial(count)
+
+        if metrics.collector is not None:
+            metrics.collector.record_read(self.resource_name, len(data))
+
+        return data, complete
+
+    def _read_partial(
+            self,
+            count: Optional[int]
+    ) -> Tuple[Union[str, bytes, memoryview], bool]:
+        with self._lock:
+            if not self._output:
+                raise errors.VisaIOError(constants.StatusCode.error_timeout)
+
+            reply = self._output[0]
+
+            if isinstance(reply, ChunkedReply):
+                data, complete = reply.read(count)
+                if complete:
+                    self._output.popleft()
+                return data, complete
+
+            start = self._output_offset
+
+            if count is None or start + count >= len(reply):
+                self._output.popleft()
+                self._output_offset = 0
+                return reply[start:], True
+
+            self._output_offset = start + count
+            return reply[start:start + count], False
+
+    @property
+    def bytes_pending(self) -> int:
+        """
+        The number of characters queued for reading. Of chunked replies,
+        only the part formatted so far is counted.
+        """
+        return sum(map(len, self._output)) - self._output_offset
 
     def ask(self, message: str):
-        self.write(message)
+        with self._lock:
+            self.write(message)
+            return self.read()
+
+    async def awrite(self, message: str) -> None:
+        if metrics.collector is not None:
+            metrics.collector.record_write(self.resource_name, len(message))
+
+        tracer = tracing.tracer
+        if tracer is None:
+            reply = await self.device.asend(message)
+        else:
+            start = tracer.now()
+            try:
+                reply = await self.device.asend(message)
+            finally:
+                tracer.complete(
+                    "send", start, self.session_index, self.resource_name, message
+                )
+
+        if reply is not None:
+            self._output.append(reply)
+
+    async def aread(self) -> Union[str, bytes, memoryview]:
         return self.read()
+
+    async def aask(self, message: str):
+        await self.awrite(message)
+        return await self.aread()
+
+    def _status_device(self) -> StatusMocker:
+        if not isinstance(self._device, StatusMocker):
+            raise errors.VisaIOError(constants.StatusCode.error_invalid_event)
+        return self._device
+
+    def enable_service_requests(self) -> bool:
+        """
+        Queue the service requests the device raises from now on, see
+        `visa_mock.base.status`.
+
+        Returns:
+            False if service requests were already enabled
+        """
+        device = self._status_device()
+        if self._srq_seen is not None:
+            return False
+
+        self._srq_seen = device.service_request_count
+        return True
+
+    def disable_service_requests(self) -> bool:
+        """
+        Returns:
+            False if service requests were already disabled
+        """
+        enabled = self._srq_seen is not None
+        self._srq_seen = None
+        return enabled
+
+    def discard_service_requests(self) -> None:
+        if self._srq_seen is not None:
+            self._srq_seen = self._status_device().service_request_count
+
+    def wait_for_service_request(self, timeout: Optional[float]) -> bool:
+        """
+        Wait for the next queued service request. The calling thread sleeps
+        until the device raises it.
+
+        Args:
+            timeout: the maximum time to wait in seconds, forever if None
+
+        Returns:
+            False if no service request was raised within the timeout
+        """
+        device = self._status_device()
+        if self._srq_seen is None:
+            raise errors.VisaIOError(constants.StatusCode.error_not_enabled)
+
+        count = device.wait_for_service_request(self._srq_seen, timeout)
+        if count is None:
+            return False
+
+        self._srq_seen += 1
+        return True
+
+    def read_stb(self) -> int:
+        """
+        Serial poll the device. Devices without status registers reply 0.
+        """
+        if isinstance(self._device, StatusMocker):
+            return self._device.serial_poll()
+        return 0
+
+
+class SessionAllocator:
+    """
+    Allocates session ids. Ids of closed sessions are reused, most recently
+    released first, so the ids stay as small as the number of open sessions
+    and a live session is never given away.
+
+    Args:
+        max_sessions: the maximum number of sessions open at the same time,
+            or None for no limit.
+    """
+    __slots__ = ("max_sessions", "_next_id", "_free_ids", "_allocated")
+
+    def __init__(self, max_sessions: Optional[int] = None) -> None:
+        self.max_sessions = max_sessions
+        self._next_id = 1
+        self._free_ids: List[int] = []
+        self._allocated = 0
+
+    def __len__(self) -> int:
+        """
+        The number of allocated ids
+        """
+        return self._allocated
+
+    def allocate(self) -> int:
+        """
+        Raises:
+            VisaIOError: with an allocation error status if `max_sessions`
+                sessions are open
+        """
+        if self.max_sessions is not None and self._allocated >= self.max_sessions:
+            raise errors.VisaIOError(constants.StatusCode.error_allocation)
+
+        self._allocated += 1
+
+        if self._free_ids:
+            return self._free_ids.pop()
+
+        session_id = self._next_id
+        self._next_id += 1
+        return session_id
+
+    def release(self, session_id: int) -> None:
+        self._allocated -= 1
+        self._free_ids.append(session_id)
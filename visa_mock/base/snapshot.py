@@ -0,0 +1,174 @@
+"""
+Snapshots of the state of mockers, to reset instruments between tests
+without building them again:
+
+    baseline = mocker.snapshot()
+    ...  # the test changes the state of the mocker
+    mocker.restore(baseline)
+
+The state of a mocker is the set of its instance attributes, apart from its
+lock, its reply cache and its status condition variable. Sub-modules
+(mockers referenced by the state, directly, in dicts, lists and tuples, or
+in `Submodules`) are captured as well, by reference: each sub-module has its
+own entry in the snapshot. Clocks, functions and methods are kept by
+reference too. Other values are copied; dicts, lists, sets, tuples,
+`ChannelArray`s and `Submodules` container by container, everything else
+with `copy.deepcopy`.
+
+Every handler call gives the mocker it runs on a new state version. A
+snapshot records the version of every mocker, and restoring only copies back
+the state of mockers whose version changed, so the cost of a restore grows
+with the number of changed mockers rather than the size of the hierarchy.
+State changed outside handlers should be announced with
+`BaseMocker.mark_changed`.
+"""
+import copy
+from array import array
+from functools import partial
+from types import BuiltinFunctionType, FunctionType, MethodType
+from typing import Any, Dict, List, Tuple
+
+from visa_mock.base.base_mocker import BaseMocker
+from visa_mock.base.channels import ChannelArray, Submodules
+from visa_mock.base.clock import Clock
+from visa_mock.base.conversion import BinaryBlock
+
+_IMMUTABLE_TYPES = (
+    int, float, complex, str, bytes, bool, type(None), frozenset, range,
+    BinaryBlock
+)
+# Attributes which are not part of the state
+_EXCLUDED_ATTRIBUTES = frozenset((
+    "lock", "_version", "_reply_cache", "_status_changed", "__dict__", "__weakref__"
+))
+# Callbacks, e.g. of pending operations, are kept by reference
+_CALLABLE_TYPES = (FunctionType, MethodType, BuiltinFunctionType, partial)
+
+_state_attributes: Dict[type, Tuple[str, ...]] = {}
+
+
+def _slot_attributes(mocker_class: type) -> Tuple[str, ...]:
+    attributes = _state_attributes.get(mocker_class)
+
+    if attributes is None:
+        names = []
+        for cls in reversed(mocker_class.__mro__):
+            slots = cls.__dict__.get("__slots__", ())
+            if isinstance(slots, str):
+                slots = (slots,)
+            names.extend(name for name in slots if name not in _EXCLUDED_ATTRIBUTES)
+
+        attributes = _state_attributes[mocker_class] = tuple(names)
+
+    return attributes
+
+
+def _get_state(mocker: BaseMocker) -> Dict[str, Any]:
+    state = {
+        name: getattr(mocker, name)
+        for name in _slot_attributes(type(mocker))
+        if hasattr(mocker, name)
+    }
+    state.update(getattr(mocker, "__dict__", {}))
+    return state
+
+
+def _copy_value(value: Any, mockers: List[BaseMocker]) -> Any:
+    """
+    Copy a state value, keeping references to mockers and adding them to
+    `mockers`
+    """
+    if isinstance(value, _IMMUTABLE_TYPES):
+        return value
+    if isinstance(value, BaseMocker):
+        mockers.append(value)
+        return value
+    if isinstance(value, (Clock, _CALLABLE_TYPES)):
+        # Clocks and callbacks are shared, not state
+        return value
+    if isinstance(value, Submodules):
+        mockers.extend(module for _, module in value.created())
+        return copy.copy(value)
+    if isinstance(value, (ChannelArray, array)):
+        return copy.copy(value)
+    if isinstance(value, dict):
+        copied = copy.copy(value)
+        for key, item in value.items():
+            copied[key] = _copy_value(item, mockers)
+        return copied
+    if isinstance(value, (list, set, tuple)):
+        return type(value)(_copy_value(item, mockers) for item in value)
+
+    return copy.deepcopy(value)
+
+
+class Snapshot:
+    """
+    The state of a mocker and of its sub-modules at some point in time
+    """
+    __slots__ = ("_entries",)
+
+    def __init__(self, mocker: BaseMocker) -> None:
+        # The mockers, their versions and their states
+        self._entries: List[Tuple[BaseMocker, int, Dict[str, Any]]] = []
+        seen = set()
+        pending = [mocker]
+
+        while pending:
+            current = pending.pop()
+            if id(current) in seen:
+                continue
+            seen.add(id(current))
+
+            with current.lock:
+                state = {
+                    name: _copy_value(value, pending)
+                    for name, value in _get_state(current).items()
+                }
+                self._entries.append((current, current._version, state))
+
+    def __len__(self) -> int:
+        """
+        The number of mockers in the snapshot
+        """
+        return len(self._entries)
+
+    def changed(self) -> List[BaseMocker]:
+        """
+        The mockers whose state changed since the snapshot was taken
+        """
+        return [
+            mocker for mocker, version, _ in self._entries
+            if mocker._version != version
+        ]
+
+    def restore(self) -> int:
+        """
+        Restore the state of the changed mockers.
+
+        Returns:
+            The number of restored mockers
+        """
+        restored = 0
+
+        for mocker, version, state in self._entries:
+            if mocker._version == version:
+                continue
+
+            # Cached replies of parents may depend on the restored state
+            if restored == 0:
+                for cached, _, _ in self._entries:
+                    cached.clear_reply_cache()
+
+            with mocker.lock:
+                if hasattr(mocker, "__dict__"):
+                    mocker.__dict__.clear()
+
+                for name, value in state.items():
+                    setattr(mocker, name, _copy_value(value, []))
+
+                mocker._version = version
+
+            restored += 1
+
+        return restored
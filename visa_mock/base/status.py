@@ -0,0 +1,320 @@
+"""
+IEEE 488.2 status reporting and long-running operations, so that clients
+can wait for service requests instead of polling.
+
+`StatusMocker` implements the common commands *CLS, *ESE, *ESE?, *ESR?,
+*OPC, *OPC?, *SRE, *SRE?, *STB? and *WAI. Subclasses start long-running
+operations, which complete after a duration of the clock of the mocker:
+
+    class Sweeper(StatusMocker):
+
+        @scpi(r":SWEEP:START$")
+        def _start(self) -> None:
+            self.start_operation(2.0, self._sweep_done)
+
+    resource.write("*ESE 1;*SRE 32")  # request service when operations complete
+    resource.enable_event(EventType.service_request, EventMechanism.queue)
+    resource.write(":SWEEP:START;*OPC")
+    resource.wait_on_event(EventType.service_request, 5000)
+
+`wait_on_event` and *OPC? sleep until the next operation deadline, or until
+another thread changes the status and notifies the condition variable of the
+mocker; they never poll. Operations are completed when their deadline has
+passed and the status is observed. With a `SimulatedClock`, waiting advances
+the virtual time to the next deadline instead of sleeping. Through `asend`,
+e.g. on a `DeviceHost`, *OPC? and *WAI wait in an executor thread, so the
+event loop keeps running.
+
+The message available bit (MAV) of the status byte is not modelled.
+"""
+import heapq
+import threading
+from typing import Callable, List, Optional, Tuple
+
+from visa_mock.base.base_mocker import BaseMocker, scpi
+from visa_mock.base.clock import Clock
+from visa_mock.base.timing import TimingModel
+
+# Status byte bits
+STB_ESB = 0x20  # Event status summary
+STB_RQS = 0x40  # Request service (MSS in *STB? replies)
+
+# Standard event status register bits
+ESR_OPC = 0x01  # Operation complete
+
+Operation = Tuple[float, int, Optional[Callable[[], None]]]
+
+
+class StatusMocker(BaseMocker):
+    """
+    A mocker with IEEE 488.2 status registers and long-running operations,
+    see the module documentation.
+    """
+    __slots__ = (
+        "_esr", "_ese", "_sre", "_summary", "_operations", "_operation_count",
+        "_opc_armed", "_mss", "_rqs", "_srq_count", "_status_changed"
+    )
+
+    def __init__(
+            self,
+            call_delay: float = 0.0,
+            clock: Optional[Clock] = None,
+            timing: Optional[TimingModel] = None
+    ) -> None:
+        super().__init__(call_delay=call_delay, clock=clock, timing=timing)
+        self._esr = 0
+        self._ese = 0
+        self._sre = 0
+        # Instrument specific bits of the status byte
+        self._summary = 0
+        # A heap of deadlines, sequence numbers and completion callbacks
+        self._operations: List[Operation] = []
+        self._operation_count = 0
+        self._opc_armed = False
+        self._mss = False
+        self._rqs = False
+        self._srq_count = 0
+        self._status_changed = threading.Condition(self.lock)
+
+    def start_operation(
+            self,
+            duration: float,
+            on_complete: Optional[Callable[[], None]] = None
+    ) -> None:
+        """
+        Start an operation which completes after `duration` seconds.
+
+        Args:
+            duration: the duration in seconds of the clock of the mocker
+            on_complete: called, while holding the lock of the mocker, when
+                the operation completes
+        """
+        with self._status_changed:
+            self._operation_count += 1
+            deadline = self.clock.time() + duration
+            heapq.heappush(self._operations, (deadline, self._operation_count, on_complete))
+            # Waiting threads need to wake up at the new deadline
+            self._status_changed.notify_all()
+
+    @property
+    def pending_operations(self) -> int:
+        with self.lock:
+            self._complete_operations()
+            return len(self._operations)
+
+    @property
+    def status_byte(self) -> int:
+        """
+        The status byte as replied to *STB?, with the master summary status
+        in bit 6
+        """
+        with self.lock:
+            self._complete_operations()
+            return self._status_byte()
+
+    @property
+    def service_request_count(self) -> int:
+        """
+        The number of service requests raised so far
+        """
+        with self.lock:
+            self._complete_operations()
+            return self._srq_count
+
+    def set_event_status(self, bits: int) -> None:
+        """
+        Set bits of the standard event status register
+        """
+        with self.lock:
+            self._esr |= bits
+            self._update_status()
+
+    def set_status_bits(self, bits: int, value: bool = True) -> None:
+        """
+        Set or clear instrument specific bits of the status byte, e.g. the
+        summary of a questionable status register
+        """
+        bits &= ~(STB_ESB | STB_RQS)
+        with self.lock:
+            if value:
+                self._summary |= bits
+            else:
+                self._summary &= ~bits
+            self._update_status()
+
+    def serial_poll(self) -> int:
+        """
+        Read the status byte as a serial poll (viReadSTB) does: bit 6 tells
+        whether the device requested service since the last poll.
+        """
+        with self.lock:
+            self._complete_operations()
+            status = self._status_byte() & ~STB_RQS
+            if self._rqs:
+                status |= STB_RQS
+                self._rqs = False
+            return status
+
+    def wait_for_operations(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until all operations are complete.
+
+        Args:
+            timeout: the maximum time to wait in seconds, forever if None
+
+        Returns:
+            Whether the operations completed within the timeout
+        """
+        with self._status_changed:
+            end = None if timeout is None else self.clock.time() + timeout
+
+            while True:
+                self._complete_operations()
+                if not self._operations:
+                    return True
+                if not self._wait(self._operations[0][0], end):
+                    return False
+
+    def wait_for_service_request(self, seen: int, timeout: Optional[float] = None) -> Optional[int]:
+        """
+        Wait for a service request.
+
+        Args:
+            seen: the number of service requests seen by the caller, see
+                `service_request_count`
+            timeout: the maximum time to wait in seconds, forever if None
+
+        Returns:
+            The number of service requests raised so far, or None if none
+            was raised after the first `seen` within the timeout
+        """
+        with self._status_changed:
+            end = None if timeout is None else self.clock.time() + timeout
+
+            while True:
+                self._complete_operations()
+                if self._srq_count > seen:
+                    return self._srq_count
+
+                deadline = self._operations[0][0] if self._operations else None
+                if not self._wait(deadline, end):
+                    return None
+
+    def _wait(self, deadline: Optional[float], end: Optional[float]) -> bool:
+        """
+        Wait until the next operation deadline or the end of the timeout,
+        whichever comes first, or until notified.
+
+        Returns:
+            False if the timeout has ended
+        """
+        now = self.clock.time()
+        if end is not None and now >= end:
+            return False
+
+        limits = [limit for limit in (deadline, end) if limit is not None]
+        self.clock.wait(self._status_changed, min(limits) - now if limits else None)
+        return True
+
+    def complete_operations(self) -> None:
+        """
+        Complete the operations whose deadline has passed. Handlers reading
+        state set by completion callbacks call this first.
+        """
+        with self.lock:
+            self._complete_operations()
+
+    def _complete_operations(self) -> None:
+        if not self._operations:
+            return
+
+        now = self.clock.time()
+        completed = False
+        while self._operations and self._operations[0][0] <= now:
+            _, _, on_complete = heapq.heappop(self._operations)
+            completed = True
+            if on_complete is not None:
+                on_complete()
+
+        if not completed:
+            return
+
+        self.mark_changed()
+        if not self._operations and self._opc_armed:
+            self._opc_armed = False
+            self._esr |= ESR_OPC
+        self._update_status()
+
+    def _status_byte(self) -> int:
+        status = self._summary
+        if self._esr & self._ese:
+            status |= STB_ESB
+        if status & self._sre & ~STB_RQS:
+            status |= STB_RQS
+        return status
+
+    def _update_status(self) -> None:
+        """
+        Raise a service request when the master summary status is set
+        """
+        mss = bool(self._status_byte() & STB_RQS)
+        if mss and not self._mss:
+            self._rqs = True
+            self._srq_count += 1
+            self._status_changed.notify_all()
+        self._mss = mss
+
+    @scpi(r"\*CLS$")
+    def _clear_status(self) -> None:
+        self._esr = 0
+        self._opc_armed = False
+        self._rqs = False
+        self._update_status()
+
+    @scpi(r"\*ESE (\d+)")
+    def _set_event_status_enable(self, mask: int) -> None:
+        self._ese = mask
+        self._update_status()
+
+    @scpi(r"\*ESE\?")
+    def _get_event_status_enable(self) -> int:
+        return self._ese
+
+    @scpi(r"\*ESR\?")
+    def _read_event_status(self) -> int:
+        self._complete_operations()
+        status, self._esr = self._esr, 0
+        self._update_status()
+        return status
+
+    @scpi(r"\*OPC$")
+    def _arm_operation_complete(self) -> None:
+        self._complete_operations()
+        if self._operations:
+            self._opc_armed = True
+        else:
+            self._esr |= ESR_OPC
+            self._update_status()
+
+    @scpi(r"\*OPC\?", blocking=True)
+    def _operation_complete(self) -> int:
+        self.wait_for_operations()
+        return 1
+
+    @scpi(r"\*SRE (\d+)")
+    def _set_service_request_enable(self, mask: int) -> None:
+        self._sre = mask & ~STB_RQS
+        self._update_status()
+
+    @scpi(r"\*SRE\?")
+    def _get_service_request_enable(self) -> int:
+        return self._sre
+
+    @scpi(r"\*STB\?")
+    def _read_status_byte(self) -> int:
+        self._complete_operations()
+        return self._status_byte()
+
+    @scpi(r"\*WAI$", blocking=True)
+    def _wait_to_continue(self) -> None:
+        self.wait_for_operations()
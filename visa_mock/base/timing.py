@@ -0,0 +1,140 @@
+"""
+Timing models of instruments, which replace the flat call delay of a mocker
+by three parts:
+
+* a fixed latency per command (plus the call delay of the command, see
+  `BaseMocker.set_call_delay`),
+* the time to transfer the message and its reply, at the bytes per second of
+  the interface of the instrument (`INTERFACE_BYTES_PER_SECOND`),
+* the time the command waits for the commands before it: the instrument
+  executes one command at a time, so commands sent back to back, e.g. from
+  several threads, queue up.
+
+A random jitter, drawn from a seedable generator, can be added to every
+command. A model is given to a mocker per instance:
+
+    mocker.timing = TimingModel(
+        latency=0.001, interface="GPIB", jitter=normal_jitter(0.0002), seed=1
+    )
+
+Delays are measured with the clock of the mocker, so models work with real
+and simulated time (see `visa_mock.base.clock`).
+"""
+import random
+import threading
+from typing import Callable, Dict, Optional
+
+Jitter = Callable[[random.Random], float]
+
+# Typical sustained transfer rates of instrument interfaces
+INTERFACE_BYTES_PER_SECOND: Dict[str, float] = {
+    "GPIB": 1e6,
+    "ASRL": 11520.0,  # 115200 baud with 10 bits per byte
+    "USB": 40e6,
+    "TCPIP": 10e6,
+    "MOCK": float("inf"),
+}
+
+
+def normal_jitter(sigma: float, mean: float = 0.0) -> Jitter:
+    """
+    Normally distributed jitter, in seconds
+    """
+    def jitter(generator: random.Random) -> float:
+        return generator.gauss(mean, sigma)
+    return jitter
+
+
+def uniform_jitter(low: float, high: float) -> Jitter:
+    def jitter(generator: random.Random) -> float:
+        return generator.uniform(low, high)
+    return jitter
+
+
+def exponential_jitter(mean: float) -> Jitter:
+    def jitter(generator: random.Random) -> float:
+        return generator.expovariate(1.0 / mean)
+    return jitter
+
+
+class TimingModel:
+    """
+    The timing of the commands of one instrument, see the module
+    documentation.
+
+    Args:
+        latency: the fixed latency of every command in seconds
+        interface: the interface type, selecting the transfer rate from
+            `INTERFACE_BYTES_PER_SECOND`
+        bytes_per_second: the transfer rate, overriding that of `interface`.
+            Without either, transfers take no time.
+        jitter: a function drawing a random jitter from the generator it is
+            given, e.g. `normal_jitter(0.001)`
+        seed: the seed of the jitter generator
+        queue: whether commands wait for the instrument to finish the
+            commands before them
+    """
+
+    def __init__(
+            self,
+            latency: float = 0.0,
+            interface: Optional[str] = None,
+            bytes_per_second: Optional[float] = None,
+            jitter: Optional[Jitter] = None,
+            seed: Optional[int] = None,
+            queue: bool = True
+    ) -> None:
+        if bytes_per_second is None and interface is not None:
+            bytes_per_second = INTERFACE_BYTES_PER_SECOND[interface.upper()]
+
+        self.latency = latency
+        self.bytes_per_second = bytes_per_second
+        self.jitter = jitter
+        self.queue = queue
+
+        self._random = random.Random(seed)
+        self._busy_until = float("-inf")
+        self._lock = threading.Lock()
+
+    def __deepcopy__(self, memo: dict) -> 'TimingModel':
+        # The model is configuration shared by snapshots, not state
+        return self
+
+    def service_time(self, call_delay: float, byte_count: int) -> float:
+        """
+        The time the instrument takes for a command, without waiting
+        """
+        duration = self.latency + call_delay
+
+        if self.bytes_per_second:
+            duration += byte_count / self.bytes_per_second
+        if self.jitter is not None:
+            duration += self.jitter(self._random)
+
+        return max(duration, 0.0)
+
+    def delay(self, call_delay: float, byte_count: int, now: float) -> float:
+        """
+        The delay of a command sent at time `now`, until its reply is
+        available.
+
+        Args:
+            call_delay: the call delay of the command
+            byte_count: the number of bytes of the message and the reply
+            now: the current time of the clock of the mocker
+        """
+        with self._lock:
+            duration = self.service_time(call_delay, byte_count)
+            if not self.queue:
+                return duration
+
+            start = max(now, self._busy_until)
+            self._busy_until = start + duration
+            return self._busy_until - now
+
+    def reset(self) -> None:
+        """
+        Forget the commands in the queue
+        """
+        with self._lock:
+            self._busy_until = float("-inf")
@@ -0,0 +1,210 @@
+"""
+Opt-in tracing of VISA calls as Chrome trace events, which can be viewed in
+chrome://tracing or https://ui.perfetto.dev.
+
+While a tracer is started, the calls of `MockVisaLibrary` (open, close,
+write, read, query, ...) and the messages sent by sessions to their devices
+are recorded as complete ("X") events with the thread, session, resource
+name, command and duration:
+
+    start_tracing("trace.json")
+    ...
+    stop_tracing()
+
+Events are buffered and appended to the file `buffer_size` events at a time.
+With `ring_size`, only the last `ring_size` events are kept in memory and
+they are written when the tracer is stopped (or `save` is called), which
+bounds the memory used by long runs.
+
+When no tracer is started the only cost is a check of the module level
+`tracer` attribute per call.
+"""
+import json
+import os
+import threading
+from collections import deque
+from time import perf_counter
+from typing import Any, Deque, Dict, IO, List, Optional, Set, Tuple
+
+# name, start [us], duration [us], thread id, session, resource, command
+_Event = Tuple[str, float, float, int, Optional[int], Optional[str], Optional[str]]
+
+
+class Tracer:
+    """
+    Records trace events. All methods may be called from several threads.
+
+    Args:
+        path: the JSON file events are written to. Without a path, events
+            are only kept in memory, see `events`.
+        ring_size: keep only the last `ring_size` events and write them when
+            the tracer is closed.
+        buffer_size: the number of events buffered before they are appended
+            to the file, if no ring size is given.
+    """
+
+    def __init__(
+            self,
+            path: Optional[str] = None,
+            ring_size: Optional[int] = None,
+            buffer_size: int = 1024
+    ) -> None:
+        self.path = path
+        self.ring_size = ring_size
+        self.buffer_size = buffer_size
+
+        self._lock = threading.Lock()
+        self._buffer: Deque[_Event] = deque(maxlen=ring_size)
+        self._thread_names: Dict[int, str] = {}
+        self._written_threads: Set[int] = set()
+        self._file: Optional[IO[str]] = None
+        self._event_count = 0
+        self._pid = os.getpid()
+
+    @staticmethod
+    def now() -> float:
+        """
+        The current time in microseconds, to be passed to `complete`
+        """
+        return perf_counter() * 1e6
+
+    def complete(
+            self,
+            name: str,
+            start: float,
+            session: Optional[int] = None,
+            resource: Optional[str] = None,
+            command: Optional[str] = None
+    ) -> None:
+        """
+        Record a call which started at `start` (see `now`) and ends now
+        """
+        duration = perf_counter() * 1e6 - start
+        thread = threading.current_thread()
+
+        with self._lock:
+            if thread.ident not in self._thread_names:
+                self._thread_names[thread.ident] = thread.name
+
+            self._buffer.append(
+                (name, start, duration, thread.ident, session, resource, command)
+            )
+
+            if self.ring_size is None and len(self._buffer) >= self.buffer_size:
+                self._flush()
+
+    def events(self) -> List[Dict[str, Any]]:
+        """
+        The buffered events as trace event dicts, preceded by the names of
+        their threads
+        """
+        with self._lock:
+            threads = {event[3] for event in self._buffer}
+            return self._thread_events(threads) + list(map(self._to_dict, self._buffer))
+
+    def save(self, path: str) -> None:
+        """
+        Write the buffered events to `path` as a JSON trace file
+        """
+        with open(path, "w") as file:
+            json.dump({"traceEvents": self.events()}, file)
+
+    def close(self) -> None:
+        """
+        Write the remaining events to the file of the tracer
+        """
+        if self.path is None:
+            return
+
+        if self.ring_size is not None:
+            self.save(self.path)
+            return
+
+        with self._lock:
+            self._flush()
+            if self._file is not None:
+                self._file.write("\n]\n")
+                self._file.close()
+                self._file = None
+
+    def _flush(self) -> None:
+        if self.path is None:
+            return
+
+        if self._file is None:
+            self._file = open(self.path, "w")
+            self._file.write("[\n")
+
+        new_threads = {event[3] for event in self._buffer} - self._written_threads
+        self._written_threads |= new_threads
+
+        for event in self._thread_events(new_threads) + list(map(self._to_dict, self._buffer)):
+            if self._event_count:
+                self._file.write(",\n")
+            self._file.write(json.dumps(event, separators=(",", ":")))
+            self._event_count += 1
+
+        self._file.flush()
+        self._buffer.clear()
+
+    def _thread_events(self, threads: Set[int]) -> List[Dict[str, Any]]:
+        return [
+            {
+                "name": "thread_name",
+                "ph": "M",
+                "pid": self._pid,
+                "tid": thread,
+                "args": {"name": self._thread_names[thread]},
+            }
+            for thread in sorted(threads)
+        ]
+
+    def _to_dict(self, event: _Event) -> Dict[str, Any]:
+        name, start, duration, thread, session, resource, command = event
+
+        args: Dict[str, Any] = {}
+        if session is not None:
+            args["session"] = session
+        if resource is not None:
+            args["resource"] = resource
+        if command is not None:
+            args["command"] = command
+
+        return {
+            "name": name,
+            "cat": "visa",
+            "ph": "X",
+            "ts": start,
+            "dur": duration,
+            "pid": self._pid,
+            "tid": thread,
+            "args": args,
+        }
+
+
+tracer: Optional[Tracer] = None
+
+
+def start_tracing(
+        path: Optional[str] = None,
+        ring_size: Optional[int] = None,
+        buffer_size: int = 1024
+) -> Tracer:
+    """
+    Start tracing with a new tracer, which is returned. See `Tracer` for the
+    arguments.
+    """
+    global tracer
+    stop_tracing()
+    tracer = Tracer(path, ring_size, buffer_size)
+    return tracer
+
+
+def stop_tracing() -> None:
+    """
+    Stop tracing and write the remaining events of the tracer
+    """
+    global tracer
+    stopped, tracer = tracer, None
+    if stopped is not None:
+        stopped.close()
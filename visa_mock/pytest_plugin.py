@@ -0,0 +1,29 @@
+"""
+Pytest fixtures resetting the registered mock resources between tests. Load
+them in a conftest.py with
+
+    pytest_plugins = ["visa_mock.pytest_plugin"]
+
+and register the resources before the first test using `mock_resources`.
+The state of the registered mockers is captured when the fixture is first
+used and restored after every test using it, see `visa_mock.base.snapshot`.
+"""
+from typing import Dict, Iterator
+
+import pytest
+
+from visa_mock.base.register import ResourceRegistry, resources
+from visa_mock.base.snapshot import Snapshot
+
+
+@pytest.fixture(scope="session")
+def mock_resources_baseline() -> Dict[str, Snapshot]:
+    return resources.snapshot()
+
+
+@pytest.fixture
+def mock_resources(
+        mock_resources_baseline: Dict[str, Snapshot]
+) -> Iterator[ResourceRegistry]:
+    yield resources
+    resources.restore(mock_resources_baseline)
@@ -1,3 +1,10 @@
+import subprocess
+import sys
+
+import pytest
+
+from visa_mock.base.base_mocker import BaseMocker, MockingError, scpi
+from visa_mock.base.clock import SimulatedClock
 from visa_mock.test.mock_instruments.instruments import Mocker1, Mocker2, Mocker3, Mocker4
 
 
@@ -79,3 +86,196 @@ def test_modular_2_mock():
     mocker4.send(":INSTR2:CHANNEL2:VOLT -13.4")
     voltage = mocker4.send(":INSTR2:CHANNEL2:VOLT?")
     assert voltage == "-13.4"
+
+
+def test_overlapping_patterns():
+
+    class OverlappingMocker(BaseMocker):
+
+        @scpi(r":VOLT\?")
+        def _get_voltage(self) -> float:
+            return 1.0
+
+        @scpi(r":VOLT(.*)")
+        def _set_voltage(self, value: str) -> None:
+            pass
+
+    mocker = OverlappingMocker()
+    with pytest.raises(MockingError):
+        mocker.send(":VOLT?")
+
+    mocker.send(":VOLT 12")
+
+
+def test_overlapping_patterns_strict():
+
+    with pytest.raises(MockingError):
+        class OverlappingMocker(BaseMocker, strict=True):
+
+            @scpi(r":VOLT\?")
+            def _get_voltage(self) -> float:
+                return 1.0
+
+            @scpi(r":VOLT(.*)")
+            def _set_voltage(self, value: str) -> None:
+                pass
+
+
+def test_modular_dispatch_table_size():
+    # Sub-module patterns are not copied into the table of the parent
+    assert len(Mocker4.__scpi_dict__) == 1
+    assert len(Mocker3.__scpi_dict__) == 1
+
+
+def test_modular_call_delay():
+    mocker = Mocker4()
+    mocker.set_call_delay(1.0, r":INSTR(.*):CHANNEL(.*):VOLT\?")
+
+    route = mocker._resolve(":INSTR1:CHANNEL2:VOLT?")
+    assert mocker._get_call_delay(route) == 1.0
+    # Call delays are set per instance
+    assert Mocker4()._get_call_delay(route) == 0.0
+
+
+def test_resolution_cache():
+    mocker = Mocker1()
+    Mocker1.invalidate_scpi_cache()
+
+    mocker.send(":INSTR:CHANNEL1:VOLT 12")
+    mocker.send(":INSTR:CHANNEL1:VOLT?")
+    voltage = mocker.send(":INSTR:CHANNEL1:VOLT?")
+    assert voltage == "12.0"
+
+    info = Mocker1.scpi_cache_info()
+    assert (info.hits, info.misses, info.currsize) == (1, 2, 2)
+
+    Mocker1.set_scpi_cache_size(1)
+    assert Mocker1.scpi_cache_info().currsize == 1
+
+    Mocker1.invalidate_scpi_cache()
+    assert Mocker1.scpi_cache_info() == (0, 0, 1, 0)
+    Mocker1.set_scpi_cache_size(512)
+
+
+def test_handler_added_after_first_send():
+
+    class ExtendedMocker(BaseMocker):
+
+        @scpi(r":VOLT\?")
+        def _get_voltage(self) -> float:
+            return 1.0
+
+    class ExtendedChild(ExtendedMocker):
+        pass
+
+    mocker = ExtendedMocker()
+    child = ExtendedChild()
+    assert mocker.send(":VOLT?") == "1.0"
+    assert child.send(":VOLT?") == "1.0"
+
+    def get_current(self) -> float:
+        return 2.0
+
+    for mocker_class in (ExtendedMocker, ExtendedChild):
+        mocker_class.__scpi_dict__[r":CURR\?"] = BaseMocker.scpi(r":CURR\?")(get_current)
+
+    ExtendedMocker.invalidate_scpi_cache()
+    assert mocker.send(":CURR?") == "2.0"
+    assert child.send(":CURR?") == "2.0"
+
+
+def test_batch():
+    mocker = Mocker3()
+
+    reply = mocker.send(":CHANNEL1:VOLT 12;:CHANNEL2:VOLT 3;:CHANNEL1:VOLT?;:CHANNEL2:VOLT?")
+    assert reply == "12.0;3.0"
+
+    # The path of the previous command is inherited
+    reply = mocker.send(":CHANNEL1:VOLT 1;VOLT?")
+    assert reply == "1.0"
+
+
+def test_batch_delay_mode():
+    clock = SimulatedClock()
+    mocker = Mocker1(call_delay=1.0)
+    mocker.clock = clock
+
+    mocker.send(":INSTR:CHANNEL1:VOLT 1;:INSTR:CHANNEL1:VOLT?")
+    assert clock.time() == 2.0
+
+    mocker.set_batch_delay_mode(per_command=False)
+    mocker.send(":INSTR:CHANNEL1:VOLT 1;:INSTR:CHANNEL1:VOLT?")
+    assert clock.time() == 3.0
+
+
+class ForwardParent(BaseMocker):
+
+    # The sub-module class is defined after the parent
+    @scpi(r":CHILD(.*)")
+    def _child(self, number: int) -> "ForwardChild":
+        return ForwardChild()
+
+
+class ForwardChild(BaseMocker):
+
+    @scpi(r":VALUE\?")
+    def _value(self) -> int:
+        return 3
+
+
+def test_handlers_introspected_on_first_send():
+    assert ForwardParent._dispatch_index is None
+    assert ForwardParent().send(":CHILD1:VALUE?") == "3"
+    assert ForwardParent._dispatch_index is not None
+
+
+def test_import_does_not_load_pyvisa():
+    code = (
+        "import sys\n"
+        "import visa_mock.base.register, visa_mock.test.mock_instruments.instruments\n"
+        "print('pyvisa' in sys.modules, 'asyncio' in sys.modules)\n"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    ).stdout
+
+    assert output.split() == ["False", "False"]
+
+
+def test_invalid_pattern():
+
+    class InvalidMocker(BaseMocker):
+
+        @scpi(r":VOLT(")
+        def _get_voltage(self) -> float:
+            return 1.0
+
+    with pytest.raises(MockingError):
+        InvalidMocker().send(":VOLT?")
+
+
+def test_deprecated_search_fallback():
+
+    class UnanchoredMocker(BaseMocker):
+
+        @scpi(r"CHANNEL(\d):VOLT\?")
+        def _get_voltage(self, channel: int) -> float:
+            return float(channel)
+
+    mocker = UnanchoredMocker()
+    assert mocker.send("CHANNEL2:VOLT?") == "2.0"
+
+    with pytest.warns(DeprecationWarning):
+        assert mocker.send(":INSTR:CHANNEL3:VOLT?") == "3.0"
+
+    with pytest.raises(ValueError):
+        mocker.send(":INSTR:CHANNEL3:CURR?")
+
+
+def test_deprecated_search_fallback_with_submodules():
+    # Mocker4 handles ":INSTR:CHANNEL<n>:VOLT?" through submodules
+    mocker = Mocker4()
+    mocker.send(":INSTR1:CHANNEL2:VOLT 4")
+
+    with pytest.warns(DeprecationWarning):
+        assert mocker.send("*:INSTR1:CHANNEL2:VOLT?") == "4.0"
@@ -0,0 +1,43 @@
+import pytest
+
+from visa_mock.base.channels import ChannelArray, Submodules
+from visa_mock.test.mock_instruments.instruments import (
+    Mocker3, MockerChannel, MockerCompact
+)
+
+
+def test_channel_array():
+    voltages = ChannelArray(4, default=1.0)
+    voltages[4] = 2.5
+
+    assert list(voltages) == [1.0, 1.0, 1.0, 2.5]
+    assert voltages[4] == 2.5
+    assert voltages.channels() == range(1, 5)
+
+    with pytest.raises(ValueError):
+        voltages[5]
+    with pytest.raises(ValueError):
+        voltages[0] = 1.0
+
+
+def test_submodules_are_created_on_first_use():
+    channels = Submodules(MockerChannel, 8)
+    assert channels.created() == []
+
+    channel = channels[3]
+    assert channels[3] is channel
+    assert channels.created() == [(3, channel)]
+
+    mocker = Mocker3()
+    mocker.send(":CHANNEL2:VOLT 1.5")
+    assert mocker.send(":CHANNEL2:VOLT?") == "1.5"
+    assert [number for number, _ in mocker._channels.created()] == [2]
+
+
+def test_compact_mocker_has_no_dict():
+    mocker = MockerCompact()
+    assert not hasattr(mocker, "__dict__")
+
+    mocker.send(":INSTR:CHANNEL64:VOLT 3.5")
+    assert mocker.send(":INSTR:CHANNEL64:VOLT?") == "3.5"
+    assert mocker.send(":INSTR:CHANNEL1:VOLT?") == "0.0"
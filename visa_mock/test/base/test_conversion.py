@@ -0,0 +1,166 @@
+import array
+from enum import Enum
+from typing import List
+
+import pytest
+
+from visa_mock.base.base_mocker import BaseMocker, scpi
+from visa_mock.base.conversion import (
+    ArrayFormat, BinaryBlock, ChunkedReply, converter, formatter, parse_bool
+)
+
+
+class Mode(Enum):
+    voltage = "VOLT"
+    current = "CURR"
+
+
+class SwitchMocker(BaseMocker):
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._output = False
+        self._mode = Mode.voltage
+
+    @scpi(r":OUTP (.*)")
+    def _set_output(self, state: bool) -> None:
+        self._output = state
+
+    @scpi(r":OUTP\?")
+    def _get_output(self) -> bool:
+        return self._output
+
+    @scpi(r":FUNC (.*)")
+    def _set_mode(self, mode: Mode) -> None:
+        self._mode = mode
+
+    @scpi(r":FUNC\?")
+    def _get_mode(self) -> Mode:
+        return self._mode
+
+
+def test_parse_bool():
+    assert parse_bool("ON") is True
+    assert parse_bool("off") is False
+    assert parse_bool("0") is False
+    assert parse_bool("1") is True
+    assert parse_bool("0.2") is False
+
+    with pytest.raises(ValueError):
+        parse_bool("maybe")
+
+
+def test_converters():
+    assert converter(str)("12") == "12"
+    assert converter(int)("12") == 12
+    assert converter(Mode)("curr") is Mode.current
+    assert converter(Mode)("Voltage") is Mode.voltage
+
+    assert formatter(type(None))(1) is None
+    assert formatter(bool)(True) == "1"
+    assert formatter(Mode)(Mode.current) == "CURR"
+
+
+def test_typed_handlers():
+    mocker = SwitchMocker()
+
+    assert mocker.send(":OUTP ON") is None
+    assert mocker.send(":OUTP?") == "1"
+    mocker.send(":OUTP 0")
+    assert mocker.send(":OUTP?") == "0"
+
+    mocker.send(":FUNC CURR")
+    assert mocker.send(":FUNC?") == "CURR"
+
+
+def test_binary_block():
+    block = BinaryBlock(b"0123456789abc")
+
+    assert bytes(block) == b"#2130123456789abc"
+    assert len(block) == 17
+    assert block[0:5] == b"#2130"
+    assert isinstance(block[4:8], memoryview)
+    assert bytes(block[4:8]) == b"0123"
+
+
+def test_mutable_buffer_is_copied():
+    data = bytearray(b"0123")
+    block = BinaryBlock(data)
+
+    # The buffer can still be resized and changes do not alter the reply
+    data += b"45"
+    data[0:1] = b"x"
+    assert bytes(block) == b"#140123"
+
+
+def test_numpy_block():
+    np = pytest.importorskip("numpy")
+    waveform = np.linspace(0, 1, 5)
+
+    block = formatter(np.ndarray)(waveform)
+    assert block.header == b"#240"
+    assert not np.shares_memory(np.frombuffer(block.payload), waveform)
+
+    waveform.flags.writeable = False
+    block = formatter(np.ndarray)(waveform)
+    assert np.shares_memory(np.frombuffer(block.payload), waveform)
+
+    block = formatter(np.ndarray)(waveform[::2])
+    assert bytes(block.payload) == waveform[::2].tobytes()
+
+
+def test_array_format():
+    assert formatter(list)([1, 2.5, 3]) == "1,2.5,3"
+    assert formatter(List[float])((1.0, 2.0)) == "1.0,2.0"
+    assert formatter(array.array)(array.array("i", [1, 2])) == "1,2"
+
+    array_format = ArrayFormat(separator=";", number_format=".2e")
+    assert formatter(list, array_format)([1, 20]) == "1.00e+00;2.00e+01"
+
+
+def test_chunked_array():
+    array_format = ArrayFormat(chunk_size=2)
+    reply = formatter(list, array_format)([1, 2, 3, 4, 5])
+
+    assert isinstance(reply, ChunkedReply)
+    assert reply.read(4) == ("1,2,", False)
+    assert len(reply) == 3
+    assert reply.read(4) == ("3,4,", False)
+    assert reply.read() == ("5", True)
+
+
+def test_chunked_array_is_copied():
+    array_format = ArrayFormat(chunk_size=2)
+    values = [1, 2, 3, 4, 5]
+    reply = formatter(list, array_format)(values)
+
+    # Changed, e.g. by a pipelined command, before the reply is read
+    values[0] = 9
+    values.clear()
+    assert reply.size == len("1,2,3,4,5")
+    assert reply.read() == ("1,2,3,4,5", True)
+
+    values = array.array("d", [1.5, 2.5, 3.5])
+    reply = formatter(array.array, array_format)(values)
+    values[0] = 0.0
+    assert reply.read() == ("1.5,2.5,3.5", True)
+
+
+def test_chunked_reply_size():
+    array_format = ArrayFormat(chunk_size=2)
+    reply = formatter(list, array_format)([1, 2, 3, 4, 5])
+    assert reply.size == len("1,2,3,4,5")
+    assert reply.read() == ("1,2,3,4,5", True)
+
+    # Without a measure function, after a partial read
+    reply = ChunkedReply(iter(["ab", "cd", "ef"]))
+    assert reply.read(3) == ("abc", False)
+    assert reply.size == 6
+    assert reply.read() == ("def", True)
+
+
+def test_numpy_ascii_array():
+    np = pytest.importorskip("numpy")
+
+    array_format = ArrayFormat(binary=False, number_format="g")
+    assert formatter(np.ndarray, array_format)(np.arange(3.0)) == "0,1,2"
@@ -1,6 +1,8 @@
+import asyncio
 import pytest
 import time
 from visa_mock.base.base_mocker import BaseMocker
+from visa_mock.base.clock import Clock, RealClock, SimulatedClock, set_clock
 from visa_mock.test.mock_instruments.instruments import Mocker1
 
 
@@ -33,3 +35,60 @@ def test_delay_on_command():
     # Other comands should have no delay:
     time_w_no_delay = time_command(mocker, ":INSTR:CHANNEL1:VOLT?")
     assert time_w_delay - time_w_no_delay == pytest.approx(call_delay, 0.1)
+
+
+def test_delay_on_simulated_clock():
+    clock = SimulatedClock()
+    mocker = Mocker1(call_delay=100.0)
+    mocker.clock = clock
+    cmd_w_delay = ":INSTR:CHANNEL(.*):VOLT (.*)"
+    mocker.set_call_delay(1000.0, cmd_w_delay)
+
+    start = time.monotonic()
+    mocker.send(":INSTR:CHANNEL1:VOLT 12")
+    mocker.send(":INSTR:CHANNEL1:VOLT?")
+    assert time.monotonic() - start < 1.0
+
+    assert clock.time() == 1100.0
+    mocker.set_call_delay(None, cmd_w_delay)
+
+
+def test_default_clock():
+    clock = SimulatedClock(start=10.0)
+    mocker = Mocker1(call_delay=1.0)
+
+    set_clock(clock)
+    try:
+        mocker.send(":INSTR:CHANNEL1:VOLT?")
+    finally:
+        set_clock(RealClock())
+
+    assert clock.time() == 11.0
+    assert isinstance(mocker.clock, RealClock)
+
+
+def test_clock_interface_is_abstract():
+    with pytest.raises(TypeError):
+        Clock()
+
+    class IncompleteClock(Clock):
+        def time(self) -> float:
+            return 0.0
+
+    with pytest.raises(TypeError):
+        IncompleteClock()
+
+
+def test_async_delay_does_not_block_loop():
+    call_delay = 0.5        # unit: [sec]
+    mockers = [Mocker1(call_delay=call_delay) for _ in range(4)]
+
+    async def query_all():
+        return await asyncio.gather(*(
+            mocker.asend(":INSTR:CHANNEL1:VOLT?") for mocker in mockers
+        ))
+
+    start = time.time()
+    replies = asyncio.run(query_all())
+    assert time.time() - start == pytest.approx(call_delay, 0.2)
+    assert replies == ["0.0"] * 4
@@ -0,0 +1,74 @@
+from visa_mock.base.dispatch import (
+    DispatchIndex, example_messages, literal_prefix, split_message
+)
+from visa_mock.test.mock_instruments.instruments import Mocker4
+
+
+def test_literal_prefix():
+    assert literal_prefix(r":INSTR:CHANNEL(.*):VOLT\?") == ":INSTR:CHANNEL"
+    assert literal_prefix(r"\*IDN\?") == "*IDN?"
+    assert literal_prefix(r":VOLT?") == ":VOL"
+    assert literal_prefix(r":VOLT\d") == ":VOLT"
+    assert literal_prefix(r":VOLT|:CURR") == ""
+    assert literal_prefix(r"(.*)") == ""
+
+
+def test_index_candidates():
+    index = DispatchIndex({
+        r":SOUR1:VOLT (.*)": 1,
+        r":SOUR2:VOLT (.*)": 2,
+        r":SOUR(.*):CURR (.*)": 3,
+        r"(.*)\?": 4,
+    })
+
+    handlers = [entry.handler for entry in index.candidates(":SOUR2:VOLT 3")]
+    assert handlers == [2, 3, 4]
+
+    assert index.resolve(":SOUR2:VOLT 3") == ((2, ("3",)),)
+    assert index.resolve(":SOUR2:POW 3") is None
+
+
+def test_example_messages():
+    assert example_messages(r":CHANNEL(.*):VOLT (.*)") == [
+        ":CHANNEL:VOLT ", ":CHANNEL1:VOLT 1"
+    ]
+    assert example_messages(r"\*IDN\?") == ["*IDN?"]
+
+
+def test_overlaps():
+    index = DispatchIndex({
+        r":VOLT (.*)": 1,
+        r":VOLT\?": 2,
+        r":VOLT(.*)": 3,
+    })
+
+    assert set(index.overlaps) == {r":VOLT (.*)", r":VOLT\?", r":VOLT(.*)"}
+    assert [e.pattern for e in index.overlaps[r":VOLT\?"]] == [r":VOLT(.*)"]
+
+
+def test_submodule_examples_do_not_multiply():
+    # Mocker4 -> Mocker3 -> MockerChannel, each level with several examples
+    entry, = Mocker4.__scpi_index__._entries
+    examples = entry.examples()
+
+    assert len(examples) == len(example_messages(entry.pattern))
+    for example in examples:
+        assert Mocker4.__scpi_index__.resolve(example) is not None
+
+
+def test_split_message():
+    assert split_message(":SOUR:VOLT 1;CURR 2;*OPC?;:OUTP ON") == [
+        ":SOUR:VOLT 1", ":SOUR:CURR 2", "*OPC?", ":OUTP ON"
+    ]
+    assert split_message(':DISP:TEXT "a;b";:VOLT?') == [
+        ':DISP:TEXT "a;b"', ":VOLT?"
+    ]
+    assert split_message(":VOLT 1;") == [":VOLT 1"]
+
+
+def test_split_message_with_blocks():
+    assert split_message(":DATA #14a;bc;:VOLT?") == [":DATA #14a;bc", ":VOLT?"]
+    assert split_message(":DATA #210a;b;c;d;e;;*OPC") == [":DATA #210a;b;c;d;e;", "*OPC"]
+    # Indefinite blocks and a bare "#" are not skipped
+    assert split_message(":DATA #0a;:VOLT?") == [":DATA #0a", ":VOLT?"]
+    assert split_message(":NAME #;:VOLT?") == [":NAME #", ":VOLT?"]
@@ -0,0 +1,80 @@
+import math
+
+import pytest
+
+from visa_mock.base.clock import SimulatedClock
+from visa_mock.base.dynamics import DynamicParameter
+from visa_mock.base.timing import normal_jitter
+from visa_mock.test.mock_instruments.instruments import MockerRamp
+
+
+def test_slew_rate():
+    parameter = DynamicParameter(slew_rate=2.0)
+    parameter.set_target(10.0, now=0.0)
+
+    assert parameter.value(1.0) == pytest.approx(2.0)
+    assert parameter.value(5.0) == 10.0
+    assert parameter.settling_time(0.5) == pytest.approx(4.75)
+
+
+def test_time_constant():
+    parameter = DynamicParameter(time_constant=2.0)
+    parameter.set_target(1.0, now=10.0)
+
+    assert parameter.value(12.0) == pytest.approx(1 - math.exp(-1))
+    assert not parameter.settled(12.0, 0.01)
+    assert parameter.settled(10.0 + parameter.settling_time(0.01), 0.01 + 1e-12)
+
+
+def test_slew_limited_settling_is_continuous():
+    parameter = DynamicParameter(slew_rate=1.0, time_constant=0.5)
+    parameter.set_target(-3.0, now=0.0)
+
+    # Linear for 2.5 s, then exponential from 0.5 V away from the target
+    assert parameter.value(1.0) == pytest.approx(-1.0)
+    assert parameter.value(2.5) == pytest.approx(-2.5)
+    assert parameter.value(3.0) == pytest.approx(-3.0 + 0.5 * math.exp(-1))
+
+
+def test_new_target_starts_from_current_value():
+    parameter = DynamicParameter(slew_rate=1.0)
+    parameter.set_target(10.0, now=0.0)
+    parameter.set_target(0.0, now=4.0)
+
+    assert parameter.value(5.0) == pytest.approx(3.0)
+
+
+def test_drift_and_seeded_noise():
+    parameter = DynamicParameter(5.0, drift=0.1)
+    assert parameter.value(100.0) == 5.0
+    assert parameter.value(110.0) == pytest.approx(6.0)
+
+    def reads(seed: int):
+        noisy = DynamicParameter(5.0, noise=normal_jitter(0.01), seed=seed)
+        return [noisy.value(0.0) for _ in range(3)]
+
+    assert reads(1) == reads(1)
+    assert all(abs(value - 5.0) < 0.1 for value in reads(1))
+
+
+def test_mocker_ramp():
+    mocker = MockerRamp()
+    mocker.clock = SimulatedClock()
+
+    mocker.send(":INSTR:CHANNEL3:VOLT 2")
+    mocker.clock.advance(1.0)
+    assert float(mocker.send(":INSTR:CHANNEL3:VOLT?")) == pytest.approx(1.0)
+    mocker.clock.advance(10.0)
+    assert float(mocker.send(":INSTR:CHANNEL3:VOLT?")) == pytest.approx(2.0)
+    assert mocker.send(":INSTR:CHANNEL4:VOLT?") == "0.0"
+
+
+def test_snapshot_restores_ramp():
+    mocker = MockerRamp()
+    mocker.clock = SimulatedClock()
+    baseline = mocker.snapshot()
+
+    mocker.send(":INSTR:CHANNEL1:VOLT 5")
+    mocker.restore(baseline)
+    mocker.clock.advance(10.0)
+    assert mocker.send(":INSTR:CHANNEL1:VOLT?") == "0.0"
@@ -1,4 +1,15 @@
-from visa_mock.base.register import register_resources
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from pyvisa import constants, errors
+
+from visa_mock.base.base_mocker import BaseMocker, scpi
+from visa_mock.base.clock import RealClock, SimulatedClock, set_clock
+from visa_mock.base.register import (
+    register_factory, register_resource, register_resources, resources,
+    unregister_resource
+)
 from visa_mock.test.mock_instruments import instruments
 
 from visa import ResourceManager
@@ -14,3 +25,128 @@ def test_sanity():
     reply = res.query(":INSTR:CHANNEL1:VOLT?")
 
     assert reply == '2.3'
+
+
+def test_async_query():
+
+    register_resources(instruments.resources)
+
+    rc = ResourceManager(visa_library="@mock")
+    res = rc.open_resource("MOCK0::mock1::INSTR")
+
+    async def query():
+        await res.awrite(":INSTR:CHANNEL1:VOLT 4.5")
+        return await res.aquery(":INSTR:CHANNEL1:VOLT?")
+
+    assert asyncio.run(query()) == '4.5'
+
+
+def test_shared_session_from_threads():
+
+    register_resources(instruments.resources)
+
+    rc = ResourceManager(visa_library="@mock")
+    res = rc.open_resource("MOCK0::mock1::INSTR")
+
+    def set_and_query(channel: int) -> str:
+        res.write(f":INSTR:CHANNEL{channel}:VOLT {channel}")
+        return res.query(f":INSTR:CHANNEL{channel}:VOLT?")
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        replies = list(executor.map(set_and_query, range(64)))
+
+    assert replies == [str(float(channel)) for channel in range(64)]
+
+
+def test_binary_block():
+
+    register_resources(instruments.resources)
+
+    rc = ResourceManager(visa_library="@mock")
+    res = rc.open_resource("MOCK0::scope::INSTR")
+
+    res.write(":WAV:DATA?")
+    assert res.read_raw() == b"#210" + bytes(range(10))
+
+    res.write(":WAV:DATA?")
+    assert res.read_bytes(6) == b"#210\x00\x01"
+    assert res.read_raw(3) == b"\x02\x03\x04\x05\x06\x07\x08\x09"
+
+    values = res.query_binary_values(":WAV:DATA?", datatype="B")
+    assert values == list(range(10))
+
+
+def test_ascii_values():
+
+    register_resources(instruments.resources)
+
+    rc = ResourceManager(visa_library="@mock")
+    res = rc.open_resource("MOCK0::scope::INSTR")
+
+    values = res.query_ascii_values(":WAV:POINTS?", converter="d", chunk_size=3)
+    assert values == list(range(10))
+
+
+def test_closed_session_ids_do_not_collide():
+
+    register_resources(instruments.resources)
+
+    rc = ResourceManager(visa_library="@mock")
+    first = rc.open_resource("MOCK0::mock1::INSTR")
+    second = rc.open_resource("MOCK0::mock2::INSTR")
+    second_session = second.session
+    first.close()
+
+    third = rc.open_resource("MOCK0::mock3::INSTR")
+    assert third.session != second_session
+    assert rc.visalib._sessions[second_session].resource_name == "MOCK0::mock2::INSTR"
+
+
+def test_failed_open_releases_resource(monkeypatch):
+    clock = SimulatedClock()
+    set_clock(clock)
+    try:
+        register_factory("MOCK0::failing::INSTR", instruments.Mocker1, idle_timeout=10.0)
+        rc = ResourceManager(visa_library="@mock")
+
+        def no_session(session=None):
+            raise errors.VisaIOError(constants.StatusCode.error_allocation)
+
+        with monkeypatch.context() as patch:
+            patch.setattr(rc.visalib, "new_session", no_session)
+            with pytest.raises(errors.VisaIOError):
+                rc.open_resource("MOCK0::failing::INSTR")
+
+        # The failed open does not keep the mocker from being evicted
+        rc.open_resource("MOCK0::failing::INSTR").close()
+        clock.advance(10.0)
+        assert "MOCK0::failing::INSTR" in resources.evict_idle()
+    finally:
+        unregister_resource("MOCK0::failing::INSTR")
+        set_clock(RealClock())
+
+
+class BlockMocker(BaseMocker):
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.blocks = []
+
+    @scpi(r":DATA (#.*)")
+    def _set_data(self, block: str) -> None:
+        self.blocks.append(block)
+
+
+def test_write_raw_block_with_semicolon():
+    mocker = BlockMocker()
+    register_resource("MOCK0::block::INSTR", mocker)
+    try:
+        rc = ResourceManager(visa_library="@mock")
+        res = rc.open_resource("MOCK0::block::INSTR")
+        res.write_raw(b":DATA #14a;bc")
+        res.write_raw(b":DATA #13;;;;:DATA #12x;")
+        res.close()
+    finally:
+        unregister_resource("MOCK0::block::INSTR")
+
+    assert mocker.blocks == ["#14a;bc", "#13;;;", "#12x;"]
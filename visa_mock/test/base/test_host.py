@@ -0,0 +1,95 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from visa_mock.base.conversion import BinaryBlock
+from visa_mock.base.host import DeviceHost
+from visa_mock.base.register import register_resource, unregister_resource
+from visa_mock.base.remote import RemoteMocker
+from visa_mock.test.mock_instruments.instruments import Mocker1, MockerScope
+
+from visa import ResourceManager
+
+
+@pytest.fixture
+def host():
+    device_host = DeviceHost(
+        {"MOCK0::mock1::INSTR": Mocker1(), "MOCK0::scope::INSTR": MockerScope()},
+        port=0
+    )
+    device_host.start_in_thread()
+    yield device_host
+    device_host.stop()
+
+
+def test_remote_queries(host):
+    remote = RemoteMocker("MOCK0::mock1::INSTR", port=host.port)
+
+    assert remote.send(":INSTR:CHANNEL1:VOLT 1.5") is None
+    assert remote.send(":INSTR:CHANNEL1:VOLT?") == "1.5"
+    assert remote.send(":INSTR:CHANNEL1:VOLT 2;:INSTR:CHANNEL1:VOLT?") == "2.0"
+
+    with pytest.raises(ValueError):
+        remote.send(":INSTR:UNKNOWN?")
+
+    # The connection is still usable after an error
+    assert remote.send(":INSTR:CHANNEL1:VOLT?") == "2.0"
+    assert asyncio.run(remote.asend(":INSTR:CHANNEL1:VOLT?")) == "2.0"
+    remote.close()
+
+
+def test_remote_binary_and_chunked_replies(host):
+    remote = RemoteMocker("MOCK0::scope::INSTR", port=host.port)
+
+    block = remote.send(":WAV:DATA?")
+    assert isinstance(block, BinaryBlock)
+    assert bytes(block.payload) == bytes(range(10))
+
+    assert remote.send(":WAV:POINTS?") == ",".join(map(str, range(10)))
+    remote.close()
+
+
+def test_unknown_remote_resource(host):
+    remote = RemoteMocker("MOCK0::unknown::INSTR", port=host.port)
+    with pytest.raises(ValueError):
+        remote.send("*IDN?")
+
+
+def test_remote_resource_from_threads(host):
+    remote = RemoteMocker("MOCK0::mock1::INSTR", port=host.port)
+    register_resource("MOCK0::remote::INSTR", remote)
+    try:
+        rc = ResourceManager(visa_library="@mock")
+        res = rc.open_resource("MOCK0::remote::INSTR")
+        res.write(":INSTR:CHANNEL3:VOLT 4.5")
+
+        with ThreadPoolExecutor(8) as executor:
+            replies = list(executor.map(
+                lambda _: res.query(":INSTR:CHANNEL3:VOLT?"), range(50)
+            ))
+
+        res.close()
+        assert replies == ["4.5"] * 50
+    finally:
+        unregister_resource("MOCK0::remote::INSTR")
+        remote.close()
+
+
+def test_start_in_thread_raises_start_errors(host):
+    # The port is in use by the running host
+    other = DeviceHost({}, port=host.port)
+    with pytest.raises(OSError):
+        other.start_in_thread()
+
+
+def test_stop_closes_open_connections():
+    device_host = DeviceHost({"MOCK0::mock1::INSTR": Mocker1()}, port=0)
+    device_host.start_in_thread()
+    remote = RemoteMocker("MOCK0::mock1::INSTR", port=device_host.port)
+    assert remote.send(":INSTR:CHANNEL1:VOLT?") is not None
+
+    device_host.stop()
+    with pytest.raises(ConnectionError):
+        remote.send(":INSTR:CHANNEL1:VOLT?")
+    remote.close()
@@ -0,0 +1,80 @@
+import json
+
+import pytest
+
+from visa_mock.base import metrics
+from visa_mock.base.metrics import Histogram, disable_metrics, enable_metrics
+from visa_mock.base.register import register_resources
+from visa_mock.test.mock_instruments import instruments
+from visa_mock.test.mock_instruments.instruments import Mocker1, MockerScope
+
+from visa import ResourceManager
+
+
+@pytest.fixture
+def collector():
+    yield enable_metrics()
+    disable_metrics()
+
+
+def test_disabled_by_default():
+    assert metrics.collector is None
+
+    mocker = Mocker1()
+    mocker.send(":INSTR:CHANNEL1:VOLT 1.5")
+    assert mocker.send(":INSTR:CHANNEL1:VOLT?") == "1.5"
+
+
+def test_command_metrics(collector):
+    mocker = Mocker1()
+    mocker.send(":INSTR:CHANNEL1:VOLT 1.5")
+    mocker.send(":INSTR:CHANNEL2:VOLT 2.5;:INSTR:CHANNEL2:VOLT?")
+
+    commands = collector.snapshot()["commands"]
+    setter = commands[":INSTR:CHANNEL(.*):VOLT (.*)"]
+    getter = commands[":INSTR:CHANNEL(.*):VOLT\\?"]
+
+    assert setter["calls"] == 2
+    assert getter["calls"] == 1
+    assert getter["bytes_in"] == len(":INSTR:CHANNEL2:VOLT?")
+    assert getter["bytes_out"] == len("2.5")
+
+    for kind in metrics.LATENCY_KINDS:
+        assert setter["latency"][kind]["count"] == 2
+        assert sum(setter["latency"][kind]["buckets_us"].values()) == 2
+
+
+def test_command_metrics_of_chunked_reply(collector):
+    mocker = MockerScope()
+    text, _ = mocker.send(":WAV:POINTS?").read()
+
+    commands = collector.snapshot()["commands"]
+    assert commands[":WAV:POINTS\\?"]["bytes_out"] == len(text)
+
+
+def test_resource_metrics(collector):
+    register_resources(instruments.resources)
+
+    rc = ResourceManager(visa_library="@mock")
+    res = rc.open_resource("MOCK0::mock1::INSTR")
+    res.write(":INSTR:CHANNEL1:VOLT 2.3")
+    assert res.query(":INSTR:CHANNEL1:VOLT?") == "2.3"
+
+    stats = collector.snapshot()["resources"]["MOCK0::mock1::INSTR"]
+    assert stats["writes"] == 2
+    assert stats["reads"] == 1
+    assert stats["bytes_out"] == len("2.3")
+
+    exported = json.loads(collector.to_json())
+    assert exported["resources"]["MOCK0::mock1::INSTR"] == stats
+
+
+def test_histogram_buckets():
+    histogram = Histogram()
+    for seconds in (0.0, 1e-6, 3e-6, 1e-3):
+        histogram.add(seconds)
+
+    snapshot = histogram.snapshot()
+    assert snapshot["count"] == 4
+    assert snapshot["max"] == 1e-3
+    assert snapshot["buckets_us"] == {"1": 1, "2": 1, "4": 1, "1024": 1}
@@ -0,0 +1,140 @@
+import pytest
+
+from visa_mock.base import high_level  # noqa: F401 (registers MOCK resource names)
+from visa_mock.base.clock import RealClock, SimulatedClock, set_clock
+from visa_mock.base.register import (
+    ResourceRegistry, register_factory, register_resource, resources, unregister_resource
+)
+from visa_mock.test.mock_instruments.instruments import Mocker1, Mocker2
+
+from visa import ResourceManager
+
+
+def test_factory_is_called_on_first_open():
+    calls = []
+
+    def factory():
+        calls.append(1)
+        return Mocker1()
+
+    register_factory("MOCK0::lazy::INSTR", factory)
+    assert "MOCK0::lazy::INSTR" in resources
+    assert not calls
+
+    rc = ResourceManager(visa_library="@mock")
+    res = rc.open_resource("MOCK0::lazy::INSTR")
+    res.write(":INSTR:CHANNEL1:VOLT 2.5")
+    assert res.query(":INSTR:CHANNEL1:VOLT?") == "2.5"
+
+    rc.open_resource("MOCK0::lazy::INSTR")
+    assert calls == [1]
+
+
+def test_idle_eviction():
+    clock = SimulatedClock()
+    set_clock(clock)
+    try:
+        registry = ResourceRegistry()
+        registry.register_factory("MOCK0::lazy::INSTR", Mocker1, idle_timeout=10.0)
+
+        mocker = registry.acquire("MOCK0::lazy::INSTR")
+        clock.advance(100.0)
+        assert registry.evict_idle() == []
+
+        registry.release("MOCK0::lazy::INSTR")
+        clock.advance(5.0)
+        assert registry.evict_idle() == []
+        clock.advance(5.0)
+        assert registry.evict_idle() == ["MOCK0::lazy::INSTR"]
+
+        assert not registry.is_created("MOCK0::lazy::INSTR")
+        assert registry.acquire("MOCK0::lazy::INSTR") is not mocker
+    finally:
+        set_clock(RealClock())
+
+
+def test_list_resources():
+    registry = ResourceRegistry()
+    registry.register("MOCK0::mock1::INSTR", Mocker1())
+    registry.register_factory("MOCK1::mock2::INSTR", Mocker2)
+    registry.register_factory("MOCK1::mock3::SOCKET", Mocker2)
+
+    assert sorted(registry.list_resources("?*::INSTR")) == [
+        "MOCK0::mock1::INSTR", "MOCK1::mock2::INSTR"
+    ]
+    assert sorted(registry.list_resources("MOCK1::?*")) == [
+        "MOCK1::mock2::INSTR", "MOCK1::mock3::SOCKET"
+    ]
+    assert registry.list_resources("MOCK0::mock1::INSTR") == ["MOCK0::mock1::INSTR"]
+    assert registry.list_resources("GPIB?*") == []
+
+    registry.register_factory("MOCK0::mock4::INSTR", Mocker2)
+    assert len(registry.list_resources("MOCK0?*INSTR")) == 2
+    assert not registry.is_created("MOCK0::mock4::INSTR")
+
+
+def test_unregister():
+    register_resource("MOCK7::removed::INSTR", Mocker1())
+    assert "MOCK7::removed::INSTR" in resources.list_resources("MOCK7::?*")
+
+    assert isinstance(unregister_resource("MOCK7::removed::INSTR"), Mocker1)
+    assert "MOCK7::removed::INSTR" not in resources
+    assert resources.list_resources("MOCK7::?*") == []
+    assert unregister_resource("MOCK7::removed::INSTR") is None
+
+
+def test_failing_factory_is_not_counted_as_open():
+    clock = SimulatedClock()
+    set_clock(clock)
+    try:
+        registry = ResourceRegistry()
+
+        def failing_factory():
+            raise RuntimeError("no instrument")
+
+        registry.register_factory("MOCK0::lazy::INSTR", failing_factory, idle_timeout=10.0)
+        with pytest.raises(RuntimeError):
+            registry.acquire("MOCK0::lazy::INSTR")
+
+        registry.register_factory("MOCK0::lazy::INSTR", Mocker1, idle_timeout=10.0)
+        registry.acquire("MOCK0::lazy::INSTR")
+        registry.release("MOCK0::lazy::INSTR")
+        clock.advance(10.0)
+        assert registry.evict_idle() == ["MOCK0::lazy::INSTR"]
+    finally:
+        set_clock(RealClock())
+
+
+def test_registration_order():
+    registry = ResourceRegistry()
+    names = [
+        "MOCK1::b::INSTR", "MOCK0::a::INSTR", "MOCK1::a::SOCKET",
+        "MOCK0::c::INSTR", "MOCK1::c::INSTR",
+    ]
+    for name in names:
+        registry.register(name, Mocker1())
+
+    assert list(registry) == names
+    assert registry.list_resources("?*::INSTR") == [
+        "MOCK1::b::INSTR", "MOCK0::a::INSTR", "MOCK0::c::INSTR", "MOCK1::c::INSTR"
+    ]
+    assert registry.list_resources("?*") == names
+
+    # Registering again keeps the position, as in a dict
+    registry.register("MOCK1::b::INSTR", Mocker2())
+    assert list(registry)[0] == "MOCK1::b::INSTR"
+
+
+def test_item_assignment():
+    registry = ResourceRegistry()
+    mocker = Mocker1()
+
+    registry["MOCK0::item::INSTR"] = mocker
+    assert registry["MOCK0::item::INSTR"] is mocker
+    assert registry.list_resources() == ["MOCK0::item::INSTR"]
+
+    del registry["MOCK0::item::INSTR"]
+    assert "MOCK0::item::INSTR" not in registry
+    assert len(registry) == 0
+    with pytest.raises(KeyError):
+        del registry["MOCK0::item::INSTR"]
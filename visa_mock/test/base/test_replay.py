@@ -0,0 +1,71 @@
+import pytest
+
+from visa_mock.base import high_level  # noqa: F401 (registers MOCK resource names)
+from visa_mock.base.conversion import BinaryBlock
+from visa_mock.base.register import register_resource
+from visa_mock.base.replay import Recorder, ReplayMocker
+from visa_mock.base.session import Session
+from visa_mock.test.mock_instruments.instruments import Mocker1, MockerScope
+
+from visa import ResourceManager
+
+
+def record_session(path, device):
+    session = Session(0, "MOCK0::mock1::INSTR")
+    session.device = device
+    return Recorder(str(path), session)
+
+
+def test_record_and_replay(tmp_path):
+    path = tmp_path / "mock1.trace"
+
+    with record_session(path, Mocker1()) as recorder:
+        recorder.write(":INSTR:CHANNEL1:VOLT 1.5")
+        assert recorder.query(":INSTR:CHANNEL1:VOLT?") == "1.5"
+        recorder.write(":INSTR:CHANNEL1:VOLT 2.5")
+        recorder.write(":INSTR:CHANNEL1:VOLT?")
+        assert recorder.read() == "2.5"
+
+    mocker = ReplayMocker(str(path))
+    assert len(mocker) == 3
+    assert mocker.send(":INSTR:CHANNEL1:VOLT 1.5") is None
+    assert mocker.send(":INSTR:CHANNEL1:VOLT?") == "2.5"
+    assert mocker.send(":INSTR:CHANNEL1:VOLT?;:INSTR:CHANNEL1:VOLT?") == "2.5;2.5"
+
+    with pytest.raises(ValueError):
+        mocker.send(":INSTR:CHANNEL2:VOLT?")
+
+
+@pytest.mark.parametrize("use_mmap", [False, True])
+def test_sequence_replay(tmp_path, use_mmap):
+    path = tmp_path / "mock1.trace"
+
+    # Records are appended to the trace file
+    for volt in ("1.5", "2.5"):
+        with record_session(path, Mocker1()) as recorder:
+            recorder.write(f":INSTR:CHANNEL1:VOLT {volt}")
+            recorder.query(":INSTR:CHANNEL1:VOLT?")
+
+    mocker = ReplayMocker(str(path), sequence=True, use_mmap=use_mmap)
+    replies = [mocker.send(":INSTR:CHANNEL1:VOLT?") for _ in range(3)]
+    assert replies == ["1.5", "2.5", "2.5"]
+
+    mocker.rewind()
+    assert mocker.send(":INSTR:CHANNEL1:VOLT?") == "1.5"
+
+
+def test_replay_binary_through_resource(tmp_path):
+    path = tmp_path / "scope.trace"
+
+    with record_session(path, MockerScope()) as recorder:
+        recorder.query(":WAV:DATA?")
+
+    mocker = ReplayMocker(str(path))
+    assert isinstance(mocker.send(":WAV:DATA?"), BinaryBlock)
+
+    register_resource("MOCK0::replay::INSTR", mocker)
+    rc = ResourceManager(visa_library="@mock")
+    res = rc.open_resource("MOCK0::replay::INSTR")
+    values = res.query_binary_values(":WAV:DATA?", datatype="B")
+
+    assert values == list(range(10))
@@ -0,0 +1,100 @@
+from typing import List
+
+import pytest
+
+from visa_mock.base import metrics
+from visa_mock.base.base_mocker import BaseMocker, MockingError, scpi
+
+
+class CalibratedSource(BaseMocker):
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.table = [1.0, 2.0]
+        self.voltage = 0.0
+        self.table_calls = 0
+
+    @scpi(r"\*IDN\?", cacheable=True)
+    def _idn(self) -> str:
+        return "Mock,Source,1,1.0"
+
+    @scpi(r":CAL:TABLE\?", cacheable=True, tags=("calibration",), chunk_size=4)
+    def _get_table(self) -> List[float]:
+        self.table_calls += 1
+        return self.table
+
+    @scpi(r":CAL:SCALE (.*)", invalidates=("calibration",))
+    def _scale_table(self, factor: float) -> None:
+        self.table = [value * factor for value in self.table]
+
+    @scpi(r":VOLT (.*)")
+    def _set_voltage(self, value: float) -> None:
+        self.voltage = value
+
+
+@pytest.mark.parametrize("with_metrics", [False, True])
+def test_cached_until_invalidated(with_metrics):
+    mocker = CalibratedSource()
+    if with_metrics:
+        metrics.enable_metrics()
+    try:
+        assert mocker.send(":CAL:TABLE?") == "1.0,2.0"
+        mocker.send(":VOLT 3")
+        assert mocker.send(":CAL:TABLE?") == "1.0,2.0"
+        assert mocker.table_calls == 1
+
+        mocker.send(":CAL:SCALE 2")
+        assert mocker.send(":CAL:TABLE?") == "2.0,4.0"
+        assert mocker.table_calls == 2
+    finally:
+        metrics.disable_metrics()
+
+    info = mocker.reply_cache_info()
+    assert (info.hits, info.misses, info.invalidations) == (1, 2, 1)
+
+
+def test_cache_per_instance():
+    mocker = CalibratedSource()
+    other = CalibratedSource()
+
+    mocker.send(":CAL:TABLE?")
+    other.send(":CAL:TABLE?")
+    assert other.table_calls == 1
+    assert mocker.reply_cache_info().currsize == 1
+
+
+def test_mark_changed_clears_cache():
+    mocker = CalibratedSource()
+    mocker.send(":CAL:TABLE?")
+
+    mocker.table = [5.0]
+    mocker.mark_changed()
+    assert mocker.send(":CAL:TABLE?") == "5.0"
+
+
+def test_snapshot_restore_clears_cache():
+    mocker = CalibratedSource()
+    baseline = mocker.snapshot()
+
+    mocker.send(":CAL:SCALE 3")
+    assert mocker.send(":CAL:TABLE?") == "3.0,6.0"
+
+    mocker.restore(baseline)
+    assert mocker.send(":CAL:TABLE?") == "1.0,2.0"
+
+
+def test_cache_with_metrics():
+    mocker = CalibratedSource()
+    metrics.enable_metrics()
+    try:
+        assert mocker.send("*IDN?") == "Mock,Source,1,1.0"
+        assert mocker.send("*IDN?") == "Mock,Source,1,1.0"
+    finally:
+        metrics.disable_metrics()
+
+    assert mocker.reply_cache_info().hits == 1
+
+
+def test_tags_require_cacheable():
+    with pytest.raises(MockingError):
+        scpi(r":VOLT\?", tags=("voltage",))
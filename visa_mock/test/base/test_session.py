@@ -1,5 +1,64 @@
-from visa_mock.base.session import Session
+import pytest
+from pyvisa import constants, errors
+
+from visa_mock.base import high_level  # noqa: F401 (registers MOCK resource names)
+from visa_mock.base.session import Session, SessionAllocator
+from visa_mock.test.mock_instruments.instruments import Mocker1
 
 
 def test_session():
     Session(0, "TCPIP0::mock:INSTR")
+
+
+def test_pipelined_queries():
+    session = Session(0, "MOCK0::mock1::INSTR")
+    session.device = Mocker1()
+
+    session.write(":INSTR:CHANNEL1:VOLT 1.5")
+    session.write(":INSTR:CHANNEL1:VOLT?")
+    session.write(":INSTR:CHANNEL2:VOLT 2.5")
+    session.write(":INSTR:CHANNEL2:VOLT?")
+
+    assert session.read() == "1.5"
+    assert session.read() == "2.5"
+
+    with pytest.raises(errors.VisaIOError):
+        session.read()
+
+
+def test_partial_read():
+    session = Session(0, "MOCK0::mock1::INSTR")
+    session.device = Mocker1()
+
+    session.write(":INSTR:CHANNEL1:VOLT 12.25")
+    session.write(":INSTR:CHANNEL1:VOLT?")
+    session.write(":INSTR:CHANNEL1:VOLT?")
+    assert session.bytes_pending == 10
+
+    assert session.read_partial(2) == ("12", False)
+    assert session.read_partial(2) == (".2", False)
+    assert session.read_partial(2) == ("5", True)
+    assert session.read() == "12.25"
+    assert session.bytes_pending == 0
+
+
+def test_session_attributes_are_lazy():
+    session = Session(3, "MOCK0::mock1::INSTR")
+    assert session._attrs is None
+    assert session.resource_name == "MOCK0::mock1::INSTR"
+
+    assert session.attrs[constants.VI_ATTR_RM_SESSION] == 3
+    assert session.attrs[constants.VI_ATTR_RSRC_NAME] == "MOCK0::mock1::INSTR"
+
+
+def test_session_allocator():
+    allocator = SessionAllocator(max_sessions=3)
+    first, second, third = (allocator.allocate() for _ in range(3))
+    assert (first, second, third) == (1, 2, 3)
+
+    with pytest.raises(errors.VisaIOError):
+        allocator.allocate()
+
+    allocator.release(first)
+    assert allocator.allocate() == first
+    assert len(allocator) == 3
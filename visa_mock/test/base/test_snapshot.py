@@ -0,0 +1,86 @@
+from visa_mock.base.register import ResourceRegistry, register_resources
+from visa_mock.test.mock_instruments import instruments
+from visa_mock.test.mock_instruments.instruments import (
+    Mocker1, Mocker4, MockerCompact
+)
+
+pytest_plugins = ["visa_mock.pytest_plugin"]
+
+# Registered before the baseline of the fixture is taken
+register_resources(instruments.resources)
+
+
+def test_restore_dict_state():
+    mocker = Mocker1()
+    mocker.send(":INSTR:CHANNEL1:VOLT 1.5")
+    snapshot = mocker.snapshot()
+
+    mocker.send(":INSTR:CHANNEL1:VOLT 2.5")
+    mocker.send(":INSTR:CHANNEL2:VOLT 3.5")
+    assert mocker.restore(snapshot) == 1
+
+    assert mocker.send(":INSTR:CHANNEL1:VOLT?") == "1.5"
+    assert mocker.send(":INSTR:CHANNEL2:VOLT?") == "0.0"
+
+    # The snapshot can be restored again
+    mocker.send(":INSTR:CHANNEL1:VOLT 4.5")
+    mocker.restore(snapshot)
+    assert mocker.send(":INSTR:CHANNEL1:VOLT?") == "1.5"
+
+
+def test_restore_only_changed_submodules():
+    mocker = Mocker4()
+    mocker.send(":INSTR1:CHANNEL1:VOLT 1.0")
+    mocker.send(":INSTR2:CHANNEL1:VOLT 2.0")
+    snapshot = mocker.snapshot()
+    assert len(snapshot) == 5
+
+    assert mocker.restore(snapshot) == 0
+
+    mocker.send(":INSTR1:CHANNEL1:VOLT 3.0")
+    # Every mocker on the route of the message has run a handler
+    assert len(snapshot.changed()) == 3
+    assert mocker.restore(snapshot) == 3
+    assert mocker.send(":INSTR1:CHANNEL1:VOLT?") == "1.0"
+
+
+def test_restore_drops_new_submodules():
+    mocker = Mocker4()
+    snapshot = mocker.snapshot()
+    assert len(snapshot) == 1
+
+    mocker.send(":INSTR2:CHANNEL2:VOLT 2.0")
+    mocker.restore(snapshot)
+    assert mocker._instruments.created() == []
+
+
+def test_restore_slots():
+    mocker = MockerCompact()
+    snapshot = mocker.snapshot()
+
+    mocker.send(":INSTR:CHANNEL3:VOLT 2.0")
+    mocker.restore(snapshot)
+    assert mocker.send(":INSTR:CHANNEL3:VOLT?") == "0.0"
+
+
+def test_registry_restore():
+    registry = ResourceRegistry()
+    registry.register("MOCK0::mock1::INSTR", Mocker1())
+    registry.register_factory("MOCK0::mock4::INSTR", Mocker4)
+    baseline = registry.snapshot()
+
+    registry["MOCK0::mock1::INSTR"].send(":INSTR:CHANNEL1:VOLT 2.0")
+    registry["MOCK0::mock4::INSTR"].send(":INSTR1:CHANNEL1:VOLT 2.0")
+    registry.restore(baseline)
+
+    assert registry["MOCK0::mock1::INSTR"].send(":INSTR:CHANNEL1:VOLT?") == "0.0"
+    assert not registry.is_created("MOCK0::mock4::INSTR")
+
+
+def test_fixture_changes_state(mock_resources):
+    mock_resources["MOCK0::mock4::INSTR"].send(":INSTR1:CHANNEL2:VOLT 7.0")
+
+
+def test_fixture_restored_state(mock_resources):
+    mocker = mock_resources["MOCK0::mock4::INSTR"]
+    assert mocker.send(":INSTR1:CHANNEL2:VOLT?") == "0"
@@ -0,0 +1,132 @@
+import asyncio
+import threading
+import time
+
+import pytest
+from pyvisa import constants, errors
+
+from visa import ResourceManager
+
+from visa_mock.base.clock import SimulatedClock
+from visa_mock.base.register import register_resource
+from visa_mock.base.status import StatusMocker
+from visa_mock.base.timing import TimingModel
+from visa_mock.test.mock_instruments.instruments import Mocker1, MockerSweep
+
+
+def simulated_sweeper() -> MockerSweep:
+    mocker = MockerSweep()
+    mocker.clock = SimulatedClock()
+    return mocker
+
+
+def test_opc_query_waits_for_operations():
+    mocker = simulated_sweeper()
+    mocker.send(":SWEEP:TIME 5")
+    mocker.send(":SWEEP:START")
+    assert mocker.send(":SWEEP:COUNT?") == "0"
+
+    assert mocker.send("*OPC?") == "1"
+    assert mocker.clock.time() == 5.0
+    assert mocker.send(":SWEEP:COUNT?") == "1"
+
+
+def test_async_opc_query_keeps_event_loop_running():
+    mocker = MockerSweep()
+    mocker.send(":SWEEP:TIME 0.2")
+    mocker.send(":SWEEP:START")
+    ticks = []
+
+    async def tick() -> None:
+        for _ in range(5):
+            ticks.append(time.perf_counter())
+            await asyncio.sleep(0.02)
+
+    async def query() -> str:
+        reply, _ = await asyncio.gather(mocker.asend("*OPC?"), tick())
+        return reply
+
+    assert asyncio.run(query()) == "1"
+    assert len(ticks) == 5
+    assert max(b - a for a, b in zip(ticks, ticks[1:])) < 0.15
+
+
+def test_operation_complete_event():
+    mocker = simulated_sweeper()
+    mocker.send("*ESE 1;*SRE 32")
+    mocker.send(":SWEEP:START;*OPC")
+    assert mocker.send("*STB?") == "0"
+
+    mocker.clock.advance(1.0)
+    assert mocker.send("*STB?") == "96"
+    assert mocker.service_request_count == 1
+
+    # A serial poll clears the request service bit, *ESR? the event
+    assert mocker.serial_poll() == 0x60
+    assert mocker.serial_poll() == 0x20
+    assert mocker.send("*ESR?") == "1"
+    assert mocker.send("*STB?") == "0"
+
+
+def test_wait_for_service_request_simulated():
+    mocker = simulated_sweeper()
+    mocker.send("*ESE 1;*SRE 32")
+    mocker.send(":SWEEP:TIME 10;:SWEEP:START;*OPC")
+
+    assert mocker.wait_for_service_request(0, timeout=2.0) is None
+    assert mocker.clock.time() == 2.0
+    assert mocker.wait_for_service_request(0) == 1
+    assert mocker.clock.time() == 10.0
+
+
+def test_wait_on_event_through_visa():
+    register_resource("MOCK0::sweep2::INSTR", MockerSweep())
+    rc = ResourceManager(visa_library="@mock")
+    res = rc.open_resource("MOCK0::sweep2::INSTR")
+
+    res.write("*CLS;*ESE 1;*SRE 32")
+    res.enable_event(constants.EventType.service_request, constants.EventMechanism.queue)
+    res.write(":SWEEP:TIME 0.05;:SWEEP:START;*OPC")
+
+    start = time.monotonic()
+    response = res.wait_on_event(constants.EventType.service_request, 2000)
+    assert response.event_type == constants.EventType.service_request
+    assert 0.04 < time.monotonic() - start < 1.0
+    assert res.read_stb() & 0x40
+
+    with pytest.raises(errors.VisaIOError):
+        res.wait_on_event(constants.EventType.service_request, 10)
+
+
+def test_service_request_from_another_thread():
+    mocker = MockerSweep()
+    register_resource("MOCK0::sweep3::INSTR", mocker)
+    rc = ResourceManager(visa_library="@mock")
+    res = rc.open_resource("MOCK0::sweep3::INSTR")
+    res.write("*SRE 1")
+
+    timer = threading.Timer(0.05, mocker.set_status_bits, (0x01,))
+    timer.start()
+    res.wait_for_srq(2000)
+    timer.join()
+
+    assert res.stb & 0x41 == 0x41
+
+
+def test_events_need_status_registers():
+    register_resource("MOCK0::plain::INSTR", Mocker1())
+    rc = ResourceManager(visa_library="@mock")
+    res = rc.open_resource("MOCK0::plain::INSTR")
+
+    with pytest.raises(errors.VisaIOError):
+        res.enable_event(constants.EventType.service_request, constants.EventMechanism.queue)
+    assert res.read_stb() == 0
+
+
+def test_status_mocker_with_timing_model():
+    clock = SimulatedClock()
+    mocker = StatusMocker(clock=clock, timing=TimingModel(latency=0.5))
+    assert mocker.timing is not None
+
+    assert mocker.send("*STB?") == "0"
+    assert clock.time() == 0.5
@@ -0,0 +1,85 @@
+import pytest
+
+from visa_mock.base.clock import SimulatedClock
+from visa_mock.base.timing import TimingModel, normal_jitter
+from visa_mock.test.mock_instruments.instruments import Mocker1, MockerScope
+
+
+def timed_mocker(timing: TimingModel) -> Mocker1:
+    mocker = Mocker1()
+    mocker.timing = timing
+    mocker.clock = SimulatedClock()
+    return mocker
+
+
+def test_latency_and_transfer_time():
+    mocker = timed_mocker(TimingModel(latency=0.5, bytes_per_second=100.0))
+    message = ":INSTR:CHANNEL1:VOLT?"
+
+    reply = mocker.send(message)
+    expected = 0.5 + (len(message) + len(reply)) / 100.0
+    assert mocker.clock.time() == pytest.approx(expected)
+
+
+def test_transfer_time_of_chunked_reply():
+    mocker = MockerScope()
+    mocker.timing = TimingModel(bytes_per_second=100.0)
+    mocker.clock = SimulatedClock()
+    message = ":WAV:POINTS?"
+
+    reply = mocker.send(message)
+    text, _ = reply.read()
+    assert mocker.clock.time() == pytest.approx((len(message) + len(text)) / 100.0)
+
+
+def test_interface_rate():
+    assert TimingModel(interface="gpib").bytes_per_second == 1e6
+    with pytest.raises(KeyError):
+        TimingModel(interface="FIREWIRE")
+
+
+def test_call_delay_adds_to_latency():
+    mocker = timed_mocker(TimingModel(latency=0.5))
+    mocker.set_call_delay(2.0, ":INSTR:CHANNEL(.*):VOLT (.*)")
+
+    mocker.send(":INSTR:CHANNEL1:VOLT 12")
+    assert mocker.clock.time() == pytest.approx(2.5)
+
+
+def test_busy_queue():
+    timing = TimingModel(latency=1.0)
+    # Two commands sent at the same time: the second waits for the first
+    assert timing.delay(0.0, 0, now=10.0) == 1.0
+    assert timing.delay(0.0, 0, now=10.0) == 2.0
+    # Once the instrument is idle, commands do not wait
+    assert timing.delay(0.0, 0, now=20.0) == 1.0
+
+    timing = TimingModel(latency=1.0, queue=False)
+    assert timing.delay(0.0, 0, now=10.0) == 1.0
+    assert timing.delay(0.0, 0, now=10.0) == 1.0
+
+
+def test_seeded_jitter_is_reproducible():
+
+    def delays(seed: int):
+        timing = TimingModel(latency=1.0, jitter=normal_jitter(0.1), seed=seed, queue=False)
+        return [timing.delay(0.0, 0, now=0.0) for _ in range(5)]
+
+    assert delays(1) == delays(1)
+    assert delays(1) != delays(2)
+
+
+def test_call_delay_per_instance():
+    command = ":INSTR:CHANNEL(.*):VOLT (.*)"
+    mocker = Mocker1()
+    mocker.clock = SimulatedClock()
+    mocker.set_call_delay(1.0, command)
+
+    other = Mocker1()
+    other.clock = SimulatedClock()
+    other.send(":INSTR:CHANNEL1:VOLT 12")
+    assert other.clock.time() == 0.0
+
+    mocker.set_call_delay(None, command)
+    mocker.send(":INSTR:CHANNEL1:VOLT 12")
+    assert mocker.clock.time() == 0.0
@@ -0,0 +1,69 @@
+import json
+import threading
+
+from visa_mock.base.register import register_resources
+from visa_mock.base.tracing import start_tracing, stop_tracing
+from visa_mock.test.mock_instruments import instruments
+
+from visa import ResourceManager
+
+
+def spans(events):
+    return [event for event in events if event["ph"] == "X"]
+
+
+def test_trace_file(tmp_path):
+    register_resources(instruments.resources)
+    path = tmp_path / "trace.json"
+
+    start_tracing(str(path), buffer_size=2)
+    try:
+        rc = ResourceManager(visa_library="@mock")
+        res = rc.open_resource("MOCK0::mock1::INSTR")
+        session = res.session
+        res.write(":INSTR:CHANNEL1:VOLT 2.3")
+        thread = threading.Thread(
+            target=res.query, args=(":INSTR:CHANNEL1:VOLT?",), name="querying"
+        )
+        thread.start()
+        thread.join()
+        res.close()
+    finally:
+        stop_tracing()
+
+    events = json.loads(path.read_text())
+    names = [event["name"] for event in spans(events)]
+    assert names == ["open", "send", "write", "send", "query", "close"]
+
+    write = spans(events)[2]
+    assert write["args"] == {
+        "session": session,
+        "resource": "MOCK0::mock1::INSTR",
+        "command": ":INSTR:CHANNEL1:VOLT 2.3",
+    }
+    assert write["dur"] >= 0
+
+    thread_names = {
+        event["args"]["name"] for event in events if event["ph"] == "M"
+    }
+    assert "querying" in thread_names
+
+
+def test_ring_buffer(tmp_path):
+    register_resources(instruments.resources)
+    path = tmp_path / "trace.json"
+
+    tracer = start_tracing(str(path), ring_size=4)
+    try:
+        rc = ResourceManager(visa_library="@mock")
+        res = rc.open_resource("MOCK0::mock1::INSTR")
+        for volt in range(10):
+            res.write(f":INSTR:CHANNEL1:VOLT {volt}")
+
+        assert len(spans(tracer.events())) == 4
+    finally:
+        stop_tracing()
+
+    events = spans(json.loads(path.read_text())["traceEvents"])
+    assert [event["name"] for event in events] == ["send", "write"] * 2
+    assert events[-1]["args"]["command"] == ":INSTR:CHANNEL1:VOLT 9"
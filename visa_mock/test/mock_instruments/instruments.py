@@ -1,5 +1,8 @@
 from collections import defaultdict
 from visa_mock.base.base_mocker import BaseMocker, scpi
+from visa_mock.base.channels import ChannelArray, Submodules
+from visa_mock.base.dynamics import DynamicParameter
+from visa_mock.base.status import StatusMocker
 
 
 class Mocker1(BaseMocker):
@@ -59,10 +62,7 @@ class Mocker3(BaseMocker):
 
     def __init__(self, call_delay: float = 0.0) -> None:
         super().__init__(call_delay=call_delay)
-        self._channels = {
-            1: MockerChannel(),
-            2: MockerChannel()
-        }
+        self._channels = Submodules(MockerChannel, 2)
 
     @scpi(r":CHANNEL(.*)")
     def _channel(self, number: int) -> MockerChannel:
@@ -73,19 +73,116 @@ class Mocker4(BaseMocker):
 
     def __init__(self, call_delay: float = 0.0) -> None:
         super().__init__(call_delay=call_delay)
-        self._instruments = {
-            1: Mocker3(),
-            2: Mocker3()
-        }
+        self._instruments = Submodules(Mocker3, 2)
 
     @scpi(r":INSTR(.*)")
     def _channel(self, number: int) -> Mocker3:
         return self._instruments[number]
 
 
+class MockerScope(BaseMocker):
+    """
+    A mocker class mocking an oscilloscope returning binary waveforms
+    """
+
+    def __init__(self, call_delay: float = 0.0) -> None:
+        super().__init__(call_delay=call_delay)
+        self._waveform = bytes(range(10))
+
+    @scpi(r":WAV:DATA\?")
+    def _get_waveform(self) -> bytes:
+        return self._waveform
+
+    @scpi(r":WAV:POINTS\?", chunk_size=4)
+    def _get_points(self) -> list:
+        return list(self._waveform)
+
+
+class MockerCompact(BaseMocker):
+    """
+    A 64 channel voltage source with compact state: slots instead of an
+    instance dict and the voltages in a typed array
+    """
+    __slots__ = ("_voltage",)
+
+    def __init__(self, call_delay: float = 0.0) -> None:
+        super().__init__(call_delay=call_delay)
+        self._voltage = ChannelArray(64)
+
+    @scpi(r":INSTR:CHANNEL(\d+):VOLT (.*)")
+    def _set_voltage(self, channel: int, value: float) -> None:
+        self._voltage[channel] = value
+
+    @scpi(r":INSTR:CHANNEL(\d+):VOLT\?")
+    def _get_voltage(self, channel: int) -> float:
+        return self._voltage[channel]
+
+
+class MockerSweep(StatusMocker):
+    """
+    A sweeping instrument: a sweep is a long-running operation, see
+    `visa_mock.base.status`
+    """
+    __slots__ = ("_sweep_time", "_sweeps")
+
+    def __init__(self, call_delay: float = 0.0) -> None:
+        super().__init__(call_delay=call_delay)
+        self._sweep_time = 1.0
+        self._sweeps = 0
+
+    def _sweep_done(self) -> None:
+        self._sweeps += 1
+
+    @scpi(r":SWEEP:TIME (.*)")
+    def _set_sweep_time(self, seconds: float) -> None:
+        self._sweep_time = seconds
+
+    @scpi(r":SWEEP:START$")
+    def _start_sweep(self) -> None:
+        self.start_operation(self._sweep_time, self._sweep_done)
+
+    @scpi(r":SWEEP:COUNT\?")
+    def _get_sweep_count(self) -> int:
+        self.complete_operations()
+        return self._sweeps
+
+
+class MockerRamp(BaseMocker):
+    """
+    A multi channel voltage source whose outputs ramp at 1 V/s and settle
+    with a time constant of 0.1 s. Channels are created when first set.
+    """
+
+    def __init__(self, call_delay: float = 0.0) -> None:
+        super().__init__(call_delay=call_delay)
+        self._voltage = {}
+
+    def _channel(self, channel: int) -> DynamicParameter:
+        parameter = self._voltage.get(channel)
+        if parameter is None:
+            parameter = self._voltage[channel] = DynamicParameter(
+                slew_rate=1.0, time_constant=0.1
+            )
+        return parameter
+
+    @scpi(r":INSTR:CHANNEL(\d+):VOLT (.*)")
+    def _set_voltage(self, channel: int, value: float) -> None:
+        self._channel(channel).set_target(value, self.clock.time())
+
+    @scpi(r":INSTR:CHANNEL(\d+):VOLT\?")
+    def _get_voltage(self, channel: int) -> float:
+        if channel not in self._voltage:
+            return 0.0
+        return self._voltage[channel].value(self.clock.time())
+
+
 resources = {
     "MOCK0::mock1::INSTR": Mocker1(),
     "MOCK0::mock2::INSTR": Mocker2(),
     "MOCK0::mock3::INSTR": Mocker3(),
     "MOCK0::mock4::INSTR": Mocker4(),
+    "MOCK0::scope::INSTR": MockerScope(),
+    "MOCK0::compact::INSTR": MockerCompact(),
+    "MOCK0::sweep::INSTR": MockerSweep(),
+    "MOCK0::ramp::INSTR": MockerRamp(),
 }